@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from api.models import Warehouse, WarehouseConfig, StorageBin
+from api.services.data_version import bump_data_version
 
 class Command(BaseCommand):
     help = "Generate storage bins based on warehouse config"
@@ -8,7 +9,9 @@ class Command(BaseCommand):
         wh = Warehouse.objects.get(code="WH1")
         cfg = wh.config
 
-        StorageBin.objects.filter(warehouse=wh).delete()
+        existing = StorageBin.objects.filter(warehouse=wh)
+        deleted = list(existing.values_list("id", "warehouse_id", "bin_code"))
+        existing.delete()
 
         bins = []
         for row in range(1, cfg.rows + 1):
@@ -21,7 +24,7 @@ class Command(BaseCommand):
 
                     bin_code = f"R{row}-S{shelf}-L{level}"
 
-                    bins.append(StorageBin(
+                    b = StorageBin(
                         warehouse=wh,
                         bin_code=bin_code,
                         row=row,
@@ -33,7 +36,14 @@ class Command(BaseCommand):
                         width=cfg.bin_width,
                         height=cfg.bin_height,
                         depth=cfg.bin_depth,
-                    ))
-
-        StorageBin.objects.bulk_create(bins)
+                    )
+                    b.assign_chunk()
+                    bins.append(b)
+
+        created = StorageBin.objects.bulk_create(bins)
+        bump_data_version(
+            wh.id,
+            changed_bins=[b.id for b in created],
+            deleted_bins=deleted,
+        )
         self.stdout.write(self.style.SUCCESS(f"Generated {len(bins)} bins"))
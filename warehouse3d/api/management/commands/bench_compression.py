@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve
+
+from api.models import Warehouse
+from api.services.compression import IDENTITY, PREFERENCE
+from api.services.payload_cache import invalidate_payloads
+
+
+DEFAULT_PATHS = [
+    "/api/warehouse-heatmap-api/?warehouse={code}",
+    "/api/bin-heatmap/",
+    "/api/api/warehouse-bins/?warehouse={code}",
+    "/api/bins/binary/?warehouse={code}",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bytes on the wire and CPU time per request for the bin "
+        "read APIs, for every supported content coding"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--warehouse", default="WH1")
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=20,
+            help="Warm requests per endpoint and encoding (default 20)",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Request path to measure (repeatable, may use {code})",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            wh = Warehouse.objects.get(code__iexact=options["warehouse"])
+        except Warehouse.DoesNotExist:
+            raise CommandError(f"Unknown warehouse {options['warehouse']}")
+
+        n = max(1, options["requests"])
+        paths = [p.format(code=wh.code) for p in (options["path"] or DEFAULT_PATHS)]
+        factory = RequestFactory()
+        all_ids = list(Warehouse.objects.values_list("id", flat=True))
+
+        self.stdout.write(
+            f"{wh.bins.count()} bins in {wh.code}, {n} warm requests each\n"
+        )
+        self.stdout.write(
+            f"{'path':48} {'encoding':9} {'bytes':>10} {'ratio':>6} "
+            f"{'cold ms':>9} {'warm ms':>9}"
+        )
+
+        for path in paths:
+            view = resolve(path.split("?", 1)[0]).func
+            identity_size = None
+
+            for encoding in [IDENTITY, *PREFERENCE]:
+                def request():
+                    return view(factory.get(path, HTTP_ACCEPT_ENCODING=encoding))
+
+                # Cold: payload cache empty, so build + compress
+                invalidate_payloads(*all_ids)
+                cold, response = _cpu(request)
+
+                # Warm: what a steady stream of viewers costs
+                warm = 0.0
+                for _ in range(n):
+                    elapsed, response = _cpu(request)
+                    warm += elapsed
+
+                size = len(response.content)
+                served = response.get("Content-Encoding", IDENTITY)
+                if identity_size is None:
+                    identity_size = size
+
+                self.stdout.write(
+                    f"{path[:48]:48} {served:9} {size:>10} "
+                    f"{identity_size / size if size else 0:>6.1f} "
+                    f"{cold * 1000:>9.2f} {warm / n * 1000:>9.2f}"
+                )
+
+        invalidate_payloads(*all_ids)
+
+
+def _cpu(fn):
+    """
+    (process CPU seconds, result) for one call. CPU time rather than
+    wall time so database latency does not hide compression cost.
+    """
+    start = time.process_time()
+    result = fn()
+    if not getattr(result, "is_rendered", True):
+        result.render()
+    return time.process_time() - start, result
@@ -0,0 +1,134 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from api.models import BinAggregate, StorageBin, Warehouse
+from api.services import bin_serializer
+from api.services.bin_serializer import heatmap_bins
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_bins(qs):
+    """
+    The per-instance loop the endpoints used before bin_serializer.
+    """
+    bins = []
+    for b in qs.select_related("aggregate"):
+        agg = getattr(b, "aggregate", None) or BinAggregate(bin=b)
+        bins.append({
+            "bin_code": b.bin_code,
+            "row": b.row,
+            "shelf": b.shelf,
+            "level": b.level,
+            "x": b.x,
+            "y": b.y,
+            "z": b.z,
+            "width": b.width,
+            "height": b.height,
+            "depth": b.depth,
+            "zone": b.zone,
+            "abc": agg.best_abc,
+            "hits": agg.total_hits,
+            "qty": agg.total_qty,
+            "occupied": agg.total_qty > 0,
+        })
+    return bins
+
+
+def stdlib_dumps(payload):
+    return json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark bin serialization (model instances vs compiled "
+        "values_list serializer) on a scratch warehouse that is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bins", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["bins"], max(1, options["repeat"]))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, count, repeat):
+        self.stdout.write(f"Seeding {count} bins ...")
+        wh = Warehouse.objects.create(code="__BENCH__", name="Serializer benchmark")
+
+        per_row = 1000
+        StorageBin.objects.bulk_create(
+            [
+                StorageBin(
+                    warehouse=wh,
+                    bin_code=f"B{i:07d}",
+                    row=i // per_row,
+                    shelf=(i % per_row) // 10,
+                    level=i % 10,
+                    x=float(i // per_row) * 2.0,
+                    y=float(i % 10) * 1.5,
+                    z=float((i % per_row) // 10) * 1.3,
+                    zone=f"Z{i % 7}",
+                )
+                for i in range(count)
+            ],
+            batch_size=5000,
+        )
+        BinAggregate.objects.bulk_create(
+            [
+                BinAggregate(
+                    bin_id=bin_id,
+                    total_qty=float(bin_id % 50),
+                    total_hits=bin_id % 300,
+                    product_count=bin_id % 3,
+                    best_abc="ABC"[bin_id % 3],
+                    occupied=bin_id % 50 > 0,
+                )
+                for bin_id in StorageBin.objects.filter(warehouse=wh).values_list("id", flat=True)
+            ],
+            batch_size=5000,
+        )
+
+        qs = StorageBin.objects.filter(warehouse=wh)
+
+        variants = [
+            ("model instances + json", legacy_bins, stdlib_dumps),
+            ("values_list + json", heatmap_bins.serialize, stdlib_dumps),
+        ]
+        if bin_serializer.orjson is not None:
+            variants.append(("values_list + orjson", heatmap_bins.serialize, bin_serializer.dumps))
+
+        self.stdout.write(
+            f"\n{'variant':26} {'build ms':>10} {'encode ms':>10} {'total ms':>10} "
+            f"{'bytes':>11} {'speedup':>8}"
+        )
+
+        baseline = None
+        for name, build, encode in variants:
+            best_build = best_encode = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                bins = build(qs)
+                built = time.perf_counter()
+                body = encode({"bins": bins})
+                done = time.perf_counter()
+                best_build = min(best_build, built - start)
+                best_encode = min(best_encode, done - built)
+
+            total = best_build + best_encode
+            baseline = baseline or total
+            self.stdout.write(
+                f"{name:26} {best_build * 1000:>10.1f} {best_encode * 1000:>10.1f} "
+                f"{total * 1000:>10.1f} {len(body):>11} {baseline / total:>7.2f}x"
+            )
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import PickingHeatmap, ReplenishmentUpload
+from api.services.analytics_uploads import parsed_frame
+from api.services.bin_heatmap_service import FILES, load_reference
+from api.services.columnar_cache import COLUMNAR_CACHE_DIR, prune_columnar_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the reference workbooks and stored analytics uploads "
+        "into the columnar cache, so no request pays for an Excel parse"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--skip-uploads",
+            action="store_true",
+            help="Only convert the reference workbooks in api/data",
+        )
+        parser.add_argument(
+            "--prune-days",
+            type=int,
+            help="Also delete cache files not read for this many days",
+        )
+
+    def _convert(self, label, load):
+        start = time.perf_counter()
+        try:
+            rows = len(load())
+        except (OSError, ValueError) as e:
+            self.stdout.write(self.style.WARNING(f"{label}: skipped ({e})"))
+            return
+        self.stdout.write(f"{label}: {rows} rows in {time.perf_counter() - start:.2f}s")
+
+    def handle(self, *args, **options):
+        # Imported here: views pulls in the whole app
+        from api.views import read_picking_frame, read_replenishment_frame
+
+        for name in FILES:
+            self._convert(f"reference {name}", lambda: load_reference(name))
+
+        if not options["skip_uploads"]:
+            uploads = [
+                (PickingHeatmap, "picking", read_picking_frame),
+                (ReplenishmentUpload, "replenishment", read_replenishment_frame),
+            ]
+            for model, parser, parse in uploads:
+                for instance in model.objects.order_by("id"):
+                    self._convert(
+                        f"{parser} upload {instance.id}",
+                        lambda: parsed_frame(instance, parser, parse),
+                    )
+
+        if options["prune_days"] is not None:
+            removed = prune_columnar_cache(options["prune_days"])
+            self.stdout.write(f"Pruned {removed} stale cache files")
+
+        self.stdout.write(self.style.SUCCESS(f"Columnar cache ready in {COLUMNAR_CACHE_DIR}"))
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.services.change_log import compact_changes
+
+
+class Command(BaseCommand):
+    help = "Compact the BinChange delta log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Drop entries older than this many days (0 keeps all; default 7)",
+        )
+
+    def handle(self, *args, **options):
+        before = None
+        if options["days"] > 0:
+            before = timezone.now() - timedelta(days=options["days"])
+
+        with transaction.atomic():
+            superseded, expired = compact_changes(before)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {superseded} superseded and {expired} expired change entries"
+        ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Warehouse
+from api.services.bin_aggregates import rebuild_bin_aggregates, verify_bin_aggregates
+
+
+class Command(BaseCommand):
+    help = "Rebuild the BinAggregate table from BinStock and verify it"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--warehouse",
+            action="append",
+            help="Warehouse code (repeatable). Defaults to all warehouses.",
+        )
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Only compare stored aggregates, do not rebuild",
+        )
+
+    def handle(self, *args, **options):
+        warehouse_ids = None
+        if options["warehouse"]:
+            warehouse_ids = list(
+                Warehouse.objects
+                .filter(code__in=[c.upper() for c in options["warehouse"]])
+                .values_list("id", flat=True)
+            )
+
+        if not options["verify_only"]:
+            with transaction.atomic():
+                rebuilt = rebuild_bin_aggregates(warehouse_ids)
+            self.stdout.write(f"Rebuilt aggregates for {rebuilt} bins")
+
+        mismatches = verify_bin_aggregates(warehouse_ids)
+        for bin_id, field, stored, expected in mismatches[:50]:
+            self.stdout.write(
+                f"bin {bin_id}: {field} stored={stored} expected={expected}"
+            )
+
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} aggregate mismatches")
+
+        self.stdout.write(self.style.SUCCESS("Aggregates verified"))
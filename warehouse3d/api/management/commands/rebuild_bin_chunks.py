@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Warehouse
+from api.services.data_version import bump_data_version
+from api.services.spatial_chunks import CHUNK_SIZE, rebuild_chunks
+
+
+class Command(BaseCommand):
+    help = "Recompute spatial chunk cells for every StorageBin"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--warehouse",
+            action="append",
+            help="Warehouse code (repeatable). Defaults to all warehouses.",
+        )
+
+    def handle(self, *args, **options):
+        warehouses = Warehouse.objects.all()
+        if options["warehouse"]:
+            warehouses = warehouses.filter(code__in=[c.upper() for c in options["warehouse"]])
+        warehouse_ids = list(warehouses.values_list("id", flat=True))
+
+        if not warehouse_ids:
+            raise CommandError("No matching warehouses")
+
+        with transaction.atomic():
+            updated = rebuild_chunks(warehouse_ids)
+            bump_data_version(*warehouse_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Chunk size {CHUNK_SIZE} m: {updated} bins moved to a new chunk"
+        ))
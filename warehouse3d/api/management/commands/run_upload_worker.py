@@ -0,0 +1,65 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.services.upload_jobs import claim_next, requeue_stale, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued upload jobs (?async=1 uploads). Run several of "
+        "these to drain the queue in parallel"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when the queue is empty instead of polling",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=2.0,
+            help="Seconds between polls of an empty queue (default 2)",
+        )
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=30,
+            help="Requeue running jobs with no progress for this long (0 disables; default 30)",
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        stale_after = timedelta(minutes=options["stale_minutes"])
+        self.stdout.write(f"Upload worker {worker} started")
+
+        try:
+            while True:
+                if options["stale_minutes"] > 0:
+                    requeued, failed = requeue_stale(stale_after)
+                    if requeued or failed:
+                        self.stdout.write(f"Requeued {requeued} and failed {failed} stale jobs")
+
+                job = claim_next(worker)
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                self.stdout.write(f"Job {job.id} ({job.kind}) started")
+                start = time.perf_counter()
+                run_job(job)
+                elapsed = time.perf_counter() - start
+
+                style = self.style.SUCCESS if job.status == job.STATUS_DONE else self.style.ERROR
+                self.stdout.write(style(
+                    f"Job {job.id} {job.status}: {job.rows_processed} rows, "
+                    f"{job.error_count} errors in {elapsed:.1f}s"
+                    + (f" ({job.message})" if job.message else "")
+                ))
+        except KeyboardInterrupt:
+            self.stdout.write("Upload worker stopped")
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_replenishmentupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehouse',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
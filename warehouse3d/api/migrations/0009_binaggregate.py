@@ -0,0 +1,66 @@
+# Generated by Django 6.0 on 2026-10-17 04:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, FloatField, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def backfill_aggregates(apps, schema_editor):
+    StorageBin = apps.get_model("api", "StorageBin")
+    BinAggregate = apps.get_model("api", "BinAggregate")
+
+    rank_to_abc = {3: "A", 2: "B", 1: "C"}
+    rows = (
+        StorageBin.objects
+        .annotate(
+            total_qty=Coalesce(Sum("stocks__quantity"), Value(0.0), output_field=FloatField()),
+            total_hits=Coalesce(Sum("stocks__hit_count"), Value(0), output_field=IntegerField()),
+            product_count=Count("stocks"),
+            abc_rank=Max(Case(
+                When(stocks__abc_class="A", then=Value(3)),
+                When(stocks__abc_class="B", then=Value(2)),
+                When(stocks__abc_class="C", then=Value(1)),
+                output_field=IntegerField(),
+            )),
+        )
+        .values_list("id", "total_qty", "total_hits", "product_count", "abc_rank")
+    )
+
+    BinAggregate.objects.bulk_create(
+        [
+            BinAggregate(
+                bin_id=bin_id,
+                total_qty=qty,
+                total_hits=hits,
+                product_count=count,
+                best_abc=rank_to_abc.get(rank, "C"),
+                occupied=qty > 0,
+            )
+            for bin_id, qty, hits, count, rank in rows
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_warehouse_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BinAggregate',
+            fields=[
+                ('bin', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aggregate', serialize=False, to='api.storagebin')),
+                ('total_qty', models.FloatField(default=0.0)),
+                ('total_hits', models.IntegerField(default=0)),
+                ('product_count', models.IntegerField(default=0)),
+                ('best_abc', models.CharField(choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], default='C', max_length=1)),
+                ('occupied', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
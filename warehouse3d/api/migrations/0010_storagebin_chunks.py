@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-17 04:20
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_chunks(apps, schema_editor):
+    StorageBin = apps.get_model("api", "StorageBin")
+    size = float(getattr(settings, "BIN_CHUNK_SIZE", 10.0))
+
+    batch = []
+    for b in StorageBin.objects.only("id", "x", "y", "z").iterator(chunk_size=2000):
+        b.chunk_x = math.floor(b.x / size)
+        b.chunk_y = math.floor(b.y / size)
+        b.chunk_z = math.floor(b.z / size)
+        batch.append(b)
+        if len(batch) >= 2000:
+            StorageBin.objects.bulk_update(batch, ["chunk_x", "chunk_y", "chunk_z"])
+            batch = []
+
+    if batch:
+        StorageBin.objects.bulk_update(batch, ["chunk_x", "chunk_y", "chunk_z"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_binaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storagebin',
+            name='chunk_x',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='storagebin',
+            name='chunk_y',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='storagebin',
+            name='chunk_z',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='storagebin',
+            index=models.Index(fields=['warehouse', 'chunk_x', 'chunk_y', 'chunk_z'], name='api_storage_warehou_d08daa_idx'),
+        ),
+        migrations.RunPython(backfill_chunks, migrations.RunPython.noop),
+    ]
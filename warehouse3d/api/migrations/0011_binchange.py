@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 04:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_storagebin_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehouse',
+            name='change_log_floor',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BinChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField()),
+                ('bin_id', models.BigIntegerField()),
+                ('bin_code', models.CharField(max_length=50)),
+                ('op', models.CharField(choices=[('U', 'Upsert'), ('D', 'Delete')], default='U', max_length=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bin_changes', to='api.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['warehouse', 'version'], name='api_binchan_warehou_df5730_idx'), models.Index(fields=['warehouse', 'bin_id'], name='api_binchan_warehou_7dd0d6_idx'), models.Index(fields=['created_at'], name='api_binchan_created_d8941d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_binchange'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storagebin',
+            index=models.Index(fields=['warehouse', 'row', 'shelf', 'level', 'id'], name='api_storage_warehou_9a4e24_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-17 04:45
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_hashes(apps, schema_editor):
+    # Hash files still on disk so new uploads can match them
+    for name in ("PickingHeatmap", "ReplenishmentUpload"):
+        model = apps.get_model("api", name)
+        for upload in model.objects.filter(content_hash__isnull=True):
+            if not upload.file or not upload.file.storage.exists(upload.file.name):
+                continue
+            digest = hashlib.sha256()
+            with upload.file.open("rb") as f:
+                for chunk in f.chunks():
+                    digest.update(chunk)
+            upload.content_hash = digest.hexdigest()
+            upload.save(update_fields=["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_upload_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickingheatmap',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='replenishmentupload',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_upload_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('confirm_date', models.DateField()),
+                ('auom', models.CharField(max_length=10)),
+                ('qty', models.FloatField(default=0.0)),
+                ('bin_code', models.CharField(blank=True, default='', max_length=50)),
+                ('sku', models.CharField(blank=True, default='', max_length=50)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='api.pickingheatmap')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['upload', 'confirm_date', 'auom'], name='api_pickeve_upload__2af2bb_idx')],
+            },
+        ),
+    ]
@@ -13,6 +13,14 @@ class Warehouse(models.Model):
     bounds_y = models.FloatField(default=50.0)
     bounds_z = models.FloatField(default=160.0)
 
+    # Bumped by every write to this warehouse's bins / stock.
+    # Read APIs derive their ETag from it.
+    data_version = models.PositiveBigIntegerField(default=0)
+
+    # Versions up to here have been compacted out of BinChange;
+    # delta clients older than this must do a full reload.
+    change_log_floor = models.PositiveBigIntegerField(default=0)
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
@@ -102,18 +110,40 @@ class StorageBin(models.Model):
         db_index=True
     )
 
+    # Spatial chunk cell (see services/spatial_chunks.py)
+    chunk_x = models.IntegerField(default=0)
+    chunk_y = models.IntegerField(default=0)
+    chunk_z = models.IntegerField(default=0)
+
     class Meta:
         unique_together = ("warehouse", "bin_code")
         indexes = [
             models.Index(fields=["warehouse", "bin_code"]),
             models.Index(fields=["zone"]),
             models.Index(fields=["row", "shelf", "level"]),
+            models.Index(fields=["warehouse", "chunk_x", "chunk_y", "chunk_z"]),
+            # Keyset pagination order (services/bin_pagination.py)
+            models.Index(fields=["warehouse", "row", "shelf", "level", "id"]),
         ]
 
 
     def __str__(self):
         return f"{self.bin_code} ({self.warehouse.code})"
 
+    def assign_chunk(self):
+        from .services.spatial_chunks import chunk_of
+
+        self.chunk_x, self.chunk_y, self.chunk_z = chunk_of(self.x, self.y, self.z)
+
+    def save(self, *args, **kwargs):
+        self.assign_chunk()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"x", "y", "z"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"chunk_x", "chunk_y", "chunk_z"}
+
+        super().save(*args, **kwargs)
+
 
 # ============================================================
 # BIN STOCK (MULTI-PRODUCT PER BIN)
@@ -158,6 +188,82 @@ class BinStock(models.Model):
         return f"{self.bin.bin_code} → {self.product.sku}"
 
 
+# ============================================================
+# BIN AGGREGATE (DENORMALIZED STOCK ROLLUP PER BIN)
+# ============================================================
+
+class BinAggregate(models.Model):
+    """
+    Per-bin rollup of BinStock, kept in step with every stock write
+    (see services/bin_aggregates.py). Read APIs join this 1:1 instead
+    of summing BinStock on each request.
+    """
+    bin = models.OneToOneField(
+        StorageBin,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="aggregate"
+    )
+
+    total_qty = models.FloatField(default=0.0)
+    total_hits = models.IntegerField(default=0)
+    product_count = models.IntegerField(default=0)
+
+    best_abc = models.CharField(
+        max_length=1,
+        choices=[("A", "A"), ("B", "B"), ("C", "C")],
+        default="C"
+    )
+    occupied = models.BooleanField(default=False)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Aggregate - {self.bin.bin_code}"
+
+
+# ============================================================
+# BIN CHANGE LOG (DELTA SYNC)
+# ============================================================
+
+class BinChange(models.Model):
+    """
+    One row per bin touched by a write, tagged with the warehouse
+    data version that write produced. Stock changes are logged
+    against their bin. bin_id is not a foreign key so deletes survive.
+    """
+    OP_UPSERT = "U"
+    OP_DELETE = "D"
+
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        related_name="bin_changes"
+    )
+
+    version = models.PositiveBigIntegerField()
+    bin_id = models.BigIntegerField()
+    bin_code = models.CharField(max_length=50)
+
+    op = models.CharField(
+        max_length=1,
+        choices=[(OP_UPSERT, "Upsert"), (OP_DELETE, "Delete")],
+        default=OP_UPSERT
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["warehouse", "version"]),
+            models.Index(fields=["warehouse", "bin_id"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.bin_code} {self.op} @ {self.version}"
+
+
 # ============================================================
 # SNAPSHOT MASTER (HISTORY)
 # ============================================================
@@ -228,6 +334,67 @@ class BinSnapshot(models.Model):
         return f"{self.bin_code} @ {self.snapshot.version}"
 
 
+# ============================================================
+# UPLOAD JOB (BACKGROUND EXCEL IMPORT QUEUE)
+# ============================================================
+
+class UploadJob(models.Model):
+    """
+    A stored upload waiting for, or being processed by, a
+    run_upload_worker process (see services/upload_jobs.py).
+    Progress fields are written after every committed batch.
+    """
+    KIND_BINS = "bins"
+    KIND_BIN_PRODUCTS = "bin_products"
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    kind = models.CharField(
+        max_length=20,
+        choices=[(KIND_BINS, "Bins"), (KIND_BIN_PRODUCTS, "Bin products")]
+    )
+    file = models.FileField(upload_to="upload_jobs/")
+
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            (STATUS_QUEUED, "Queued"),
+            (STATUS_RUNNING, "Running"),
+            (STATUS_DONE, "Done"),
+            (STATUS_FAILED, "Failed"),
+        ],
+        default=STATUS_QUEUED
+    )
+
+    rows_total = models.IntegerField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    rows_imported = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+
+    # First errors only; error_count has the full count
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True, default="")
+
+    worker = models.CharField(max_length=100, blank=True, default="")
+    attempts = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+
 
 # Analytics
 from django.db import models
@@ -236,9 +403,40 @@ class PickingHeatmap(models.Model):
     file = models.FileField(upload_to="picking_heatmap/")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # SHA-256 of the file; identical uploads reuse this record
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
     def __str__(self):
         return f"Picking Heatmap {self.id} - {self.uploaded_at.date()}"
 
+
+class PickEvent(models.Model):
+    """
+    One confirmed pick of a PickingHeatmap upload, parsed once on
+    upload (see services/pick_events.py). The dashboard aggregates
+    these with GROUP BY instead of re-reading the workbook.
+    """
+    upload = models.ForeignKey(
+        PickingHeatmap,
+        on_delete=models.CASCADE,
+        related_name="events"
+    )
+
+    confirm_date = models.DateField()
+    auom = models.CharField(max_length=10)
+    qty = models.FloatField(default=0.0)
+
+    bin_code = models.CharField(max_length=50, blank=True, default="")
+    sku = models.CharField(max_length=50, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["upload", "confirm_date", "auom"]),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} {self.qty} {self.auom} @ {self.confirm_date}"
+
 from django.db import models
 
 
@@ -246,5 +444,8 @@ class ReplenishmentUpload(models.Model):
     file = models.FileField(upload_to="replenishment/")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # SHA-256 of the file; identical uploads reuse this record
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
     def __str__(self):
         return f"Replenishment Upload {self.id}"
@@ -0,0 +1,61 @@
+import hashlib
+
+from .columnar_cache import cached_frame
+
+
+# ============================================================
+# ANALYTICS UPLOADS (CONTENT-ADDRESSED)
+# ============================================================
+#
+# The picking / replenishment dashboards receive the same export over
+# and over. Uploads are hashed (SHA-256) on arrival:
+#
+#   store_upload()   an identical file reuses the existing record
+#                    (and its stored file) instead of saving a copy
+#   parsed_frame()   the cleaned DataFrame of a file, kept in the
+#                    columnar cache (services/columnar_cache.py) under
+#                    its hash, so a known file is never re-parsed
+#
+# Entries are keyed by content, so they can never go stale.
+
+# Bump when a parser's output changes, to orphan old entries
+PARSER_VERSION = 1
+
+
+def content_hash(f):
+    digest = hashlib.sha256()
+    for chunk in f.chunks():
+        digest.update(chunk)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def store_upload(model, uploaded_file):
+    """
+    (instance, created): the existing record for identical content if
+    its file is still on disk, else a newly saved one.
+    """
+    digest = content_hash(uploaded_file)
+
+    for existing in model.objects.filter(content_hash=digest).order_by("id"):
+        if existing.file and existing.file.storage.exists(existing.file.name):
+            return existing, False
+
+    return model.objects.create(file=uploaded_file, content_hash=digest), True
+
+
+def parsed_frame(instance, parser, parse, columns=None, filters=None):
+    """
+    parse(path) -> DataFrame for the upload's file, computed once per
+    distinct content. `parser` names the parse step in the cache key;
+    columns / filters are applied on read (see cached_frame).
+    """
+    return cached_frame(
+        instance.file.path,
+        parser,
+        parse,
+        columns=columns,
+        filters=filters,
+        digest=instance.content_hash,
+        version=PARSER_VERSION,
+    )
@@ -0,0 +1,118 @@
+import math
+
+from django.db.models import BooleanField, CharField, F, FloatField, IntegerField, Value
+from django.db.models.functions import Coalesce
+
+from ..models import BinAggregate, StorageBin
+from .bin_metrics import with_bin_metrics, abc_from_rank
+
+
+AGGREGATE_BATCH = 2000
+AGGREGATE_FIELDS = ["total_qty", "total_hits", "product_count", "best_abc", "occupied"]
+
+
+def _chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _compute(bin_qs):
+    rows = (
+        with_bin_metrics(bin_qs)
+        .order_by()
+        .values_list("id", "total_qty", "total_hits", "product_count", "abc_rank")
+    )
+    for bin_id, qty, hits, count, rank in rows:
+        yield BinAggregate(
+            bin_id=bin_id,
+            total_qty=qty,
+            total_hits=hits,
+            product_count=count,
+            best_abc=abc_from_rank(rank),
+            occupied=qty > 0,
+        )
+
+
+def _upsert(objs):
+    BinAggregate.objects.bulk_create(
+        objs,
+        batch_size=AGGREGATE_BATCH,
+        update_conflicts=True,
+        unique_fields=["bin"],
+        update_fields=AGGREGATE_FIELDS + ["updated_at"],
+    )
+
+
+def refresh_bin_aggregates(bin_ids):
+    """
+    Recompute the aggregate rows of the given bins from BinStock.
+    Call inside the same transaction as the BinStock writes.
+    """
+    ids = sorted({i for i in bin_ids if i is not None})
+    for chunk in _chunks(ids, AGGREGATE_BATCH):
+        _upsert(list(_compute(StorageBin.objects.filter(id__in=chunk))))
+
+
+def _bin_ids(warehouse_ids=None):
+    qs = StorageBin.objects.order_by("id")
+    if warehouse_ids:
+        qs = qs.filter(warehouse_id__in=warehouse_ids)
+    return list(qs.values_list("id", flat=True))
+
+
+def rebuild_bin_aggregates(warehouse_ids=None):
+    """
+    Drop and recompute aggregates from scratch.
+    Returns the number of bins rebuilt.
+    """
+    stale = BinAggregate.objects.all()
+    if warehouse_ids:
+        stale = stale.filter(bin__warehouse_id__in=warehouse_ids)
+    stale.delete()
+
+    ids = _bin_ids(warehouse_ids)
+    refresh_bin_aggregates(ids)
+    return len(ids)
+
+
+def verify_bin_aggregates(warehouse_ids=None):
+    """
+    Compare stored aggregates against a fresh computation.
+    Returns a list of (bin_id, field, stored, expected).
+    """
+    mismatches = []
+
+    for chunk in _chunks(_bin_ids(warehouse_ids), AGGREGATE_BATCH):
+        stored = BinAggregate.objects.in_bulk(chunk)
+
+        for expected in _compute(StorageBin.objects.filter(id__in=chunk)):
+            current = stored.get(expected.bin_id)
+            if current is None:
+                mismatches.append((expected.bin_id, "missing", None, None))
+                continue
+
+            for field in AGGREGATE_FIELDS:
+                have = getattr(current, field)
+                want = getattr(expected, field)
+                same = (
+                    math.isclose(have, want, rel_tol=1e-9, abs_tol=1e-9)
+                    if field == "total_qty" else have == want
+                )
+                if not same:
+                    mismatches.append((expected.bin_id, field, have, want))
+
+    return mismatches
+
+
+def with_stored_metrics(qs):
+    """
+    Annotate a StorageBin queryset with the stored aggregate columns
+    (1:1 join, no GROUP BY). Bins without an aggregate row read as empty.
+    """
+    return qs.annotate(
+        total_qty=Coalesce(F("aggregate__total_qty"), Value(0.0), output_field=FloatField()),
+        total_hits=Coalesce(F("aggregate__total_hits"), Value(0), output_field=IntegerField()),
+        product_count=Coalesce(F("aggregate__product_count"), Value(0), output_field=IntegerField()),
+        best_abc=Coalesce(F("aggregate__best_abc"), Value("C"), output_field=CharField()),
+        occupied=Coalesce(F("aggregate__occupied"), Value(False), output_field=BooleanField()),
+    )
@@ -0,0 +1,116 @@
+import json
+import struct
+
+import numpy as np
+
+
+# ============================================================
+# COLUMNAR BINARY BIN PAYLOAD
+# ============================================================
+#
+# Layout (all little-endian):
+#
+#   [0:4]        magic b"WHB1"
+#   [4:8]        uint32 header length H (multiple of 4)
+#   [8:8+H]      UTF-8 JSON header, space padded
+#   [8+H:]       column data; every column starts on a 4-byte boundary
+#
+# The header lists each column with its dtype, components per bin
+# and byte offset relative to the start of the column data, so the
+# browser can wrap them directly in Float32Array / Uint32Array / ...
+# without copying.
+#
+# Strings are dictionary encoded: the header carries the distinct
+# values ("abc", "zones") and the column holds indexes into them.
+
+MAGIC = b"WHB1"
+CONTENT_TYPE = "application/octet-stream"
+
+ABC_CODES = ["A", "B", "C"]
+_ABC_INDEX = {abc: i for i, abc in enumerate(ABC_CODES)}
+
+# name, numpy dtype, JS typed array, components per bin
+COLUMNS = [
+    ("position", "<f4", "Float32Array", 3),
+    ("dimensions", "<f4", "Float32Array", 3),
+    ("qty", "<f4", "Float32Array", 1),
+    ("hits", "<u4", "Uint32Array", 1),
+    ("layout", "<u2", "Uint16Array", 3),
+    ("abc", "u1", "Uint8Array", 1),
+    ("zone", "<u2", "Uint16Array", 1),
+]
+
+MAX_ZONES = 0xFFFF + 1
+
+
+def _pad4(n):
+    return (4 - n % 4) % 4
+
+
+def pack_bins(rows, warehouse_code=None):
+    """
+    rows: iterable of
+      (bin_code, x, y, z, width, height, depth, qty, hits, abc,
+       row, shelf, level, zone)
+
+    Returns the packed payload as bytes.
+    """
+    rows = list(rows)
+    count = len(rows)
+
+    bin_codes = [r[0] for r in rows]
+
+    # Distinct zones in first-seen order; None (no zone) included
+    zone_index = {}
+    for r in rows:
+        zone_index.setdefault(r[13], len(zone_index))
+    if len(zone_index) > MAX_ZONES:
+        raise ValueError(f"More than {MAX_ZONES} distinct zones")
+
+    columns = {
+        "position": np.array([r[1:4] for r in rows], dtype="<f4").reshape(count, 3),
+        "dimensions": np.array([r[4:7] for r in rows], dtype="<f4").reshape(count, 3),
+        "qty": np.array([r[7] or 0 for r in rows], dtype="<f4"),
+        "hits": np.clip(
+            np.array([r[8] or 0 for r in rows], dtype=np.int64), 0, 0xFFFFFFFF
+        ).astype("<u4"),
+        "layout": np.clip(
+            np.array([r[10:13] for r in rows], dtype=np.int64).reshape(count, 3),
+            0, 0xFFFF,
+        ).astype("<u2"),
+        "abc": np.array(
+            [_ABC_INDEX.get(r[9], _ABC_INDEX["C"]) for r in rows], dtype="u1"
+        ),
+        "zone": np.array([zone_index[r[13]] for r in rows], dtype="<u2"),
+    }
+
+    chunks = []
+    descriptors = {}
+    offset = 0
+
+    for name, dtype, js_type, size in COLUMNS:
+        data = np.ascontiguousarray(columns[name], dtype=dtype).tobytes()
+        descriptors[name] = {
+            "type": js_type,
+            "size": size,
+            "offset": offset,
+            "length": count * size,
+        }
+        chunks.append(data)
+        pad = _pad4(len(data))
+        if pad:
+            chunks.append(b"\x00" * pad)
+        offset += len(data) + pad
+
+    header = json.dumps({
+        "version": 1,
+        "warehouse": warehouse_code,
+        "count": count,
+        "abc": ABC_CODES,
+        "zones": list(zone_index),
+        "bin_codes": bin_codes,
+        "columns": descriptors,
+    }, separators=(",", ":")).encode("utf-8")
+    header += b" " * _pad4(len(header))
+
+    return b"".join([MAGIC, struct.pack("<I", len(header)), header, *chunks])
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, close_old_connections
+
+from .bin_serializer import dumps
+
+
+# ============================================================
+# LIVE BIN EVENTS (SSE) FROM THE SHARED CHANGE LOG
+# ============================================================
+#
+# Every write bumps the warehouse data_version and appends BinChange
+# rows in its transaction (data_version.bump_data_version), so the
+# database already is the channel all processes share. In each
+# process, one poller per subscribed warehouse checks data_version
+# every EVENT_POLL_SECONDS; when it moved, the bins changed since the
+# last version it saw are read from the change log and published as
+# one event. The event is serialized once and the same bytes are
+# handed to every local subscriber queue via its event loop.
+#
+# A commit in the same process wakes the pollers at once; writes made
+# by other workers, the upload job runner or SAP sync are picked up
+# on the next poll. SSE responses themselves never touch the database.
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+EVENT_POLL_SECONDS = 1.0
+
+# Above this many bins a write is announced as "reload" instead of
+# shipping every bin row through the stream.
+MAX_EVENT_BINS = 500
+
+
+def format_sse(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {dumps(data).decode()}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscription:
+    def __init__(self, key, loop):
+        self.key = key
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+
+class BinEventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        # warehouse code -> (poll task, wake-up event, its loop)
+        self._pollers = {}
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def subscribe(self, warehouse_code):
+        loop = asyncio.get_running_loop()
+        sub = Subscription(warehouse_code.upper(), loop)
+        with self._lock:
+            self._subscribers[sub.key].add(sub)
+            if sub.key not in self._pollers:
+                wakeup = asyncio.Event()
+                task = loop.create_task(self._poll(sub.key, wakeup))
+                self._pollers[sub.key] = (task, wakeup, loop)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.key)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.key]
+                    task, _, _ = self._pollers.pop(sub.key)
+                    task.cancel()
+
+    def wake(self):
+        """
+        Poll now instead of at the next tick (after a local commit).
+        Safe to call from any thread.
+        """
+        with self._lock:
+            pollers = list(self._pollers.values())
+
+        for _, wakeup, loop in pollers:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass
+
+    def publish(self, warehouse_code, message):
+        """
+        Push pre-encoded SSE bytes to every subscriber of a warehouse.
+        Safe to call from any thread.
+        """
+        with self._lock:
+            subs = list(self._subscribers.get(warehouse_code.upper(), ()))
+
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(_offer, sub.queue, message)
+            except RuntimeError:
+                # Loop already closed; the stream's finally will unsubscribe
+                pass
+
+    async def _poll(self, key, wakeup):
+        version = None
+        while True:
+            try:
+                if version is None:
+                    version = await sync_to_async(current_version)(key)
+                else:
+                    version, message = await sync_to_async(poll_event)(key, version)
+                    if message is not None:
+                        self.publish(key, message)
+            except DatabaseError:
+                # Drop a broken connection; retried on the next tick
+                logger.warning("Bin event poll failed for %s", key, exc_info=True)
+                await sync_to_async(close_old_connections)()
+            except Exception:
+                # Anything else would end this warehouse's events for
+                # good; log it and keep polling
+                logger.exception("Bin event poll failed for %s", key)
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=EVENT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+
+
+_RELOAD = format_sse("reload", {"reason": "slow consumer"})
+
+
+def _offer(queue, message):
+    if queue.full():
+        # Client fell behind: drop the backlog and tell it to reload
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_RELOAD)
+        return
+    queue.put_nowait(message)
+
+
+broker = BinEventBroker()
+
+
+def current_version(warehouse_code):
+    from ..models import Warehouse
+
+    version = (
+        Warehouse.objects
+        .filter(code__iexact=warehouse_code)
+        .values_list("data_version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def poll_event(warehouse_code, since):
+    """
+    (version, SSE message) for the writes committed after version
+    `since`; the message is None when there are none.
+    """
+    from ..models import StorageBin, Warehouse
+    from .bin_serializer import event_bins
+    from .change_log import changes_since
+
+    row = (
+        Warehouse.objects
+        .filter(code__iexact=warehouse_code)
+        .values_list("id", "code", "data_version", "change_log_floor")
+        .first()
+    )
+    if row is None or row[2] <= since:
+        return since, None
+    wid, code, version, floor = row
+
+    if since < floor:
+        # Changes since then were compacted away
+        return version, format_sse("reload", {"warehouse": code, "version": version}, version)
+
+    upserted, deleted = changes_since(wid, since)
+    if len(upserted) > MAX_EVENT_BINS:
+        return version, format_sse("reload", {"warehouse": code, "version": version}, version)
+
+    bins = event_bins.serialize(StorageBin.objects.filter(id__in=upserted)) if upserted else []
+    # A code deleted and re-created under a new id is an update
+    current = {b["bin_code"] for b in bins}
+
+    return version, format_sse("bins", {
+        "warehouse": code,
+        "version": version,
+        "bins": bins,
+        "deleted": sorted(set(deleted) - current),
+    }, version)
@@ -1,17 +1,27 @@
-import pandas as pd
-import numpy as np
 from pathlib import Path
 
+from .columnar_cache import cached_frame
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 FILES = {
     "xyz": BASE_DIR / "data/XYZ bin coordinates.xlsx",
     "stock": BASE_DIR / "data/STOCK in bin file.xlsx",
     "outbound": BASE_DIR / "data/OUTBOUND GI Completed Data.xlsx",
+    "gr_gi": BASE_DIR / "data/GR GI tasks history data.xlsx",
 }
 
+def load_reference(name, columns=None, filters=None):
+    """
+    A reference workbook, parsed once per file content into the
+    columnar cache; only `columns` / rows matching `filters` are read.
+    """
+    return cached_frame(FILES[name], f"reference-{name}", columns=columns, filters=filters)
+
 def load_xyz_bins():
-    df = pd.read_excel(FILES["xyz"])
+    df = load_reference(
+        "xyz", columns=["Storage Bin", "X Coordinate", "Y Coordinate", "Z Coordinate"]
+    )
     df = df.rename(columns={
         "Storage Bin": "bin",
         "X Coordinate": "x",
@@ -22,7 +32,7 @@ def load_xyz_bins():
     return df[["bin", "x", "y", "z"]]
 
 def load_stock_per_bin():
-    df = pd.read_excel(FILES["stock"])
+    df = load_reference("stock", columns=["Storage Bin", "Quantity"])
 
     # If quantity column exists, use it; otherwise count rows
     if "Quantity" in df.columns:
@@ -35,7 +45,7 @@ def load_stock_per_bin():
     return stock
 
 def load_hits_per_bin():
-    df = pd.read_excel(FILES["outbound"])
+    df = load_reference("outbound", columns=["Storage Bin"])
 
     # Each row = one completed outbound movement
     hits = df.groupby("Storage Bin").size().reset_index(name="hits")
@@ -43,6 +53,11 @@ def load_hits_per_bin():
 
     return hits
 
+def load_gr_gi_tasks(columns=None, filters=None):
+    # Warehouse task history (GR / GI), e.g.
+    # filters=[("Confirmation Date", ">=", pd.Timestamp("2025-01-01"))]
+    return load_reference("gr_gi", columns=columns, filters=filters)
+
 def build_bin_base_table():
     xyz = load_xyz_bins()
     stock = load_stock_per_bin()
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from ..models import StorageBin, Warehouse
+from .spatial_chunks import CHUNK_SIZE
+
+
+# ============================================================
+# BULK BIN IMPORT (EXCEL "Bins" SHEET)
+# ============================================================
+#
+# Column-wise pipeline: the whole DataFrame is normalized and
+# validated with vectorized pandas ops, warehouses are resolved in
+# one query, and bins are upserted in chunks with
+# bulk_create(update_conflicts=True). A chunk that fails is retried
+# row by row so the error lands on the Excel row that caused it.
+
+BIN_CHUNK = 2000
+
+# Optional numeric columns and the value used when absent / blank
+BIN_DEFAULTS = {
+    "x": 0.0,
+    "y": 0.0,
+    "z": 0.0,
+    "width": 1.2,
+    "height": 0.7,
+    "depth": 1.2,
+}
+LAYOUT_COLUMNS = ("row", "shelf", "level")
+
+REQUIRED_COLUMNS = {"warehouse_code", "bin_code", *LAYOUT_COLUMNS}
+
+UPDATE_FIELDS = [
+    "row", "shelf", "level",
+    "x", "y", "z", "width", "height", "depth",
+    "zone", "chunk_x", "chunk_y", "chunk_z",
+]
+
+CODE_MAX_LENGTH = 50
+
+
+def norm_column(series):
+    """
+    Vectorized views.norm(): blank for NaN, else stripped upper-case text.
+    Each distinct value is normalized once (codes repeat a lot).
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = np.asarray(uniques, dtype=object).tolist()
+    normalized = np.array([str(v).strip().upper() for v in uniques] + [""], dtype=object)
+    # NaN factorizes to -1, i.e. the trailing ""
+    return pd.Series(normalized[codes], index=series.index)
+
+
+class RowErrors:
+    """
+    First error per DataFrame position; reported with Excel row numbers
+    (header is row 1). `index` is the frame's index: position in the
+    sheet's data rows, as pd.read_excel and excel_reader number them.
+    """
+
+    def __init__(self, index):
+        self.rows = np.asarray(index, dtype=np.int64) + 2
+        self.messages = np.full(len(self.rows), "", dtype=object)
+        self._ok = np.ones(len(self.rows), dtype=bool)
+
+    def flag(self, mask, message):
+        mask = np.asarray(mask, dtype=bool) & self._ok
+        self.messages[mask] = message
+        self._ok[mask] = False
+
+    def add(self, position, message):
+        if self._ok[position]:
+            self.messages[position] = message
+            self._ok[position] = False
+
+    @property
+    def ok(self):
+        return self._ok.copy()
+
+    def report(self, context=None):
+        """
+        context: {key: Series} of raw values echoed on each error
+        """
+        messages = self.messages
+        bad = np.flatnonzero(~self._ok)
+
+        # Whole columns at once; NaN / None echoed as None
+        columns = {"row": self.rows[bad].tolist()}
+        for key, values in (context or {}).items():
+            picked = np.asarray(values, dtype=object)[bad]
+            columns[key] = np.where(pd.isna(picked), None, picked).tolist()
+        columns["error"] = messages[bad].tolist()
+
+        keys = list(columns)
+        return [dict(zip(keys, entry)) for entry in zip(*columns.values())]
+
+
+def _numeric(df, column, errors, default):
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=np.float64)
+    raw = df[column]
+    values = pd.to_numeric(raw, errors="coerce")
+    errors.flag(raw.notna() & values.isna(), f"{column} must be a number")
+    return values.fillna(default).to_numpy(dtype=np.float64)
+
+
+def _resolve_warehouses(codes):
+    """
+    code -> id for every code, creating missing warehouses in one insert.
+    """
+    found = dict(Warehouse.objects.filter(code__in=codes).values_list("code", "id"))
+    missing = [c for c in codes if c not in found]
+    if missing:
+        Warehouse.objects.bulk_create(
+            [Warehouse(code=c, name=c) for c in missing],
+            ignore_conflicts=True,
+        )
+        found.update(Warehouse.objects.filter(code__in=missing).values_list("code", "id"))
+    return found
+
+
+def _upsert(objs):
+    StorageBin.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["warehouse", "bin_code"],
+        update_fields=UPDATE_FIELDS,
+    )
+
+
+def _bin_ids(objs):
+    """
+    Ids of upserted bins. Backends that RETURNING-fill pks on upsert
+    already set them; otherwise look them up by natural key.
+    """
+    if all(o.pk for o in objs):
+        return [o.pk for o in objs]
+
+    by_warehouse = {}
+    for o in objs:
+        by_warehouse.setdefault(o.warehouse_id, []).append(o.bin_code)
+
+    ids = []
+    for wid, codes in by_warehouse.items():
+        ids.extend(
+            StorageBin.objects
+            .filter(warehouse_id=wid, bin_code__in=codes)
+            .values_list("id", flat=True)
+        )
+    return ids
+
+
+def prepare_bins(df):
+    """
+    Normalized frame (one row per sheet row: codes, layout, geometry,
+    zone, chunk cells) and the RowErrors of rows that failed validation.
+    """
+    errors = RowErrors(df.index)
+    df = df.reset_index(drop=True)
+
+    frame = pd.DataFrame({
+        "warehouse_code": norm_column(df["warehouse_code"]),
+        "bin_code": norm_column(df["bin_code"]),
+    })
+    errors.flag(frame["warehouse_code"] == "", "warehouse_code is required")
+    errors.flag(frame["bin_code"] == "", "bin_code is required")
+    errors.flag(frame["warehouse_code"].str.len() > CODE_MAX_LENGTH, f"warehouse_code longer than {CODE_MAX_LENGTH}")
+    errors.flag(frame["bin_code"].str.len() > CODE_MAX_LENGTH, f"bin_code longer than {CODE_MAX_LENGTH}")
+
+    for column in LAYOUT_COLUMNS:
+        values = pd.to_numeric(df[column], errors="coerce")
+        errors.flag(values.isna() | (values != np.floor(values)), f"{column} must be an integer")
+        frame[column] = values.fillna(0).to_numpy().astype(np.int64)
+
+    for column, default in BIN_DEFAULTS.items():
+        frame[column] = _numeric(df, column, errors, default)
+
+    if "zone" in df.columns:
+        frame["zone"] = norm_column(df["zone"])
+        errors.flag(frame["zone"].str.len() > CODE_MAX_LENGTH, f"zone longer than {CODE_MAX_LENGTH}")
+    else:
+        frame["zone"] = ""
+
+    for axis in ("x", "y", "z"):
+        frame[f"chunk_{axis}"] = np.floor(frame[axis] / CHUNK_SIZE).astype(np.int64)
+
+    return frame, errors
+
+
+def import_bins(df):
+    """
+    Upsert the rows of a "Bins" sheet.
+
+    Returns (created, errors, warehouse_ids, bin_ids); `errors` is the
+    usual [{"row": <excel row>, "error": ...}] list. Run inside a
+    transaction: each chunk is its own savepoint.
+    """
+    frame, errors = prepare_bins(df)
+    wh_codes = frame["warehouse_code"]
+    bin_codes = frame["bin_code"]
+
+    valid = np.flatnonzero(errors.ok)
+    warehouse_ids = _resolve_warehouses(sorted(set(wh_codes.iloc[valid])))
+
+    # Last row wins for a repeated (warehouse, bin_code), as with the
+    # row-by-row update_or_create this replaces
+    rows_by_key = {}
+    for pos in valid.tolist():
+        rows_by_key.setdefault((wh_codes.iat[pos], bin_codes.iat[pos]), []).append(pos)
+
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+
+    def build(key, pos):
+        wh_code, bin_code = key
+        return StorageBin(
+            warehouse_id=warehouse_ids[wh_code],
+            bin_code=bin_code,
+            row=int(columns["row"][pos]),
+            shelf=int(columns["shelf"][pos]),
+            level=int(columns["level"][pos]),
+            x=float(columns["x"][pos]),
+            y=float(columns["y"][pos]),
+            z=float(columns["z"][pos]),
+            width=float(columns["width"][pos]),
+            height=float(columns["height"][pos]),
+            depth=float(columns["depth"][pos]),
+            zone=columns["zone"][pos] or None,
+            chunk_x=int(columns["chunk_x"][pos]),
+            chunk_y=int(columns["chunk_y"][pos]),
+            chunk_z=int(columns["chunk_z"][pos]),
+        )
+
+    keys = list(rows_by_key)
+    created = 0
+    touched = set()
+    bin_ids = set()
+
+    for start in range(0, len(keys), BIN_CHUNK):
+        chunk = keys[start:start + BIN_CHUNK]
+        objs = [build(key, rows_by_key[key][-1]) for key in chunk]
+
+        try:
+            with transaction.atomic():
+                _upsert(objs)
+            written = list(zip(chunk, objs))
+        except Exception:
+            # Find the offending rows one at a time
+            written = []
+            for key, obj in zip(chunk, objs):
+                try:
+                    with transaction.atomic():
+                        _upsert([obj])
+                    written.append((key, obj))
+                except Exception as e:
+                    for pos in rows_by_key[key]:
+                        errors.add(pos, str(e))
+
+        bin_ids.update(_bin_ids([obj for _, obj in written]))
+        for key, obj in written:
+            created += len(rows_by_key[key])
+            touched.add(obj.warehouse_id)
+
+    return created, errors.report(), touched, bin_ids
@@ -0,0 +1,136 @@
+import numpy as np
+
+from ..models import StorageBin
+from .bin_aggregates import with_stored_metrics
+
+
+# ============================================================
+# GEOMETRY-GROUPED PAYLOAD FOR INSTANCED RENDERING
+# ============================================================
+#
+# Bins are grouped by geometry class: (width, height, depth) to the
+# millimetre, plus the warehouse's rack type. Each class carries one
+# dimensions record and flat per-instance arrays:
+#
+#   positions   [x0, y0, z0, x1, y1, z1, ...]   world coordinates
+#   colors      [0xRRGGBB, ...]                  for setColorAt()
+#   bin_codes   [...]                            instanceId -> bin
+#
+# so the viewer draws each class with a single THREE.InstancedMesh.
+# Colours mirror the viewer's overlay palettes in static/js/script.js.
+
+COLOR_MODES = ("occupancy", "abc", "heat")
+
+EMPTY_BIN_COLOR = 0x89837E
+OCCUPIED_BIN_COLOR = 0x2ECC71
+
+ABC_COLORS = {"A": 0xE74C3C, "B": 0x2ECC71, "C": 0x1E3CFF}
+ABC_SCORES = {"A": 1.0, "B": 0.6, "C": 0.3}
+
+HEAT_WEIGHTS = {"abc": 0.4, "hits": 0.35, "qty": 0.25}
+HEAT_GRADIENT = [
+    (0.0, 0x1E3CFF),  # blue (cold)
+    (0.3, 0x00722F),  # green
+    (0.6, 0xF1C40F),  # yellow
+    (0.8, 0xE67E22),  # orange
+    (1.0, 0xE74C3C),  # red (hot)
+]
+
+
+def _rgb(hex_colors):
+    hex_colors = np.asarray(hex_colors, dtype=np.int64)
+    return np.stack(
+        [(hex_colors >> 16) & 0xFF, (hex_colors >> 8) & 0xFF, hex_colors & 0xFF],
+        axis=-1,
+    ).astype(np.float64)
+
+
+def _hex(rgb):
+    rgb = np.clip(np.rint(rgb), 0, 255).astype(np.int64)
+    return (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+
+def _normalize(values):
+    lo, hi = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+    if hi == lo:
+        hi = lo + 1
+    return np.clip((values - lo) / (hi - lo), 0, 1)
+
+
+def heat_colors(qty, hits, abc):
+    """
+    Same score as the viewer's computeHeat(), mapped on HEAT_GRADIENT.
+    """
+    abc_score = np.array([ABC_SCORES.get(a, 0.1) for a in abc])
+    heat = (
+        HEAT_WEIGHTS["abc"] * abc_score
+        + HEAT_WEIGHTS["hits"] * _normalize(hits)
+        + HEAT_WEIGHTS["qty"] * _normalize(qty)
+    )
+
+    stops = np.array([t for t, _ in HEAT_GRADIENT])
+    stop_rgb = _rgb([c for _, c in HEAT_GRADIENT])
+
+    seg = np.clip(np.searchsorted(stops, heat, side="right") - 1, 0, len(stops) - 2)
+    local = ((heat - stops[seg]) / (stops[seg + 1] - stops[seg]))[:, None]
+    return _hex(stop_rgb[seg] + (stop_rgb[seg + 1] - stop_rgb[seg]) * local)
+
+
+def bin_colors(mode, qty, hits, abc, occupied):
+    if mode == "abc":
+        return np.array([ABC_COLORS.get(a, ABC_COLORS["C"]) for a in abc], dtype=np.int64)
+    if mode == "heat":
+        return heat_colors(qty, hits, abc)
+    return np.where(occupied, OCCUPIED_BIN_COLOR, EMPTY_BIN_COLOR)
+
+
+def instanced_payload(wh, rack_type, color_mode="occupancy"):
+    rows = list(
+        with_stored_metrics(StorageBin.objects.filter(warehouse=wh))
+        .order_by("id")
+        .values_list(
+            "bin_code", "x", "y", "z", "width", "height", "depth",
+            "total_qty", "total_hits", "best_abc", "occupied",
+        )
+    )
+
+    payload = {
+        "warehouse": wh.code,
+        "color_mode": color_mode,
+        "count": len(rows),
+        "classes": [],
+    }
+    if not rows:
+        return payload
+
+    codes = [r[0] for r in rows]
+    pos = np.array([r[1:4] for r in rows], dtype=np.float64)
+    dims = np.round(np.array([r[4:7] for r in rows], dtype=np.float64), 3)
+    qty = np.array([r[7] for r in rows], dtype=np.float64)
+    hits = np.array([r[8] for r in rows], dtype=np.float64)
+    abc = [r[9] for r in rows]
+    occupied = np.array([r[10] for r in rows], dtype=bool)
+
+    colors = bin_colors(color_mode, qty, hits, abc, occupied)
+
+    classes, inverse = np.unique(dims, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    # Largest classes first
+    for class_id in np.argsort(-np.bincount(inverse), kind="stable"):
+        members = np.nonzero(inverse == class_id)[0]
+        width, height, depth = classes[class_id].tolist()
+        payload["classes"].append({
+            "geometry": {
+                "width": width,
+                "height": height,
+                "depth": depth,
+                "rack_type": rack_type,
+            },
+            "count": len(members),
+            "bin_codes": [codes[i] for i in members.tolist()],
+            "positions": pos[members].reshape(-1).tolist(),
+            "colors": colors[members].tolist(),
+        })
+
+    return payload
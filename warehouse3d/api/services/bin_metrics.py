@@ -0,0 +1,83 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Case, Count, FloatField, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from ..models import BinStock
+
+
+# Higher rank wins when a bin holds stock of several classes
+ABC_RANK = {"A": 3, "B": 2, "C": 1}
+RANK_TO_ABC = {rank: abc for abc, rank in ABC_RANK.items()}
+
+
+def abc_from_rank(rank):
+    return RANK_TO_ABC.get(rank, "C")
+
+
+def with_bin_metrics(qs):
+    """
+    Annotate a StorageBin queryset with per-bin stock rollups,
+    computed by the database in a single GROUP BY:
+
+      total_qty, total_hits, product_count, abc_rank
+    """
+    return qs.annotate(
+        total_qty=Coalesce(
+            Sum("stocks__quantity"), Value(0.0), output_field=FloatField()
+        ),
+        total_hits=Coalesce(
+            Sum("stocks__hit_count"), Value(0), output_field=IntegerField()
+        ),
+        product_count=Count("stocks"),
+        abc_rank=Coalesce(
+            Max(
+                Case(
+                    *[
+                        When(stocks__abc_class=abc, then=Value(rank))
+                        for abc, rank in ABC_RANK.items()
+                    ],
+                    output_field=IntegerField(),
+                )
+            ),
+            Value(ABC_RANK["C"]),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+# Output key -> BinStock column for product rows
+PRODUCT_COLUMNS = {
+    "sku": "product__sku",
+    "name": "product__name",
+    "batch": "batch",
+    "expiry": "expiry_date",
+    "quantity": "quantity",
+    "image": "product__image_url",
+}
+
+
+def products_by_bin(stock_filter, columns=PRODUCT_COLUMNS):
+    """
+    Fetch product rows for every BinStock matching `stock_filter`
+    in one query and group them by bin id. Only the BinStock columns
+    named in `columns` (output key -> column) are selected.
+    """
+    names = list(columns)
+
+    rows = (
+        BinStock.objects
+        .filter(**stock_filter)
+        .order_by("bin_id", "id")
+        .values_list("bin_id", *columns.values())
+    )
+
+    grouped = defaultdict(list)
+    for bin_id, *values in rows:
+        grouped[bin_id].append({
+            name: value.isoformat() if isinstance(value, date) else value
+            for name, value in zip(names, values)
+        })
+
+    return grouped
@@ -0,0 +1,143 @@
+import base64
+import json
+
+from django.db import connection
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+from ..models import StorageBin
+from .bin_serializer import PAGE_BIN_FIELDS, BinSerializer
+
+
+# ============================================================
+# KEYSET PAGINATION OVER BINS
+# ============================================================
+#
+# Bins are listed in (warehouse, row, shelf, level, id) order. A page
+# cursor is the sort key of the last bin served; the next page is
+# "everything strictly after that key", which the database answers
+# with an index range scan however deep the page is (OFFSET would
+# have to walk and discard every earlier row).
+#
+# The condition is a row-value comparison,
+#
+#   (warehouse_id, row, shelf, level, id) > (%s, %s, %s, %s, %s)
+#
+# which PostgreSQL / SQLite / MySQL use as the start key of a scan on
+# the (warehouse, row, shelf, level, id) index. An OR of per-column
+# terms means the same but is not turned into a range bound.
+
+KEYSET_ORDER = ("warehouse_id", "row", "shelf", "level", "id")
+
+# Backends that compare row values (others get the OR expansion)
+ROW_VALUE_VENDORS = {"postgresql", "sqlite", "mysql"}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(key):
+    raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+    if (
+        not isinstance(key, list)
+        or len(key) != len(KEYSET_ORDER)
+        or not all(isinstance(v, int) and not isinstance(v, bool) for v in key)
+    ):
+        raise InvalidCursor("Malformed cursor")
+
+    return key
+
+
+def _row_value_after(key):
+    table = connection.ops.quote_name(StorageBin._meta.db_table)
+    columns = ", ".join(
+        f"{table}.{connection.ops.quote_name(StorageBin._meta.get_field(f).column)}"
+        for f in KEYSET_ORDER
+    )
+    placeholders = ", ".join(["%s"] * len(KEYSET_ORDER))
+    return RawSQL(f"({columns}) > ({placeholders})", list(key), output_field=BooleanField())
+
+
+def after_key(key):
+    """
+    Condition for rows whose sort key is lexicographically greater
+    than `key`, usable in .filter().
+
+    Where row values are not supported:
+
+      (a > a0) OR (a = a0 AND b > b0) OR (a = a0 AND b = b0 AND c > c0) ...
+
+    ANDed with a >= a0, so the planner still gets a start key on the
+    leading column.
+    """
+    if connection.vendor in ROW_VALUE_VENDORS:
+        return _row_value_after(key)
+
+    condition = Q()
+    for i, field in enumerate(KEYSET_ORDER):
+        term = Q(**{f"{field}__gt": key[i]})
+        for prev, value in zip(KEYSET_ORDER[:i], key[:i]):
+            term &= Q(**{prev: value})
+        condition |= term
+    return Q(**{f"{KEYSET_ORDER[0]}__gte": key[0]}) & condition
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def filtered_bins(warehouse=None, zone=None, abc=None):
+    qs = StorageBin.objects.all()
+    if warehouse:
+        qs = qs.filter(warehouse__code__iexact=warehouse)
+    if zone:
+        qs = qs.filter(zone=zone)
+    if abc:
+        # Bins with no stock yet have no aggregate row; they count as C
+        if abc.upper() == "C":
+            qs = qs.filter(Q(aggregate__best_abc="C") | Q(aggregate__isnull=True))
+        else:
+            qs = qs.filter(aggregate__best_abc=abc.upper())
+    return qs
+
+
+page_bins = BinSerializer(PAGE_BIN_FIELDS, key_columns=KEYSET_ORDER)
+
+
+def bin_page(qs, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One keyset page of `qs`.
+
+    Returns (rows, next_cursor): `rows` are PAGE_BIN_FIELDS dicts,
+    `next_cursor` is None on the last page. Raises InvalidCursor.
+    """
+    if cursor:
+        qs = qs.filter(after_key(decode_cursor(cursor)))
+
+    # Fetch one extra row to learn whether another page exists
+    pairs = list(page_bins.pairs(qs.order_by(*KEYSET_ORDER)[:limit + 1]))
+
+    next_cursor = None
+    if len(pairs) > limit:
+        pairs = pairs[:limit]
+        next_cursor = encode_cursor(pairs[-1][0])
+
+    return [item for _, item in pairs], next_cursor
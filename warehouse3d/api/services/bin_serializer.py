@@ -0,0 +1,305 @@
+import json
+from operator import itemgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .bin_aggregates import AGGREGATE_FIELDS, with_stored_metrics
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+# ============================================================
+# BIN SERIALIZER
+# ============================================================
+#
+# Every bin read API builds its dicts here from values_list() tuples,
+# never from model instances. An endpoint describes its keys as a spec:
+#
+#   output key -> column                     value copied as is
+#   output key -> (column, convert)          convert(value)
+#   output key -> (None, convert)            computed, no column
+#
+# BinSerializer compiles a spec (optionally narrowed to some fields)
+# once: the column list for the query, and positional getters from
+# tuple to dict. Specs with plain columns in query order take a
+# dict(zip()) fast path with no per-key Python work.
+#
+# dumps() uses orjson when installed and falls back to the stdlib.
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def _orjson_default(value):
+    # Decimal, lazy strings, ... as DjangoJSONEncoder would
+    return _django_encoder.default(value)
+
+
+def dumps(payload):
+    """
+    Compact JSON bytes for an API payload.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_orjson_default)
+    return json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+def _entry(spec_value):
+    if isinstance(spec_value, tuple):
+        return spec_value
+    return spec_value, None
+
+
+class BinSerializer:
+    """
+    Compiled tuple -> dict mapping for one spec and field selection.
+
+      key_columns: extra leading columns (ids, grouping keys) returned
+      next to each item by pairs(), not included in the item.
+    """
+
+    def __init__(self, spec, fields=None, key_columns=()):
+        self.fields = tuple(spec if fields is None else fields)
+        self.key_columns = tuple(key_columns)
+
+        columns = list(self.key_columns)
+        for name in self.fields:
+            column, _ = _entry(spec[name])
+            if column and column not in columns:
+                columns.append(column)
+        if not columns:
+            # values_list() with no names would select every column
+            columns.append("id")
+
+        self.columns = tuple(columns)
+        self.needs_metrics = bool(set(columns) & set(AGGREGATE_FIELDS))
+
+        index = {column: i for i, column in enumerate(columns)}
+        self._getters = tuple(
+            (name, index.get(column), convert)
+            for name, (column, convert) in ((n, _entry(spec[n])) for n in self.fields)
+        )
+
+        offset = len(self.key_columns)
+        self._plain = all(
+            convert is None and i == offset + pos
+            for pos, (_, i, convert) in enumerate(self._getters)
+        )
+        self._offset = offset
+        self._keys = (
+            itemgetter(*range(offset)) if offset > 1
+            else (lambda row: (row[0],)) if offset == 1
+            else (lambda row: ())
+        )
+
+    def rows(self, qs):
+        """
+        values_list() tuples for `qs`, with only the needed columns.
+        """
+        if self.needs_metrics:
+            qs = with_stored_metrics(qs)
+        return qs.values_list(*self.columns)
+
+    def item(self, row):
+        if self._plain:
+            return dict(zip(self.fields, row[self._offset:]))
+
+        item = {}
+        for name, i, convert in self._getters:
+            value = row[i] if i is not None else None
+            item[name] = convert(value) if convert else value
+        return item
+
+    def pairs(self, qs):
+        """
+        Yield (keys, item): `keys` is the tuple of key column values.
+        """
+        item, keys = self.item, self._keys
+        for row in self.rows(qs):
+            yield keys(row), item(row)
+
+    def serialize(self, qs):
+        """
+        List of bin dicts for `qs`.
+        """
+        if self._plain and not self._offset:
+            fields = self.fields
+            return [dict(zip(fields, row)) for row in self.rows(qs)]
+        return [self.item(row) for row in self.rows(qs)]
+
+
+# ------------------------------------------------------------
+# Endpoint specs
+# ------------------------------------------------------------
+
+# WarehouseHeatmapAPI
+HEATMAP_BIN_FIELDS = {
+    "bin_code": "bin_code",
+    "row": "row",
+    "shelf": "shelf",
+    "level": "level",
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "width": "width",
+    "height": "height",
+    "depth": "depth",
+    "zone": "zone",
+    "abc": "best_abc",
+    "hits": "total_hits",
+    "qty": "total_qty",
+    "occupied": "occupied",
+}
+
+# bin_heatmap_api (nested row -> shelf -> level)
+BIN_HEATMAP_FIELDS = {
+    "id": "id",
+    "label": "bin_code",
+    "type": (None, lambda _: "container"),
+    "width": "width",
+    "height": "height",
+    "depth": "depth",
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "qty": ("total_qty", int),
+    "hits": "total_hits",
+    "abc": "best_abc",
+    "zone": "zone",
+}
+
+# warehouse_bins_3js
+BINS_3JS_FIELDS = {
+    "bin_code": "bin_code",
+
+    # geometry
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "width": "width",
+    "height": "height",
+    "depth": "depth",
+
+    # logical
+    "row": "row",
+    "shelf": "shelf",
+    "level": "level",
+    "zone": "zone",
+
+    # metrics
+    "product_count": "product_count",
+    "qty": "total_qty",
+    "hits": "total_hits",
+    "abc": "best_abc",
+    "occupied": "occupied",
+}
+
+# warehouse_bins_api
+FLAT_BIN_FIELDS = {
+    "bin_code": "bin_code",
+    "warehouse": "warehouse__code",
+    "row": "row",
+    "shelf": "shelf",
+    "level": "level",
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "width": "width",
+    "height": "height",
+    "depth": "depth",
+    "zone": "zone",
+    "qty": "total_qty",
+    "hits": "total_hits",
+    "abc": "best_abc",
+    "occupied": "occupied",
+}
+
+# warehouse_heatmap_api (layout + metrics, no geometry)
+LAYOUT_BIN_FIELDS = {
+    "bin_code": "bin_code",
+    "row": "row",
+    "shelf": "shelf",
+    "level": "level",
+    "abc": "best_abc",
+    "hits": "total_hits",
+    "qty": "total_qty",
+    "occupied": "occupied",
+    "zone": "zone",
+}
+
+# warehouse_3d_view (debug / legacy)
+VIEW_3D_BIN_FIELDS = {
+    "bin_id": "bin_code",
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "width": "width",
+    "height": "height",
+    "depth": "depth",
+    "qty": "total_qty",
+    "abc": "best_abc",
+    "hits": "total_hits",
+    "occupied": "occupied",
+}
+
+# Spatial chunks
+CHUNK_BIN_FIELDS = {
+    "bin_code": "bin_code",
+    "row": "row",
+    "shelf": "shelf",
+    "level": "level",
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "width": "width",
+    "height": "height",
+    "depth": "depth",
+    "zone": "zone",
+    "abc": "best_abc",
+    "hits": "total_hits",
+    "qty": "total_qty",
+    "occupied": "occupied",
+}
+
+# Delta sync
+DELTA_BIN_FIELDS = {
+    "id": "id",
+    **CHUNK_BIN_FIELDS,
+}
+
+# Live events: layout and geometry included, so the viewer can move /
+# resize a bin without refetching
+EVENT_BIN_FIELDS = {
+    **CHUNK_BIN_FIELDS,
+}
+
+# Keyset pages
+PAGE_BIN_FIELDS = {
+    "id": "id",
+    "bin_code": "bin_code",
+    "row": "row",
+    "shelf": "shelf",
+    "level": "level",
+    "x": "x",
+    "y": "y",
+    "z": "z",
+    "zone": "zone",
+    "total_qty": "total_qty",
+    "total_hits": "total_hits",
+    "product_count": "product_count",
+    "best_abc": "best_abc",
+    "occupied": "occupied",
+    "warehouse_code": "warehouse__code",
+}
+
+
+# Full-field serializers, compiled once
+heatmap_bins = BinSerializer(HEATMAP_BIN_FIELDS)
+flat_bins = BinSerializer(FLAT_BIN_FIELDS)
+layout_bins = BinSerializer(LAYOUT_BIN_FIELDS)
+view_3d_bins = BinSerializer(VIEW_3D_BIN_FIELDS)
+chunk_bins = BinSerializer(CHUNK_BIN_FIELDS, key_columns=("chunk_x", "chunk_y", "chunk_z"))
+delta_bins = BinSerializer(DELTA_BIN_FIELDS)
+event_bins = BinSerializer(EVENT_BIN_FIELDS)
@@ -0,0 +1,368 @@
+import io
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+
+from ..models import BinStock, Product, StorageBin, Warehouse
+from .bin_import import CODE_MAX_LENGTH, RowErrors, norm_column
+
+
+# ============================================================
+# BULK BIN STOCK IMPORT (EXCEL "BinProduct" / "BinStock" SHEETS)
+# ============================================================
+#
+# Both sheets hold the same rows; "BinStock" names the batch column
+# "batch" instead of "odo_number" and may carry an expiry_date, which
+# is only written when the sheet has that column.
+#
+# The sheet is normalized and validated column-wise first. Then:
+#
+#   PostgreSQL   COPY the clean rows into a temporary staging table,
+#                resolve warehouse / bin with set-based joins, insert
+#                missing products in one statement and merge BinStock
+#                with INSERT ... ON CONFLICT.
+#   other DBs    the per-row ORM path (savepoint per row).
+#
+# Rows whose warehouse or bin cannot be resolved are reported with
+# their Excel row number, like validation errors.
+
+STAGING_TABLE = "binproduct_staging"
+
+UOM_MAX_LENGTH = 10
+NAME_MAX_LENGTH = 200
+ABC_CLASSES = ("A", "B", "C")
+
+UNKNOWN_WAREHOUSE = "warehouse not found"
+UNKNOWN_BIN = "bin not found in warehouse"
+
+REQUIRED_COLUMNS = {"warehouse_code", "bin_code", "product_sku", "quantity"}
+
+STAGING_COLUMNS = [
+    "row_no", "warehouse_code", "bin_code", "sku", "product_name",
+    "batch", "expiry_date", "quantity", "uom", "abc_class", "hit_count",
+]
+
+# BinStock fields a row sets; expiry_date only when the sheet has it
+STOCK_FIELDS = ["quantity", "uom", "abc_class", "hit_count"]
+
+
+def _text(df, column, default=""):
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = norm_column(df[column])
+    return values.where(values != "", default)
+
+
+def _number(df, column, errors, integer=False):
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=np.int64 if integer else np.float64)
+    raw = df[column]
+    values = pd.to_numeric(raw, errors="coerce")
+    if integer:
+        errors.flag(raw.notna() & (values.isna() | (values != np.floor(values))), f"{column} must be an integer")
+        return values.fillna(0).to_numpy().astype(np.int64)
+    errors.flag(raw.notna() & values.isna(), f"{column} must be a number")
+    return values.fillna(0).to_numpy(dtype=np.float64)
+
+
+def _date(df, column, errors):
+    raw = df[column]
+    values = pd.to_datetime(raw, errors="coerce", format="mixed")
+    errors.flag(raw.notna() & values.isna(), f"{column} must be a date")
+    return values.dt.date.astype(object).where(values.notna(), None)
+
+
+def prepare_bin_products(df, batch_column="odo_number"):
+    """
+    Normalized frame (one row per sheet row, STAGING_COLUMNS) and the
+    RowErrors of rows that failed validation.
+    """
+    errors = RowErrors(df.index)
+    df = df.reset_index(drop=True)
+
+    frame = pd.DataFrame({
+        "row_no": np.arange(len(df)),
+        "warehouse_code": norm_column(df["warehouse_code"]),
+        "bin_code": norm_column(df["bin_code"]),
+        "sku": norm_column(df["product_sku"]),
+    })
+    errors.flag(
+        (frame["warehouse_code"] == "") | (frame["bin_code"] == "") | (frame["sku"] == ""),
+        "warehouse_code / bin_code / sku empty",
+    )
+
+    frame["product_name"] = _text(df, "product_name")
+    frame["product_name"] = frame["product_name"].where(frame["product_name"] != "", frame["sku"])
+    frame["batch"] = _text(df, batch_column, None)
+    if "expiry_date" in df.columns:
+        frame["expiry_date"] = _date(df, "expiry_date", errors)
+    else:
+        frame["expiry_date"] = None
+    frame["quantity"] = _number(df, "quantity", errors)
+    frame["uom"] = _text(df, "uom", "EA")
+    frame["abc_class"] = _text(df, "abc_class", "C")
+    frame["hit_count"] = _number(df, "hit_count", errors, integer=True)
+
+    errors.flag(~frame["abc_class"].isin(ABC_CLASSES), "abc_class must be A, B or C")
+    for column, limit in (
+        ("warehouse_code", CODE_MAX_LENGTH),
+        ("bin_code", CODE_MAX_LENGTH),
+        ("sku", CODE_MAX_LENGTH),
+        ("batch", CODE_MAX_LENGTH),
+        ("product_name", NAME_MAX_LENGTH),
+        ("uom", UOM_MAX_LENGTH),
+    ):
+        errors.flag(frame[column].str.len().fillna(0) > limit, f"{column} longer than {limit}")
+
+    return frame, errors
+
+
+# ------------------------------------------------------------
+# PostgreSQL: COPY + set-based merge
+# ------------------------------------------------------------
+
+def _copy_staging(cursor, frame):
+    cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE {STAGING_TABLE} (
+            row_no integer PRIMARY KEY,
+            warehouse_code text NOT NULL,
+            bin_code text NOT NULL,
+            sku text NOT NULL,
+            product_name text NOT NULL,
+            batch text,
+            expiry_date date,
+            quantity double precision NOT NULL,
+            uom text NOT NULL,
+            abc_class text NOT NULL,
+            hit_count integer NOT NULL,
+            warehouse_id bigint,
+            bin_id bigint,
+            product_id bigint
+        ) ON COMMIT DROP
+    """)
+
+    # Unquoted empty fields load as NULL (only batch can be empty)
+    buf = io.StringIO()
+    frame[STAGING_COLUMNS].to_csv(buf, header=False, index=False)
+    buf.seek(0)
+    copy_sql = f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        cursor.copy_expert(copy_sql, buf)
+    else:  # psycopg 3
+        with cursor.copy(copy_sql) as copy:
+            copy.write(buf.getvalue())
+    cursor.execute(f"ANALYZE {STAGING_TABLE}")
+
+
+def _resolve_keys(cursor):
+    warehouse = Warehouse._meta.db_table
+    storage_bin = StorageBin._meta.db_table
+
+    # Same case-insensitive match as the ORM path's __iexact lookups
+    cursor.execute(f"""
+        UPDATE {STAGING_TABLE} s
+        SET warehouse_id = w.id
+        FROM {warehouse} w
+        WHERE UPPER(w.code) = s.warehouse_code
+    """)
+    cursor.execute(f"""
+        UPDATE {STAGING_TABLE} s
+        SET bin_id = b.id
+        FROM {storage_bin} b
+        WHERE b.warehouse_id = s.warehouse_id
+          AND UPPER(b.bin_code) = s.bin_code
+    """)
+    cursor.execute(f"""
+        SELECT row_no, warehouse_id IS NULL
+        FROM {STAGING_TABLE}
+        WHERE bin_id IS NULL
+    """)
+    return cursor.fetchall()
+
+
+def _insert_products(cursor):
+    product = Product._meta.db_table
+
+    # Name from the first row of each new SKU, as get_or_create would
+    cursor.execute(f"""
+        INSERT INTO {product} (sku, name)
+        SELECT DISTINCT ON (sku) sku, product_name
+        FROM {STAGING_TABLE}
+        WHERE bin_id IS NOT NULL
+        ORDER BY sku, row_no
+        ON CONFLICT (sku) DO NOTHING
+    """)
+    cursor.execute(f"""
+        UPDATE {STAGING_TABLE} s
+        SET product_id = p.id
+        FROM {product} p
+        WHERE p.sku = s.sku AND s.bin_id IS NOT NULL
+    """)
+
+
+def _merge_stock(cursor, fields):
+    stock = BinStock._meta.db_table
+
+    # Last row wins for a repeated (bin, product, batch), and a single
+    # INSERT ... ON CONFLICT may not touch the same row twice
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE {STAGING_TABLE}_latest ON COMMIT DROP AS
+        SELECT DISTINCT ON (bin_id, product_id, batch)
+               bin_id, product_id, batch, {", ".join(fields)}
+        FROM {STAGING_TABLE}
+        WHERE product_id IS NOT NULL
+        ORDER BY bin_id, product_id, batch, row_no DESC
+    """)
+
+    columns = f"bin_id, product_id, batch, {', '.join(fields)}, last_sync"
+    values = f"bin_id, product_id, batch, {', '.join(fields)}, NOW()"
+    excluded = ",\n            ".join(f"{f} = EXCLUDED.{f}" for f in fields)
+    latest = ",\n            ".join(f"{f} = l.{f}" for f in fields)
+
+    cursor.execute(f"""
+        INSERT INTO {stock} ({columns})
+        SELECT {values}
+        FROM {STAGING_TABLE}_latest
+        WHERE batch IS NOT NULL
+        ON CONFLICT (bin_id, product_id, batch) DO UPDATE SET
+            {excluded},
+            last_sync = EXCLUDED.last_sync
+    """)
+
+    # NULL batches never conflict on the unique constraint (NULLs are
+    # distinct), so match them explicitly
+    cursor.execute(f"""
+        UPDATE {stock} t
+        SET {latest},
+            last_sync = NOW()
+        FROM {STAGING_TABLE}_latest l
+        WHERE l.batch IS NULL
+          AND t.batch IS NULL
+          AND t.bin_id = l.bin_id
+          AND t.product_id = l.product_id
+    """)
+    cursor.execute(f"""
+        INSERT INTO {stock} ({columns})
+        SELECT {values}
+        FROM {STAGING_TABLE}_latest l
+        WHERE l.batch IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM {stock} t
+              WHERE t.batch IS NULL
+                AND t.bin_id = l.bin_id
+                AND t.product_id = l.product_id
+          )
+    """)
+    cursor.execute(f"DROP TABLE {STAGING_TABLE}_latest")
+
+
+def _import_copy(frame, errors, fields):
+    rows = frame[errors.ok]
+    if rows.empty:
+        return 0, set(), set()
+
+    with connection.cursor() as cursor:
+        _copy_staging(cursor, rows)
+
+        for row_no, no_warehouse in _resolve_keys(cursor):
+            errors.add(row_no, UNKNOWN_WAREHOUSE if no_warehouse else UNKNOWN_BIN)
+
+        _insert_products(cursor)
+        _merge_stock(cursor, fields)
+
+        cursor.execute(f"""
+            SELECT warehouse_id, bin_id, COUNT(*)
+            FROM {STAGING_TABLE}
+            WHERE product_id IS NOT NULL
+            GROUP BY warehouse_id, bin_id
+        """)
+        resolved = cursor.fetchall()
+        cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+
+    created = sum(count for _, _, count in resolved)
+    touched = {wid for wid, _, _ in resolved}
+    bin_ids = {bid for _, bid, _ in resolved}
+    return created, touched, bin_ids
+
+
+# ------------------------------------------------------------
+# Fallback: per-row ORM
+# ------------------------------------------------------------
+
+def _import_orm(frame, errors, fields):
+    created = 0
+    touched = set()
+    bin_ids = set()
+
+    for r in frame[errors.ok].itertuples(index=False):
+        try:
+            # Savepoint per row: a bad row is reported, not fatal
+            with transaction.atomic():
+                try:
+                    wh = Warehouse.objects.get(code__iexact=r.warehouse_code)
+                except Warehouse.DoesNotExist:
+                    raise ValueError(UNKNOWN_WAREHOUSE)
+
+                try:
+                    bin_obj = StorageBin.objects.get(
+                        warehouse=wh,
+                        bin_code__iexact=r.bin_code,
+                    )
+                except StorageBin.DoesNotExist:
+                    raise ValueError(UNKNOWN_BIN)
+
+                product, _ = Product.objects.get_or_create(
+                    sku=r.sku,
+                    defaults={"name": r.product_name},
+                )
+
+                defaults = {
+                    "quantity": float(r.quantity),
+                    "uom": r.uom,
+                    "abc_class": r.abc_class,
+                    "hit_count": int(r.hit_count),
+                }
+                if "expiry_date" in fields:
+                    defaults["expiry_date"] = r.expiry_date
+
+                BinStock.objects.update_or_create(
+                    bin=bin_obj,
+                    product=product,
+                    batch=r.batch if pd.notna(r.batch) else None,
+                    defaults=defaults,
+                )
+
+            touched.add(wh.id)
+            bin_ids.add(bin_obj.id)
+            created += 1
+
+        except Exception as e:
+            errors.add(r.row_no, str(e))
+
+    return created, touched, bin_ids
+
+
+def import_bin_products(df, batch_column="odo_number"):
+    """
+    Upsert the rows of a "BinProduct" sheet into BinStock (a "BinStock"
+    sheet with batch_column="batch").
+
+    Returns (created, errors, warehouse_ids, bin_ids). Run inside a
+    transaction.
+    """
+    frame, errors = prepare_bin_products(df, batch_column)
+    fields = STOCK_FIELDS + ["expiry_date"] if "expiry_date" in df.columns else STOCK_FIELDS
+
+    if connection.vendor == "postgresql":
+        created, touched, bin_ids = _import_copy(frame, errors, fields)
+    else:
+        created, touched, bin_ids = _import_orm(frame, errors, fields)
+
+    df = df.reset_index(drop=True)
+    report = errors.report(context={
+        "warehouse_code": df["warehouse_code"],
+        "bin_code": df["bin_code"],
+    })
+    return created, report, touched, bin_ids
@@ -0,0 +1,110 @@
+from django.db.models import Exists, Max, OuterRef
+
+from ..models import BinChange, StorageBin, Warehouse
+
+
+CHANGE_BATCH = 2000
+
+
+def _chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def bins_for_log(bin_ids):
+    """
+    (bin_id, warehouse_id, bin_code) for the given bins.
+    """
+    ids = sorted({i for i in bin_ids if i is not None})
+    rows = []
+    for chunk in _chunks(ids, CHANGE_BATCH):
+        rows.extend(
+            StorageBin.objects
+            .filter(id__in=chunk)
+            .values_list("id", "warehouse_id", "bin_code")
+        )
+    return rows
+
+
+def record_bin_changes(changed, deleted=()):
+    """
+    Append change log rows at each warehouse's current data version.
+    Must run after the version bump, inside the same transaction.
+
+      changed: (bin_id, warehouse_id, bin_code) upserted bins
+      deleted: (bin_id, warehouse_id, bin_code) removed bins
+    """
+    warehouse_ids = {w for _, w, _ in changed} | {w for _, w, _ in deleted}
+    if not warehouse_ids:
+        return
+
+    versions = dict(
+        Warehouse.objects
+        .filter(id__in=warehouse_ids)
+        .values_list("id", "data_version")
+    )
+
+    BinChange.objects.bulk_create(
+        [
+            BinChange(
+                warehouse_id=wid,
+                version=versions[wid],
+                bin_id=bin_id,
+                bin_code=code,
+                op=op,
+            )
+            for op, rows in ((BinChange.OP_UPSERT, changed), (BinChange.OP_DELETE, deleted))
+            for bin_id, wid, code in rows
+        ],
+        batch_size=CHANGE_BATCH,
+    )
+
+
+def changes_since(warehouse, since):
+    """
+    Collapse the log after `since` to the latest op per bin.
+    Returns (upserted bin ids, deleted bin codes).
+    """
+    latest = {}
+    rows = (
+        BinChange.objects
+        .filter(warehouse=warehouse, version__gt=since)
+        .order_by("id")
+        .values_list("bin_id", "bin_code", "op")
+    )
+    for bin_id, code, op in rows:
+        latest[bin_id] = (code, op)
+
+    upserted = [b for b, (_, op) in latest.items() if op == BinChange.OP_UPSERT]
+    deleted = [code for code, op in latest.values() if op == BinChange.OP_DELETE]
+    return upserted, deleted
+
+
+def compact_changes(before=None):
+    """
+    1. Drop entries superseded by a newer entry for the same bin
+       (lossless for every `since`).
+    2. If `before` is given, drop entries older than it and raise each
+       warehouse's change_log_floor so stale clients get a full reload.
+
+    Returns (superseded, expired) row counts.
+    """
+    newer = BinChange.objects.filter(
+        warehouse=OuterRef("warehouse"),
+        bin_id=OuterRef("bin_id"),
+        id__gt=OuterRef("id"),
+    )
+    superseded, _ = BinChange.objects.filter(Exists(newer)).delete()
+
+    expired = 0
+    if before is not None:
+        old = BinChange.objects.filter(created_at__lt=before)
+        floors = old.values("warehouse_id").annotate(floor=Max("version"))
+        for row in floors:
+            Warehouse.objects.filter(
+                id=row["warehouse_id"],
+                change_log_floor__lt=row["floor"],
+            ).update(change_log_floor=row["floor"])
+        expired, _ = old.delete()
+
+    return superseded, expired
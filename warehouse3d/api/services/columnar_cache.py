@@ -0,0 +1,167 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional
+    pq = None
+
+
+# ============================================================
+# COLUMNAR CACHE OF PARSED WORKBOOKS
+# ============================================================
+#
+# Excel is the slowest format pandas reads. Every analytics workbook
+# (uploads and the reference files in api/data) is parsed once and
+# the resulting frame stored under its content hash:
+#
+#   cache/columnar/<name>-v<version>-<sha256>.parquet
+#
+# Later reads load only the requested columns and push row filters
+# (pyarrow-style [(column, op, value), ...]) down into the Parquet
+# reader. A changed source file has a new hash, so it is re-parsed;
+# an unchanged one never is.
+#
+# Parquet needs pyarrow (requirements.txt). A frame pyarrow cannot
+# store (mixed-type object columns), or any frame when pyarrow is not
+# installed, is pickled instead and pruned / filtered after loading.
+
+COLUMNAR_CACHE_DIR = Path(getattr(
+    settings, "COLUMNAR_CACHE_DIR", Path(settings.BASE_DIR) / "cache" / "columnar"
+))
+
+HASH_CHUNK = 1024 * 1024
+
+# (path, size, mtime_ns) -> sha256, so an unchanged file is hashed
+# once per process
+_digests = {}
+
+
+def file_digest(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    digest = _digests.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                sha.update(chunk)
+        digest = _digests[key] = sha.hexdigest()
+    return digest
+
+
+def _cache_files(name, digest, version):
+    stem = COLUMNAR_CACHE_DIR / f"{name}-v{version}-{digest}"
+    return stem.with_suffix(".parquet"), stem.with_suffix(".pkl")
+
+
+def _tmp(target):
+    return target.with_name(f"{target.name}.{os.getpid()}.tmp")
+
+
+def _write(df, parquet_file, pickle_file):
+    COLUMNAR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    if pq is not None:
+        tmp = _tmp(parquet_file)
+        try:
+            df.to_parquet(tmp, engine="pyarrow")
+        except (TypeError, ValueError, NotImplementedError):
+            # Arrow type errors subclass these; fall back to a pickle
+            tmp.unlink(missing_ok=True)
+        else:
+            # Readers never see a half-written file
+            os.replace(tmp, parquet_file)
+            return parquet_file
+
+    tmp = _tmp(pickle_file)
+    df.to_pickle(tmp)
+    os.replace(tmp, pickle_file)
+    return pickle_file
+
+
+OPERATORS = {
+    "==": lambda s, v: s == v,
+    "=": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def _select(df, columns, filters):
+    """
+    Pandas equivalent of the Parquet reader's column / filter pushdown.
+    """
+    for column, op, value in filters or ():
+        df = df[OPERATORS[op](df[column], value)]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.reset_index(drop=True)
+
+
+def _read_parquet(parquet_file, columns, filters):
+    if columns is not None:
+        available = set(pq.read_schema(parquet_file).names)
+        columns = [c for c in columns if c in available]
+    # Filter columns must be read to be applied; prune afterwards
+    read_columns = columns
+    if columns is not None and filters:
+        read_columns = list(dict.fromkeys([*columns, *(c for c, _, _ in filters)]))
+
+    df = pd.read_parquet(parquet_file, engine="pyarrow", columns=read_columns, filters=filters or None)
+    return _select(df, columns, None)
+
+
+def cached_frame(path, name, parse=pd.read_excel, columns=None, filters=None, digest=None, version=1):
+    """
+    parse(path) as a DataFrame, served from the columnar cache.
+
+    name:     the parse step, part of the cache key
+    columns:  columns to return (ones the frame lacks are skipped)
+    filters:  [(column, op, value), ...], all must hold
+    digest:   the file's sha256 if already known
+    version:  bump when `parse` changes its output
+    """
+    digest = digest or file_digest(path)
+    parquet_file, pickle_file = _cache_files(name, digest, version)
+
+    if pq is not None and parquet_file.exists():
+        os.utime(parquet_file)
+        return _read_parquet(parquet_file, columns, filters)
+
+    if pickle_file.exists():
+        os.utime(pickle_file)
+        return _select(pd.read_pickle(pickle_file), columns, filters)
+
+    df = parse(path)
+    written = _write(df, parquet_file, pickle_file)
+    if written == parquet_file:
+        return _read_parquet(parquet_file, columns, filters)
+    return _select(df, columns, filters)
+
+
+def prune_columnar_cache(max_age_days):
+    """
+    Delete cache files not read for `max_age_days`. Returns the count.
+    """
+    if not COLUMNAR_CACHE_DIR.exists():
+        return 0
+
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed = 0
+    for entry in COLUMNAR_CACHE_DIR.iterdir():
+        if entry.suffix in (".parquet", ".pkl", ".tmp") and entry.stat().st_mtime < cutoff:
+            entry.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,146 @@
+import gzip
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+# ============================================================
+# RESPONSE COMPRESSION
+# ============================================================
+#
+# The encoding is negotiated from Accept-Encoding. br and zstd are
+# offered only when their modules are installed; gzip always is.
+#
+# Cached payloads are compressed once per data version at a high
+# level (see payload_cache.get_or_build_encoded). Responses built per
+# request are compressed on the fly at a cheaper level.
+
+IDENTITY = "identity"
+
+# Server preference when the client accepts several equally
+PREFERENCE = [
+    name for name, available in (
+        ("br", brotli is not None),
+        ("zstd", zstandard is not None),
+        ("gzip", True),
+    )
+    if available
+]
+
+# Bodies smaller than this are not worth compressing on the fly
+MIN_COMPRESS_SIZE = getattr(settings, "MIN_COMPRESS_SIZE", 1024)
+
+# (cached, on the fly)
+LEVELS = {
+    "gzip": (9, 5),
+    "br": (11, 4),
+    "zstd": (19, 3),
+}
+
+
+def parse_accept_encoding(header):
+    """
+    {coding: q} from an Accept-Encoding header.
+    """
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(request):
+    """
+    Best content coding both sides support, or IDENTITY.
+    """
+    accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING"))
+    wildcard = accepted.get("*", 0.0)
+
+    best, best_q = IDENTITY, 0.0
+    for coding in PREFERENCE:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding, cached=False):
+    level = LEVELS[encoding][0 if cached else 1]
+
+    if encoding == "gzip":
+        # mtime=0 keeps the output deterministic
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def encoded_response(body, encoding, content_type="application/json"):
+    """
+    HttpResponse for a body that is already in `encoding`.
+    """
+    response = HttpResponse(body, content_type=content_type)
+    if encoding != IDENTITY:
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def compress_response(view):
+    """
+    Compress a view's response on the fly with the negotiated encoding.
+    Streaming, error and already encoded responses pass through.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+
+        # DRF Response / TemplateResponse render lazily
+        if not getattr(response, "is_rendered", True):
+            response.render()
+
+        if response.streaming or response.status_code != 200:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        if len(response.content) < MIN_COMPRESS_SIZE:
+            return response
+
+        encoding = negotiate(request)
+        if encoding == IDENTITY:
+            return response
+
+        response.content = compress(response.content, encoding)
+        response["Content-Encoding"] = encoding
+        response["Content-Length"] = str(len(response.content))
+        return response
+
+    return wrapper
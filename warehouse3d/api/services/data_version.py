@@ -0,0 +1,102 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+
+from ..models import Warehouse, WarehouseSnapshot
+from .change_log import bins_for_log, record_bin_changes
+from .compression import negotiate
+from .bin_events import broker
+
+
+def bump_data_version(*warehouse_ids, changed_bins=(), deleted_bins=()):
+    """
+    Advance the data version of every given warehouse.
+    Call from every path that writes StorageBin / BinStock rows.
+
+    changed_bins: ids of bins whose row or stock was written
+    deleted_bins: (bin_id, warehouse_id, bin_code) of removed bins
+
+    Both are recorded in the BinChange log at the new version.
+    """
+    changed = bins_for_log(changed_bins) if changed_bins else []
+
+    ids = {wid for wid in warehouse_ids if wid is not None}
+    ids |= {wid for _, wid, _ in changed}
+    ids |= {wid for _, wid, _ in deleted_bins}
+    if not ids:
+        return
+
+    Warehouse.objects.filter(id__in=ids).update(
+        data_version=F("data_version") + 1
+    )
+
+    if changed or deleted_bins:
+        record_bin_changes(changed, deleted_bins)
+
+    if broker.has_subscribers():
+        # Live events read the change log; don't wait for the next poll
+        transaction.on_commit(broker.wake)
+
+    # Cached payloads are keyed by data version, so the bump above
+    # already retired them. Other processes notice the new version of
+    # spatial indexes on their next query.
+    from .spatial_index import drop_indexes
+    transaction.on_commit(lambda: drop_indexes(*ids))
+
+
+def version_token(code=None):
+    """
+    `id.version` of the requested warehouse, or of all warehouses
+    when no code is given. Reads only the Warehouse table.
+    """
+    qs = Warehouse.objects.order_by("id").values_list("id", "data_version")
+    if code is not None:
+        qs = qs.filter(code__iexact=code)
+    return "-".join(f"{wid}.{version}" for wid, version in qs)
+
+
+def _etag(endpoint, token, request):
+    query = "&".join(sorted(
+        f"{k}={v}" for k in request.GET for v in request.GET.getlist(k)
+    ))
+    # Each content coding is a different representation
+    encoding = negotiate(request)
+    digest = hashlib.blake2b(
+        f"{endpoint}|{token}|{query}|{encoding}".encode(), digest_size=12
+    ).hexdigest()
+    return f"{endpoint}-{digest}"
+
+
+def warehouse_etag(endpoint, kwarg=None, param="warehouse", default=None):
+    """
+    Build an etag_func for django.views.decorators.http.condition.
+
+    The warehouse code is taken from the URL kwarg `kwarg` if given,
+    else from the `param` query parameter. With neither, the ETag
+    covers every warehouse.
+    """
+    def etag_func(request, *args, **kwargs):
+        if kwarg:
+            code = kwargs.get(kwarg)
+        elif param:
+            code = request.GET.get(param, default)
+        else:
+            code = None
+        return _etag(endpoint, version_token(code), request)
+
+    return etag_func
+
+
+def snapshot_etag(request, *args, **kwargs):
+    """
+    Snapshots are immutable, so the latest snapshot id is the version.
+    """
+    latest = (
+        WarehouseSnapshot.objects
+        .filter(warehouse=Warehouse.objects.order_by("id").first())
+        .order_by("-created_at")
+        .values_list("id", flat=True)
+        .first()
+    )
+    return _etag("snapshot", str(latest), request)
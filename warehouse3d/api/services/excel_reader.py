@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+
+# ============================================================
+# STREAMING EXCEL READER
+# ============================================================
+#
+# pd.read_excel() materializes a whole sheet (and re-parses the file
+# for every sheet it is asked for). Uploads go through ExcelWorkbook
+# instead: the file is opened once in openpyxl read-only mode, and each
+# sheet is streamed as DataFrames of at most READ_BATCH rows holding
+# only the requested columns:
+#
+#   TEXT     str (integral floats without ".0"), None when blank
+#   NUMBER   float64; stays object only if a cell is not numeric, so
+#            validation can still report it
+#   RAW      cell value as openpyxl returns it (dates, ...)
+#
+# Batch frames are indexed by position in the sheet's data rows (first
+# row under the header is 0), like a pd.read_excel() frame, so
+# `idx + 2` is still the Excel row number. Blank rows are skipped.
+
+READ_BATCH = 5000
+
+TEXT = "text"
+NUMBER = "number"
+RAW = "raw"
+
+# Columns each upload sheet reads
+BIN_SHEET = {
+    "warehouse_code": TEXT,
+    "bin_code": TEXT,
+    "row": NUMBER,
+    "shelf": NUMBER,
+    "level": NUMBER,
+    "x": NUMBER,
+    "y": NUMBER,
+    "z": NUMBER,
+    "width": NUMBER,
+    "height": NUMBER,
+    "depth": NUMBER,
+    "zone": TEXT,
+}
+
+BIN_STOCK_SHEET = {
+    "warehouse_code": TEXT,
+    "bin_code": TEXT,
+    "product_sku": TEXT,
+    "product_name": TEXT,
+    "batch": TEXT,
+    "expiry_date": RAW,
+    "quantity": NUMBER,
+    "uom": TEXT,
+    "abc_class": TEXT,
+    "hit_count": NUMBER,
+}
+
+BIN_PRODUCT_SHEET = {
+    "warehouse_code": TEXT,
+    "bin_code": TEXT,
+    "product_sku": TEXT,
+    "product_name": TEXT,
+    "odo_number": TEXT,
+    "quantity": NUMBER,
+    "uom": TEXT,
+    "abc_class": TEXT,
+    "hit_count": NUMBER,
+}
+
+
+def _text(values):
+    out = []
+    for v in values:
+        if v is None:
+            out.append(None)
+        elif isinstance(v, float) and v.is_integer():
+            out.append(str(int(v)))
+        else:
+            out.append(str(v))
+    return np.array(out, dtype=object)
+
+
+def _number(values):
+    out = np.empty(len(values), dtype=np.float64)
+    for i, v in enumerate(values):
+        if v is None:
+            out[i] = np.nan
+        elif isinstance(v, (int, float)):
+            out[i] = v
+        else:
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                # Keep the raw cells for the validator to flag
+                return np.array(values, dtype=object)
+    return out
+
+
+CONVERTERS = {
+    TEXT: _text,
+    NUMBER: _number,
+    RAW: lambda values: np.array(values, dtype=object),
+}
+
+
+class ExcelWorkbook:
+    """
+    One upload opened once, read sheet by sheet in batches.
+
+        with ExcelWorkbook(request.FILES["file"]) as book:
+            missing = required - set(book.header("Bins"))
+            for df in book.batches("Bins", BIN_SHEET):
+                ...
+    """
+
+    def __init__(self, file):
+        self.book = load_workbook(file, read_only=True, data_only=True)
+        self._headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.book.close()
+
+    @property
+    def sheet_names(self):
+        return self.book.sheetnames
+
+    def _sheet(self, sheet_name):
+        if sheet_name not in self.book.sheetnames:
+            # Same error as pd.read_excel()
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return self.book[sheet_name]
+
+    def header(self, sheet_name):
+        """
+        Column names of the sheet's first row.
+        """
+        if sheet_name not in self._headers:
+            first = next(self._sheet(sheet_name).iter_rows(max_row=1, values_only=True), ())
+            self._headers[sheet_name] = [
+                str(v).strip() if v is not None else None for v in first
+            ]
+        return self._headers[sheet_name]
+
+    def row_count(self, sheet_name):
+        """
+        Data rows according to the sheet's stored dimensions (blank
+        rows included), or None when the file does not record them.
+        """
+        max_row = self._sheet(sheet_name).max_row
+        return max(max_row - 1, 0) if max_row else None
+
+    def batches(self, sheet_name, columns, batch_size=READ_BATCH):
+        """
+        Yield DataFrames of at most `batch_size` rows with the columns
+        of `columns` ({name: TEXT | NUMBER | RAW}) present in the sheet.
+        """
+        header = self.header(sheet_name)
+        wanted = [(name, header.index(name)) for name in columns if name in header]
+        if not wanted:
+            return
+
+        positions = []
+        cells = [[] for _ in wanted]
+
+        rows = self._sheet(sheet_name).iter_rows(min_row=2, values_only=True)
+        for pos, row in enumerate(rows):
+            values = [row[i] if i < len(row) else None for _, i in wanted]
+            if all(v is None or v == "" for v in values):
+                continue
+
+            positions.append(pos)
+            for column, value in zip(cells, values):
+                column.append(value)
+
+            if len(positions) == batch_size:
+                yield self._frame(wanted, columns, positions, cells)
+                positions = []
+                cells = [[] for _ in wanted]
+
+        if positions:
+            yield self._frame(wanted, columns, positions, cells)
+
+    def read(self, sheet_name, columns):
+        """
+        The whole sheet as one DataFrame, as batches() would yield it.
+        """
+        frames = list(self.batches(sheet_name, columns))
+        if not frames:
+            header = self.header(sheet_name)
+            return pd.DataFrame(columns=[name for name in columns if name in header])
+        return pd.concat(frames)
+
+    @staticmethod
+    def _frame(wanted, columns, positions, cells):
+        return pd.DataFrame(
+            {name: CONVERTERS[columns[name]](values) for (name, _), values in zip(wanted, cells)},
+            index=pd.Index(positions),
+        )
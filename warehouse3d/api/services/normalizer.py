@@ -1,8 +1,13 @@
+import numpy as np
+
 SAP_TO_METER = 0.01
 
 def normalize_xyz(x, y, z):
-    return (
-        round(float(x) * SAP_TO_METER, 3),
-        round(float(y) * SAP_TO_METER, 3),
-        round(float(z) * SAP_TO_METER, 3),
+    """
+    SAP centimetres -> metres (3 decimals). Takes scalars or whole
+    arrays / Series; arrays are converted in one vectorized op per axis.
+    """
+    return tuple(
+        np.round(np.asarray(v, dtype=np.float64) * SAP_TO_METER, 3)
+        for v in (x, y, z)
     )
@@ -0,0 +1,111 @@
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .compression import IDENTITY, compress, negotiate
+from .data_version import version_token
+
+
+# ============================================================
+# SERIALIZED PAYLOAD CACHE
+# ============================================================
+#
+# Stores the final response bytes of read APIs, keyed by
+# endpoint + warehouse + data version + query string. A write bumps
+# the data version, so stale entries are never hit again and simply
+# time out.
+#
+# invalidate_payloads() retires a warehouse's entries without a write
+# by storing a fresh random generation, which is part of every key.
+# That is one cache.set() per warehouse: no key list to read, append
+# to and write back, so concurrent requests cannot lose entries.
+#
+# Each content coding is its own entry, so a payload is compressed
+# once per data version instead of once per request.
+#
+# Works with any Django cache backend (locmem, file based, ...).
+
+PAYLOAD_CACHE_ALIAS = getattr(settings, "PAYLOAD_CACHE_ALIAS", "default")
+PAYLOAD_CACHE_TIMEOUT = getattr(settings, "PAYLOAD_CACHE_TIMEOUT", 60 * 60)
+
+def _cache():
+    return caches[PAYLOAD_CACHE_ALIAS]
+
+
+def _generation_key(warehouse_id):
+    return f"payload-generation:{warehouse_id}"
+
+
+def _warehouse_ids(token):
+    return [part.split(".", 1)[0] for part in token.split("-") if part]
+
+
+def _generation(token):
+    keys = [_generation_key(wid) for wid in _warehouse_ids(token) or ["none"]]
+    found = _cache().get_many(keys)
+    return ".".join(found.get(k, "0") for k in keys)
+
+
+def payload_key(endpoint, code, request, encoding=IDENTITY):
+    """
+    Cache key for one representation of an endpoint's payload.
+    """
+    token = version_token(code)
+    generation = _generation(token)
+    query = "&".join(sorted(
+        f"{k}={v}" for k in request.GET for v in request.GET.getlist(k)
+    ))
+    digest = hashlib.blake2b(
+        f"{endpoint}|{(code or '*').upper()}|{token}|{generation}|{query}|{encoding}".encode(),
+        digest_size=16,
+    ).hexdigest()
+    return f"payload:{endpoint}:{digest}"
+
+
+def get_or_build(endpoint, code, request, build, encoding=IDENTITY):
+    """
+    Return cached payload bytes, calling `build()` (which must return
+    bytes) on a miss and storing the result.
+    """
+    cache = _cache()
+    key = payload_key(endpoint, code, request, encoding)
+
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.set(key, body, PAYLOAD_CACHE_TIMEOUT)
+
+    return body
+
+
+def get_or_build_encoded(endpoint, code, request, build):
+    """
+    Like get_or_build(), but in the encoding negotiated from the
+    request's Accept-Encoding. Returns (body, encoding).
+
+    A miss compresses the cached identity body (building that too if
+    needed) and stores the result next to it.
+    """
+    encoding = negotiate(request)
+    if encoding == IDENTITY:
+        return get_or_build(endpoint, code, request, build), IDENTITY
+
+    def build_encoded():
+        body = get_or_build(endpoint, code, request, build)
+        return compress(body, encoding, cached=True)
+
+    return get_or_build(endpoint, code, request, build_encoded, encoding), encoding
+
+
+def invalidate_payloads(*warehouse_ids):
+    """
+    Retire every cached payload that covers any of the given
+    warehouses; they are never hit again and expire on their own.
+    Writes need not call this: their version bump already does it.
+    """
+    _cache().set_many(
+        {_generation_key(wid): secrets.token_hex(8) for wid in warehouse_ids},
+        None,
+    )
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Sum
+
+from ..models import PickEvent
+
+
+# ============================================================
+# PICK EVENTS (PICKING DASHBOARD FACT TABLE)
+# ============================================================
+#
+# A picking upload is parsed once into PickEvent rows. The dashboard
+# then aggregates with SQL (GROUP BY confirm_date, auom over the
+# (upload, confirm_date, auom) index), so changing the date / AUoM
+# filters never touches the workbook again.
+
+PICK_BATCH = 2000
+PICK_AUOMS = ("PAL", "CTN", "EA")
+
+# Optional export columns (lower-case) -> PickEvent field
+PICK_TEXT_COLUMNS = {
+    "product": "sku",
+    "src bin": "bin_code",
+}
+TEXT_MAX_LENGTH = 50
+
+# Columns of a cleaned picking frame that store_pick_events reads
+PICK_FRAME_COLUMNS = ["confirm date", "auom", "confirmed qty", *PICK_TEXT_COLUMNS]
+
+
+def _text(df, column):
+    if column not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    values = df[column].astype(object).where(df[column].notna(), "")
+    return np.array([str(v).strip()[:TEXT_MAX_LENGTH] for v in values], dtype=object)
+
+
+def store_pick_events(upload, df):
+    """
+    Replace the upload's events with the rows of a cleaned picking
+    frame (views.read_picking_frame). Returns the number stored.
+    """
+    dates = df["confirm date"].dt.date.to_numpy()
+    auoms = df["auom"].to_numpy()
+    qtys = pd.to_numeric(df["confirmed qty"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    text = {field: _text(df, column) for column, field in PICK_TEXT_COLUMNS.items()}
+
+    events = [
+        PickEvent(
+            upload=upload,
+            confirm_date=dates[i],
+            auom=auoms[i],
+            qty=float(qtys[i]),
+            sku=text["sku"][i],
+            bin_code=text["bin_code"][i],
+        )
+        for i in range(len(df))
+    ]
+
+    with transaction.atomic():
+        upload.events.all().delete()
+        PickEvent.objects.bulk_create(events, batch_size=PICK_BATCH)
+    return len(events)
+
+
+def pick_chart_data(upload, from_date=None, to_date=None, auom=None):
+    """
+    Chart payload of the picking dashboard: qty per confirm date and
+    AUoM (dates in order), plus the AUoM totals for the pie.
+    """
+    qs = PickEvent.objects.filter(upload=upload)
+    if from_date:
+        qs = qs.filter(confirm_date__gte=from_date)
+    if to_date:
+        qs = qs.filter(confirm_date__lte=to_date)
+    if auom:
+        qs = qs.filter(auom=auom)
+
+    rows = (
+        qs.order_by("confirm_date")
+        .values_list("confirm_date", "auom")
+        .annotate(total=Sum("qty"))
+    )
+
+    series = {}
+    for day, unit, total in rows:
+        series.setdefault(day, dict.fromkeys(PICK_AUOMS, 0))[unit] = total
+
+    if not series:
+        return {}
+
+    days = list(series)
+    pal = [series[d]["PAL"] for d in days]
+    ct = [series[d]["CTN"] for d in days]
+    ea = [series[d]["EA"] for d in days]
+
+    return {
+        "labels": [d.strftime("%d-%m-%Y") for d in days],
+        "pal": pal,
+        "ct": ct,
+        "ea": ea,
+        "pie": {
+            "PAL": sum(pal),
+            "CTN": sum(ct),
+            "EA": sum(ea),
+        },
+    }
@@ -0,0 +1,49 @@
+# ============================================================
+# SPARSE FIELD PROJECTION FOR BIN READ APIS
+# ============================================================
+#
+#   ?fields=bin_code,x,y,z,abc      only these keys per bin
+#   ?include=products               also attach the product list
+#
+# Field names are the keys of the endpoint's serializer spec (see
+# bin_serializer.py). Only the columns behind the requested keys are
+# selected. The BinAggregate join is added only when a metric is
+# requested, and the BinStock / Product query only runs for
+# ?include=products.
+#
+# Without ?fields= every key and the products are returned, as before.
+
+INCLUDES = ("products",)
+
+
+class InvalidProjection(ValueError):
+    pass
+
+
+def _split(value):
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def parse_projection(request, spec):
+    """
+    Returns (fields, include_products) for the request.
+    Raises InvalidProjection on unknown names.
+    """
+    includes = _split(request.GET.get("include"))
+    unknown = [name for name in includes if name not in INCLUDES]
+    if unknown:
+        raise InvalidProjection(f"Unknown include: {', '.join(unknown)}")
+
+    if "fields" not in request.GET:
+        return list(spec), True
+
+    fields = []
+    for name in _split(request.GET.get("fields")):
+        if name == "products":
+            includes.append(name)
+        elif name not in spec:
+            raise InvalidProjection(f"Unknown field: {name}")
+        elif name not in fields:
+            fields.append(name)
+
+    return fields, "products" in includes
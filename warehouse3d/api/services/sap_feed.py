@@ -0,0 +1,138 @@
+import csv
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+# ============================================================
+# SAP EXTRACT FILES (STREAMED, RESUMABLE)
+# ============================================================
+#
+# SAP bin / stock extracts arrive as large JSON-lines or CSV files
+# with the fields sync_bins_from_sap expects (Storagebin, Xcord,
+# Ycord, Zcord, Matnr, Batch, Quan, Auom). read_feed() yields them
+# one record at a time together with the byte offset just past that
+# record, so `manage.py ingest_sap_feed` can sync fixed-size batches
+# and checkpoint where the last committed batch ended.
+#
+# Offsets are taken from the binary file, so they stay exact whatever
+# the encoding; resuming seeks straight to the offset.
+
+FEED_FORMATS = ("jsonl", "csv")
+
+
+def feed_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    if ext == "csv":
+        return "csv"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format")
+
+
+def _lines(f):
+    """
+    (line, offset after it) for the rest of a binary file.
+    """
+    for line in iter(f.readline, b""):
+        yield line, f.tell()
+
+
+def _read_jsonl(f):
+    loads = orjson.loads if orjson is not None else json.loads
+    for line, offset in _lines(f):
+        if line.strip():
+            yield loads(line), offset
+
+
+def _read_csv(f, start):
+    header = next(csv.reader([f.readline().decode("utf-8-sig")]))
+    if start:
+        f.seek(start)
+
+    # csv.reader pulls lines lazily; a quoted field may span several,
+    # so the offset is that of the last line it consumed
+    offset = f.tell()
+
+    def text():
+        nonlocal offset
+        for line, offset in _lines(f):
+            yield line.decode("utf-8")
+
+    for values in csv.reader(text()):
+        if any(v.strip() for v in values):
+            yield dict(zip(header, values)), offset
+
+
+def read_feed(path, fmt, start=0):
+    """
+    Stream (record dict, end offset) from `path` starting at byte
+    `start`, which must be a record boundary (0 or a checkpoint).
+    """
+    with open(path, "rb") as f:
+        if fmt == "jsonl":
+            f.seek(start)
+            yield from _read_jsonl(f)
+        else:
+            yield from _read_csv(f, start)
+
+
+def batched(records, size):
+    """
+    Lists of up to `size` records, each with the end offset of its
+    last record: (rows, offset).
+    """
+    rows = []
+    offset = None
+    for row, offset in records:
+        rows.append(row)
+        if len(rows) >= size:
+            yield rows, offset
+            rows = []
+    if rows:
+        yield rows, offset
+
+
+# ------------------------------------------------------------
+# Checkpoints
+# ------------------------------------------------------------
+
+def checkpoint_path(path):
+    return f"{path}.checkpoint"
+
+
+def _identity(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_checkpoint(path, checkpoint):
+    """
+    Saved progress for `path`, or None. Raises ValueError when the
+    checkpoint belongs to another file or the file has changed.
+    """
+    try:
+        with open(checkpoint, "rb") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if state.get("file") != _identity(path):
+        raise ValueError(f"{checkpoint} does not match {path} (file changed?)")
+    return state
+
+
+def save_checkpoint(path, checkpoint, offset, rows, changed):
+    """
+    Record progress; written to a temp file and renamed so an
+    interrupted write never leaves a torn checkpoint.
+    """
+    state = {"file": _identity(path), "offset": offset, "rows": rows, "changed": changed}
+    tmp = f"{checkpoint}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint)
@@ -1,31 +1,321 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
 from .normalizer import normalize_xyz
-from ..models import StorageBin, BinStock, Warehouse
-
-def sync_bins_from_sap(sap_rows):
-    wh, _ = Warehouse.objects.get_or_create(code="WH01", name="Main Warehouse")
-
-    for r in sap_rows:
-        x, y, z = normalize_xyz(r["Xcord"], r["Ycord"], r["Zcord"])
-
-        bin_obj, _ = StorageBin.objects.update_or_create(
-            warehouse=wh,
-            bin_code=r["Storagebin"],
-            defaults={
-                "sap_x": r["Xcord"],
-                "sap_y": r["Ycord"],
-                "sap_z": r["Zcord"],
-                "x": x,
-                "y": y,
-                "z": z,
-            },
+from .data_version import bump_data_version
+from .bin_aggregates import refresh_bin_aggregates
+from .spatial_chunks import CHUNK_SIZE
+from ..models import StorageBin, BinStock, Product, Warehouse
+
+
+# ============================================================
+# INCREMENTAL SAP SYNC
+# ============================================================
+#
+# A SAP extract lists every bin (Storagebin, X/Y/Zcord) with its
+# stock (Matnr, Batch, Quan, Auom). Most of it is unchanged from the
+# previous run, so instead of writing every row:
+#
+#   1. the extract is normalized column-wise (normalize_xyz over
+#      whole arrays); a repeated key keeps its last row
+#   2. each bin / stock record gets a fingerprint of its synced
+#      columns, and the current rows of the warehouse get the same
+#      fingerprint in one query per table
+#   3. an outer merge on the natural key splits the records into
+#      inserts, updates (fingerprint differs), deletes (missing from
+#      the extract) and unchanged
+#   4. only inserts, updates and deletes are written, in batches
+#
+# Fingerprints are computed from the stored columns rather than kept
+# in their own field, so edits made through Excel or the admin are
+# also put back in line with SAP.
+
+SAP_WAREHOUSE = "WH01"
+SYNC_BATCH = 2000
+
+BIN_FIELDS = ["x", "y", "z"]
+STOCK_FIELDS = ["quantity", "uom"]
+
+BIN_KEY = ["bin_code"]
+STOCK_KEY = ["bin_code", "sku", "batch"]
+
+
+def _chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _text(values):
+    return pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+
+
+def _fingerprint(frame, fields):
+    return pd.util.hash_pandas_object(frame[fields], index=False).to_numpy()
+
+
+def prepare_sap_rows(sap_rows):
+    """
+    (bins, stock) DataFrames for a list of SAP row dicts, one row per
+    bin_code / (bin_code, sku, batch). Blank batches are "".
+    """
+    df = pd.DataFrame.from_records(sap_rows)
+    if df.empty:
+        return (
+            pd.DataFrame(columns=BIN_KEY + BIN_FIELDS),
+            pd.DataFrame(columns=STOCK_KEY + STOCK_FIELDS),
+        )
+
+    x, y, z = normalize_xyz(df["Xcord"], df["Ycord"], df["Zcord"])
+    frame = pd.DataFrame({
+        "bin_code": _text(df["Storagebin"]),
+        "x": x,
+        "y": y,
+        "z": z,
+        "sku": _text(df["Matnr"]),
+        "batch": _text(df["Batch"]) if "Batch" in df.columns else "",
+        "quantity": pd.to_numeric(df["Quan"]).astype(np.float64),
+        "uom": _text(df["Auom"]),
+    })
+    frame = frame[frame["bin_code"] != ""]
+
+    bins = frame.drop_duplicates(BIN_KEY, keep="last")[BIN_KEY + BIN_FIELDS]
+    stock = frame[frame["sku"] != ""].drop_duplicates(STOCK_KEY, keep="last")
+    return bins.reset_index(drop=True), stock[STOCK_KEY + STOCK_FIELDS].reset_index(drop=True)
+
+
+def _diff(incoming, stored, key, fields):
+    """
+    Outer merge on `key`: (inserts, updates, deletes, unchanged count).
+    `stored` carries an `id` column.
+    """
+    incoming = incoming.assign(fp=_fingerprint(incoming, fields))
+    stored = stored.assign(fp=_fingerprint(stored, fields))
+
+    merged = incoming.merge(
+        stored[key + ["id", "fp"]], on=key, how="outer",
+        suffixes=("", "_stored"), indicator=True,
+    )
+    both = merged["_merge"] == "both"
+    changed = both & (merged["fp"] != merged["fp_stored"])
+
+    inserts = merged[merged["_merge"] == "left_only"]
+    updates = merged[changed]
+    deletes = merged[merged["_merge"] == "right_only"]
+    return inserts, updates, deletes, int((both & ~changed).sum())
+
+
+def _in_codes(qs, field, codes):
+    """
+    Rows of `qs` for the given bin codes (all rows when codes is None),
+    in IN batches.
+    """
+    if codes is None:
+        return list(qs)
+    rows = []
+    for chunk in _chunks(sorted(codes), SYNC_BATCH):
+        rows.extend(qs.filter(**{f"{field}__in": chunk}))
+    return rows
+
+
+def _stored_bins(wh, codes=None):
+    qs = StorageBin.objects.filter(warehouse=wh).values_list("id", "bin_code", *BIN_FIELDS)
+    rows = _in_codes(qs, "bin_code", codes)
+    return pd.DataFrame.from_records(rows, columns=["id", "bin_code", *BIN_FIELDS])
+
+
+def _stored_stock(wh, codes=None):
+    qs = (
+        BinStock.objects
+        .filter(bin__warehouse=wh)
+        .values_list("id", "bin__bin_code", "product__sku", "batch", *STOCK_FIELDS)
+    )
+    rows = _in_codes(qs, "bin__bin_code", codes)
+    stored = pd.DataFrame.from_records(rows, columns=["id", *STOCK_KEY, *STOCK_FIELDS])
+    stored["batch"] = stored["batch"].fillna("")
+    return stored
+
+
+def _chunk_cells(frame):
+    return {
+        f"chunk_{axis}": np.floor(frame[axis].to_numpy() / CHUNK_SIZE).astype(np.int64)
+        for axis in BIN_FIELDS
+    }
+
+
+def _write_bins(wh, inserts, updates):
+    """
+    Insert / update bins; returns (bin_code -> id of inserted bins,
+    ids of updated bins).
+    """
+    inserts = inserts.assign(**_chunk_cells(inserts))
+    updates = updates.assign(**_chunk_cells(updates))
+
+    StorageBin.objects.bulk_create(
+        [
+            StorageBin(
+                warehouse=wh, bin_code=r.bin_code, x=r.x, y=r.y, z=r.z,
+                chunk_x=r.chunk_x, chunk_y=r.chunk_y, chunk_z=r.chunk_z,
+            )
+            for r in inserts.itertuples(index=False)
+        ],
+        batch_size=SYNC_BATCH,
+    )
+    created = {}
+    for codes in _chunks(inserts["bin_code"].tolist(), SYNC_BATCH):
+        created.update(
+            StorageBin.objects
+            .filter(warehouse=wh, bin_code__in=codes)
+            .values_list("bin_code", "id")
         )
 
-        BinStock.objects.update_or_create(
-            bin=bin_obj,
-            defaults={
-                "material": r["Matnr"],
-                "batch": r.get("Batch"),
-                "quantity": float(r["Quan"]),
-                "uom": r["Auom"],
-            },
+    StorageBin.objects.bulk_update(
+        [
+            StorageBin(
+                id=int(r.id), x=r.x, y=r.y, z=r.z,
+                chunk_x=r.chunk_x, chunk_y=r.chunk_y, chunk_z=r.chunk_z,
+            )
+            for r in updates.itertuples(index=False)
+        ],
+        BIN_FIELDS + ["chunk_x", "chunk_y", "chunk_z"],
+        batch_size=SYNC_BATCH,
+    )
+    return created, [int(i) for i in updates["id"]]
+
+
+def _product_ids(skus):
+    """
+    sku -> id for every sku, creating missing products (named by sku).
+    """
+    found = {}
+    for chunk in _chunks(sorted(skus), SYNC_BATCH):
+        found.update(Product.objects.filter(sku__in=chunk).values_list("sku", "id"))
+
+    missing = [s for s in skus if s not in found]
+    if missing:
+        Product.objects.bulk_create(
+            [Product(sku=s, name=s) for s in missing],
+            batch_size=SYNC_BATCH,
+            ignore_conflicts=True,
         )
+        for chunk in _chunks(missing, SYNC_BATCH):
+            found.update(Product.objects.filter(sku__in=chunk).values_list("sku", "id"))
+    return found
+
+
+def _write_stock(bin_ids, inserts, updates):
+    """
+    Insert / update stock rows; returns the bin ids they belong to.
+    bin_ids: bin_code -> id for every bin of the extract.
+    """
+    products = _product_ids(set(inserts["sku"]))
+    now = timezone.now()
+
+    BinStock.objects.bulk_create(
+        [
+            BinStock(
+                bin_id=bin_ids[r.bin_code],
+                product_id=products[r.sku],
+                batch=r.batch or None,
+                quantity=r.quantity,
+                uom=r.uom,
+            )
+            for r in inserts.itertuples(index=False)
+        ],
+        batch_size=SYNC_BATCH,
+    )
+    BinStock.objects.bulk_update(
+        [
+            BinStock(id=int(r.id), quantity=r.quantity, uom=r.uom, last_sync=now)
+            for r in updates.itertuples(index=False)
+        ],
+        STOCK_FIELDS + ["last_sync"],
+        batch_size=SYNC_BATCH,
+    )
+    return {bin_ids[code] for code in pd.concat([inserts["bin_code"], updates["bin_code"]])}
+
+
+def _delete(model, ids):
+    for chunk in _chunks(ids, SYNC_BATCH):
+        model.objects.filter(id__in=chunk).delete()
+
+
+def _counts(inserts, updates, deletes, unchanged):
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "unchanged": unchanged,
+    }
+
+
+@transaction.atomic
+def sync_bins_from_sap(sap_rows, warehouse_code=SAP_WAREHOUSE, delete_missing=True):
+    """
+    Bring the warehouse's bins and stock in line with a SAP extract,
+    writing only what changed.
+
+    delete_missing: the extract is complete, so bins / stock rows it
+    does not list are deleted. Pass False for partial extracts (e.g.
+    one batch of a file), which only insert and update and read back
+    only the bins they list.
+
+    Returns {"bins": counts, "stock": counts, "changed": total rows
+    written}, counts being inserted / updated / deleted / unchanged.
+    """
+    wh, _ = Warehouse.objects.get_or_create(
+        code=warehouse_code, defaults={"name": "Main Warehouse"}
+    )
+    bins, stock = prepare_sap_rows(sap_rows)
+    # A partial extract only needs the rows of the bins it lists
+    codes = None if delete_missing else set(bins["bin_code"])
+
+    stored_bins = _stored_bins(wh, codes)
+    bin_inserts, bin_updates, bin_deletes, bins_unchanged = _diff(
+        bins, stored_bins, BIN_KEY, BIN_FIELDS
+    )
+
+    stored_stock = _stored_stock(wh, codes)
+    stock_inserts, stock_updates, stock_deletes, stock_unchanged = _diff(
+        stock, stored_stock, STOCK_KEY, STOCK_FIELDS
+    )
+
+    if not delete_missing:
+        bin_deletes = bin_deletes.iloc[:0]
+        stock_deletes = stock_deletes.iloc[:0]
+    else:
+        # Stock of deleted bins goes with them (cascade)
+        stock_deletes = stock_deletes[~stock_deletes["bin_code"].isin(set(bin_deletes["bin_code"]))]
+
+    created, updated_bins = _write_bins(wh, bin_inserts, bin_updates)
+    bin_ids = dict(zip(stored_bins["bin_code"], stored_bins["id"].astype(int)))
+    bin_ids.update(created)
+
+    changed_bins = set(created.values()) | set(updated_bins)
+    changed_bins |= _write_stock(bin_ids, stock_inserts, stock_updates)
+
+    if len(stock_deletes):
+        _delete(BinStock, [int(i) for i in stock_deletes["id"]])
+        changed_bins |= {bin_ids[code] for code in stock_deletes["bin_code"]}
+
+    deleted_bins = [
+        (int(bin_id), wh.id, code)
+        for bin_id, code in zip(bin_deletes["id"], bin_deletes["bin_code"])
+    ]
+    if deleted_bins:
+        _delete(StorageBin, [bin_id for bin_id, _, _ in deleted_bins])
+
+    report = {
+        "bins": _counts(bin_inserts, bin_updates, bin_deletes, bins_unchanged),
+        "stock": _counts(stock_inserts, stock_updates, stock_deletes, stock_unchanged),
+    }
+    report["changed"] = sum(
+        counts[k] for counts in report.values() for k in ("inserted", "updated", "deleted")
+    )
+
+    if changed_bins or deleted_bins:
+        refresh_bin_aggregates(changed_bins)
+        bump_data_version(wh.id, changed_bins=changed_bins, deleted_bins=deleted_bins)
+
+    return report
@@ -0,0 +1,85 @@
+import math
+
+from django.conf import settings
+
+
+# ============================================================
+# FIXED-SIZE 3D CHUNKS OVER BIN SPACE
+# ============================================================
+#
+# Every StorageBin stores the (chunk_x, chunk_y, chunk_z) cell its
+# x/y/z falls into. The cell is computed on save and indexed together
+# with the warehouse, so chunk / bounding-box queries are plain range
+# lookups. Changing BIN_CHUNK_SIZE requires
+# `manage.py rebuild_bin_chunks`.
+
+CHUNK_SIZE = float(getattr(settings, "BIN_CHUNK_SIZE", 10.0))
+CHUNK_FIELDS = ("chunk_x", "chunk_y", "chunk_z")
+
+# chunk_x / chunk_y / chunk_z are IntegerFields
+MAX_CHUNK_INDEX = 2**31 - 1
+
+
+def chunk_of(x, y, z, size=CHUNK_SIZE):
+    return (
+        math.floor((x or 0) / size),
+        math.floor((y or 0) / size),
+        math.floor((z or 0) / size),
+    )
+
+
+def chunk_id(cx, cy, cz):
+    return f"{cx}_{cy}_{cz}"
+
+
+def parse_chunk_id(value):
+    cx, cy, cz = (int(p) for p in value.split("_"))
+    if max(abs(cx), abs(cy), abs(cz)) > MAX_CHUNK_INDEX:
+        raise ValueError(f"chunk index out of range: {value}")
+    return cx, cy, cz
+
+
+def chunk_range(min_xyz, max_xyz, size=CHUNK_SIZE):
+    """
+    Inclusive (lo, hi) chunk index per axis covering a bounding box.
+    """
+    lo = chunk_of(*min_xyz, size=size)
+    hi = chunk_of(*max_xyz, size=size)
+    return [(_clamp(min(a, b)), _clamp(max(a, b))) for a, b in zip(lo, hi)]
+
+
+def _clamp(index):
+    # Huge coordinates would overflow the integer columns; no bin
+    # lies past the column range anyway
+    return min(max(index, -MAX_CHUNK_INDEX), MAX_CHUNK_INDEX)
+
+
+def rebuild_chunks(warehouse_ids=None, batch_size=2000):
+    """
+    Recompute chunk cells for every bin (after a chunk size change).
+    Returns the number of bins updated.
+    """
+    from ..models import StorageBin
+
+    qs = StorageBin.objects.order_by("id").only("id", "x", "y", "z", *CHUNK_FIELDS)
+    if warehouse_ids:
+        qs = qs.filter(warehouse_id__in=warehouse_ids)
+
+    changed = []
+    updated = 0
+    for b in qs.iterator(chunk_size=batch_size):
+        cell = chunk_of(b.x, b.y, b.z)
+        if cell != (b.chunk_x, b.chunk_y, b.chunk_z):
+            b.chunk_x, b.chunk_y, b.chunk_z = cell
+            changed.append(b)
+
+        if len(changed) >= batch_size:
+            StorageBin.objects.bulk_update(changed, CHUNK_FIELDS)
+            updated += len(changed)
+            changed = []
+
+    if changed:
+        StorageBin.objects.bulk_update(changed, CHUNK_FIELDS)
+        updated += len(changed)
+
+    return updated
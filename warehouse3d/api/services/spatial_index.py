@@ -0,0 +1,208 @@
+import math
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from ..models import StorageBin
+
+
+# ============================================================
+# IN-MEMORY SPATIAL INDEX (UNIFORM GRID)
+# ============================================================
+#
+# Per warehouse, bin centres are bucketed into cubic cells of
+# BIN_INDEX_CELL_SIZE metres. The bins are sorted by cell, so each
+# occupied cell is one contiguous slice of the numpy arrays. A query
+# visits only the cells its box or radius overlaps, then does an
+# exact vectorized check on those bins.
+#
+# Indexes are built lazily on first use and tagged with the
+# warehouse's data_version. Any write bumps the version, and the next
+# query rebuilds. Each worker process keeps its own copy.
+
+CELL_SIZE = float(getattr(settings, "BIN_INDEX_CELL_SIZE", 2.5))
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class BinSpatialIndex:
+    def __init__(self, warehouse_id, version, rows, cell_size=CELL_SIZE):
+        """
+        rows: (id, bin_code, x, y, z, width, height, depth)
+        """
+        self.warehouse_id = warehouse_id
+        self.version = version
+        self.cell_size = cell_size
+
+        rows = list(rows)
+        self.count = len(rows)
+
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        codes = [r[1] for r in rows]
+        pos = np.array([r[2:5] for r in rows], dtype=np.float64).reshape(-1, 3)
+        half = np.array([r[5:8] for r in rows], dtype=np.float64).reshape(-1, 3) / 2
+
+        cells = np.floor(pos / cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 2], cells[:, 1], cells[:, 0]))
+
+        self.ids = ids[order]
+        self.codes = [codes[i] for i in order.tolist()]
+        self.pos = pos[order]
+        self.half = half[order]
+        cells = cells[order]
+
+        # Slice of the sorted arrays per occupied cell
+        self._cells = {}
+        if self.count:
+            change = np.any(np.diff(cells, axis=0) != 0, axis=1)
+            starts = np.concatenate(([0], np.nonzero(change)[0] + 1))
+            ends = np.append(starts[1:], self.count)
+            for cell, start, end in zip(cells[starts].tolist(), starts.tolist(), ends.tolist()):
+                self._cells[tuple(cell)] = (start, end)
+
+            self._cell_lo = cells.min(axis=0)
+            self._cell_hi = cells.max(axis=0)
+
+    def _cell(self, point):
+        """
+        Cell of `point`, clamped to one cell beyond the occupied ones.
+        Clamping only moves the cell towards every bin, so a far-away
+        (or huge) coordinate sees the same bins at smaller indexes.
+        """
+        cell = np.floor(np.asarray(point, dtype=np.float64) / self.cell_size)
+        return np.clip(cell, self._cell_lo - 1, self._cell_hi + 1).astype(np.int64)
+
+    def _candidates(self, lo, hi):
+        """
+        Indices of bins in cells lo..hi (inclusive, per axis).
+        """
+        lo = np.maximum(lo, self._cell_lo)
+        hi = np.minimum(hi, self._cell_hi)
+        if np.any(lo > hi):
+            return np.empty(0, dtype=np.int64)
+
+        span = int(np.prod(hi - lo + 1))
+        if span >= len(self._cells):
+            # Box covers more cells than are occupied: walk those instead
+            slices = [
+                (s, e) for (cx, cy, cz), (s, e) in self._cells.items()
+                if lo[0] <= cx <= hi[0] and lo[1] <= cy <= hi[1] and lo[2] <= cz <= hi[2]
+            ]
+        else:
+            get = self._cells.get
+            slices = [
+                found
+                for cx in range(lo[0], hi[0] + 1)
+                for cy in range(lo[1], hi[1] + 1)
+                for cz in range(lo[2], hi[2] + 1)
+                if (found := get((cx, cy, cz)))
+            ]
+
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in slices])
+
+    def within_box(self, lo, hi):
+        """
+        Indices of bins whose centre lies inside the box, in cell order.
+        """
+        if not self.count:
+            return np.empty(0, dtype=np.int64)
+
+        lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+        lo, hi = np.minimum(lo, hi), np.maximum(lo, hi)
+        idx = self._candidates(self._cell(lo), self._cell(hi))
+        p = self.pos[idx]
+        inside = np.all((p >= lo) & (p <= hi), axis=1)
+        return idx[inside]
+
+    def nearest(self, point, k=1, radius=None):
+        """
+        (indices, distances) of the k bins nearest to `point`, closest
+        first. With `radius`, only bins within that distance.
+        """
+        if not self.count:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        point = np.asarray(point, dtype=np.float64)
+        centre = self._cell(point)
+        full = int(np.max(np.maximum(
+            np.abs(centre - self._cell_lo), np.abs(self._cell_hi - centre)
+        )))
+
+        if radius is not None:
+            # No need to look past the occupied cells
+            reach = min(math.ceil(radius / self.cell_size), full)
+        else:
+            reach = 1
+
+        while True:
+            idx = self._candidates(centre - reach, centre + reach)
+            dist = np.linalg.norm(self.pos[idx] - point, axis=1)
+
+            if radius is not None:
+                keep = dist <= radius
+                idx, dist = idx[keep], dist[keep]
+                break
+
+            # Every bin within reach * cell_size is among the
+            # candidates, so the k-th distance is final once inside it
+            if len(idx) >= k and np.partition(dist, k - 1)[k - 1] <= reach * self.cell_size:
+                break
+            if reach >= full:
+                break
+            reach = min(reach * 2, full)
+
+        if len(idx) > k:
+            top = np.argpartition(dist, k - 1)[:k]
+            idx, dist = idx[top], dist[top]
+
+        order = np.argsort(dist, kind="stable")
+        return idx[order], dist[order]
+
+    def contains(self, i, point):
+        return bool(np.all(np.abs(self.pos[i] - point) <= self.half[i]))
+
+    def bin(self, i):
+        x, y, z = self.pos[i].tolist()
+        w, h, d = (self.half[i] * 2).tolist()
+        return {
+            "id": int(self.ids[i]),
+            "bin_code": self.codes[i],
+            "x": x,
+            "y": y,
+            "z": z,
+            "width": w,
+            "height": h,
+            "depth": d,
+        }
+
+
+def get_index(warehouse):
+    """
+    Spatial index for `warehouse` at its current data_version,
+    building it on first use or after a write.
+    """
+    index = _indexes.get(warehouse.id)
+    if index is not None and index.version == warehouse.data_version:
+        return index
+
+    with _lock:
+        index = _indexes.get(warehouse.id)
+        if index is None or index.version != warehouse.data_version:
+            rows = (
+                StorageBin.objects
+                .filter(warehouse_id=warehouse.id)
+                .values_list("id", "bin_code", "x", "y", "z", "width", "height", "depth")
+            )
+            index = BinSpatialIndex(warehouse.id, warehouse.data_version, rows)
+            _indexes[warehouse.id] = index
+
+    return index
+
+
+def drop_indexes(*warehouse_ids):
+    for wid in warehouse_ids:
+        _indexes.pop(wid, None)
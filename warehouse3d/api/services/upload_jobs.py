@@ -0,0 +1,202 @@
+import os
+import socket
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import UploadJob
+from .bin_aggregates import refresh_bin_aggregates
+from .bin_import import REQUIRED_COLUMNS as BIN_REQUIRED, import_bins
+from .bin_stock_import import REQUIRED_COLUMNS as BIN_PRODUCT_REQUIRED, import_bin_products
+from .data_version import bump_data_version
+from .excel_reader import BIN_PRODUCT_SHEET, BIN_SHEET, ExcelWorkbook
+
+
+# ============================================================
+# BACKGROUND UPLOAD JOBS
+# ============================================================
+#
+# Upload endpoints called with ?async=1 store the file as an
+# UploadJob and return 202 at once. `manage.py run_upload_worker`
+# processes jobs in separate processes:
+#
+#   claim_next()   oldest queued job -> running. On PostgreSQL the
+#                  row is picked with SELECT ... FOR UPDATE SKIP
+#                  LOCKED, so several workers drain the queue without
+#                  waiting on each other.
+#   run_job()      streams the sheet batch by batch. Each batch is
+#                  its own transaction (import, aggregates, data
+#                  version) followed by a progress write, so
+#                  /api/jobs/<id>/ and the live viewers see progress
+#                  as it happens.
+#
+# Imports are upserts, so a job requeued after a worker died (see
+# requeue_stale) can safely run again from the start.
+
+MAX_STORED_ERRORS = 1000
+MAX_ATTEMPTS = 3
+
+# kind -> (sheet, columns, required columns, import function)
+JOB_KINDS = {
+    UploadJob.KIND_BINS: (
+        "Bins",
+        BIN_SHEET,
+        BIN_REQUIRED,
+        import_bins,
+    ),
+    UploadJob.KIND_BIN_PRODUCTS: (
+        "BinProduct",
+        BIN_PRODUCT_SHEET,
+        BIN_PRODUCT_REQUIRED,
+        import_bin_products,
+    ),
+}
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_upload(kind, uploaded_file):
+    job = UploadJob(kind=kind)
+    job.file.save(os.path.basename(uploaded_file.name), uploaded_file, save=False)
+    job.save()
+    return job
+
+
+def claim_next(worker):
+    """
+    Mark the oldest queued job as running for `worker` and return it,
+    or None when the queue is empty.
+    """
+    with transaction.atomic():
+        qs = UploadJob.objects.filter(status=UploadJob.STATUS_QUEUED).order_by("created_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+
+        job = qs.first()
+        if job is None:
+            return None
+
+        # Guarded update: without row locks (SQLite) two workers may
+        # read the same job; only one of them flips it
+        claimed = UploadJob.objects.filter(
+            pk=job.pk, status=UploadJob.STATUS_QUEUED
+        ).update(
+            status=UploadJob.STATUS_RUNNING,
+            worker=worker,
+            attempts=job.attempts + 1,
+            started_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            return None
+
+    job.refresh_from_db()
+    return job
+
+
+def requeue_stale(older_than):
+    """
+    Put running jobs with no progress for `older_than` (a timedelta)
+    back on the queue; fail those out of attempts. Returns
+    (requeued, failed).
+    """
+    stale = UploadJob.objects.filter(
+        status=UploadJob.STATUS_RUNNING,
+        updated_at__lt=timezone.now() - older_than,
+    )
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=UploadJob.STATUS_FAILED,
+        message="Worker stopped responding",
+        finished_at=timezone.now(),
+    )
+    requeued = stale.update(
+        status=UploadJob.STATUS_QUEUED,
+        rows_processed=0,
+        rows_imported=0,
+        error_count=0,
+        errors=[],
+    )
+    return requeued, failed
+
+
+def _save_progress(job, *fields):
+    job.save(update_fields=[*fields, "updated_at"])
+
+
+def run_job(job):
+    """
+    Process a claimed job to done / failed.
+    """
+    sheet, columns, required, import_rows = JOB_KINDS[job.kind]
+
+    try:
+        with job.file.open("rb") as f, ExcelWorkbook(f) as book:
+            missing = required - set(book.header(sheet))
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+
+            job.rows_total = book.row_count(sheet)
+            _save_progress(job, "rows_total")
+
+            for df in book.batches(sheet, columns):
+                with transaction.atomic():
+                    imported, errors, touched, bin_ids = import_rows(df)
+                    refresh_bin_aggregates(bin_ids)
+                    bump_data_version(*touched, changed_bins=bin_ids)
+
+                job.rows_processed += len(df)
+                job.rows_imported += imported
+                job.error_count += len(errors)
+                job.errors.extend(errors[:MAX_STORED_ERRORS - len(job.errors)])
+                _save_progress(job, "rows_processed", "rows_imported", "error_count", "errors")
+
+    except Exception as e:
+        job.status = UploadJob.STATUS_FAILED
+        job.message = str(e)
+    else:
+        job.status = UploadJob.STATUS_DONE
+        # Row counts from the sheet dimensions include blank rows
+        job.rows_total = job.rows_processed
+
+    job.finished_at = timezone.now()
+    _save_progress(job, "status", "message", "rows_total", "finished_at")
+    return job
+
+
+def job_status(job, now=None):
+    """
+    Status payload for /api/jobs/<id>/, with throughput and ETA while
+    the job runs.
+    """
+    now = now or timezone.now()
+
+    rate = eta = None
+    if job.started_at and job.rows_processed:
+        end = job.finished_at or now
+        elapsed = (end - job.started_at).total_seconds()
+        if elapsed > 0:
+            rate = job.rows_processed / elapsed
+    if job.status == UploadJob.STATUS_RUNNING and rate and job.rows_total:
+        eta = max(job.rows_total - job.rows_processed, 0) / rate
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "rows_total": job.rows_total,
+        "rows_processed": job.rows_processed,
+        "rows_imported": job.rows_imported,
+        "error_count": job.error_count,
+        "errors": job.errors,
+        "errors_truncated": job.error_count > len(job.errors),
+        "message": job.message,
+        "rows_per_second": round(rate, 1) if rate else None,
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
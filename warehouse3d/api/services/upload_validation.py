@@ -0,0 +1,213 @@
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.db.models.functions import Upper
+
+from ..models import StorageBin, Warehouse
+from .bin_import import REQUIRED_COLUMNS as BIN_REQUIRED, prepare_bins
+from .bin_stock_import import (
+    REQUIRED_COLUMNS as BIN_PRODUCT_REQUIRED,
+    UNKNOWN_BIN,
+    UNKNOWN_WAREHOUSE,
+    prepare_bin_products,
+)
+
+
+# ============================================================
+# DRY-RUN VALIDATION (?dry_run=1)
+# ============================================================
+#
+# Validates whole sheets column-wise without writing anything:
+#
+#   - required columns, types and lengths (the import's own
+#     prepare_bins / prepare_bin_products)
+#   - repeated keys: (warehouse, bin_code) on Bins,
+#     (warehouse, bin_code, sku, batch) on BinProduct. The imports
+#     keep the last row of a repeated key, so these are warnings on
+#     the rows that get replaced, not errors
+#   - BinProduct rows pointing at unknown warehouses / bins, resolved
+#     with IN queries on the codes the sheet names. Bins created by a
+#     Bins sheet in the same upload count as known.
+#
+# Errors and warnings carry the sheet and Excel row, in the shape the
+# upload endpoints already report. `valid` only depends on errors: a
+# valid dry run means the real import loads every row.
+
+BIN_KEY = ["warehouse_code", "bin_code"]
+BIN_PRODUCT_KEY = ["warehouse_code", "bin_code", "sku", "batch"]
+# Codes per IN query; stays under the bind parameter limits of
+# SQLite (32766) and PostgreSQL (65535)
+REFERENCE_BATCH = 10000
+
+
+def _missing_columns(sheet, df, required):
+    missing = required - set(df.columns)
+    if not missing:
+        return None
+    return {
+        "sheet": sheet,
+        "row": 1,
+        "error": f"Missing columns: {', '.join(sorted(missing))}",
+    }
+
+
+def _duplicate_warnings(sheet, df, frame, errors, key, label):
+    """
+    Warn on every valid row whose key repeats further down; the
+    import replaces it with the last one.
+    """
+    ok = errors.ok
+    positions = np.flatnonzero(ok)
+    keys = frame.loc[ok, key].fillna("")
+
+    group = keys.groupby(key, sort=False).ngroup().to_numpy()
+    last = pd.Series(positions).groupby(group).transform("last").to_numpy()
+
+    replaced = positions != last
+    warehouse_codes = df["warehouse_code"].to_numpy()
+    bin_codes = df["bin_code"].to_numpy()
+
+    warnings = []
+    for pos, last_pos in zip(positions[replaced].tolist(), last[replaced].tolist()):
+        warnings.append({
+            "sheet": sheet,
+            "row": int(errors.rows[pos]),
+            "warehouse_code": None if pd.isna(warehouse_codes[pos]) else warehouse_codes[pos],
+            "bin_code": None if pd.isna(bin_codes[pos]) else bin_codes[pos],
+            "warning": (
+                f"duplicate {label}, replaced by row {errors.rows[last_pos]} "
+                "(last row wins)"
+            ),
+        })
+    return warnings
+
+
+def _stored_bins(warehouse_id, codes):
+    """
+    The upper-case `codes` that name a bin of the warehouse, matched
+    case-insensitively like the import.
+    """
+    table = StorageBin._meta.db_table
+    found = set()
+
+    with connection.cursor() as cursor:
+        # Index probes on (warehouse, bin_code). Raw SQL: the ORM
+        # prepares every IN value in Python
+        for start in range(0, len(codes), REFERENCE_BATCH):
+            batch = codes[start:start + REFERENCE_BATCH]
+            cursor.execute(
+                f"SELECT bin_code FROM {table} "
+                f"WHERE warehouse_id = %s AND bin_code IN ({', '.join(['%s'] * len(batch))})",
+                [warehouse_id, *batch],
+            )
+            found.update(code for (code,) in cursor.fetchall())
+
+        if len(found) < len(codes):
+            # The rest can only match bins stored in another case
+            cursor.execute(
+                f"SELECT UPPER(bin_code) FROM {table} "
+                "WHERE warehouse_id = %s AND bin_code <> UPPER(bin_code)",
+                [warehouse_id],
+            )
+            wanted = set(codes)
+            found.update(code for (code,) in cursor.fetchall() if code in wanted)
+
+    return found
+
+
+def _check_references(frame, errors, new_bins):
+    """
+    Unknown warehouse / bin for the valid rows of a BinProduct frame.
+    new_bins: (warehouse_code, bin_code) pairs a Bins sheet will create.
+    """
+    ok = errors.ok
+    warehouse_codes = frame["warehouse_code"].fillna("").to_numpy(dtype=object)
+    bin_codes = frame["bin_code"].fillna("").to_numpy(dtype=object)
+
+    warehouse_ids = dict(
+        Warehouse.objects
+        .annotate(code_upper=Upper("code"))
+        .filter(code_upper__in=sorted(set(warehouse_codes[ok].tolist())))
+        .values_list("code_upper", "id")
+    )
+
+    # Only the bins the sheet names, not every bin of its warehouses
+    known = defaultdict(set)
+    for wh, code in new_bins:
+        known[wh].add(code)
+    for code, warehouse_id in warehouse_ids.items():
+        named = pd.unique(bin_codes[ok & (warehouse_codes == code)]).tolist()
+        known[code] |= _stored_bins(warehouse_id, named)
+
+    # Hash lookups on object arrays; Series.isin on Arrow-backed
+    # strings boxes every value first
+    known_warehouse = pd.Series(warehouse_codes, dtype=object).isin(list(known)).to_numpy()
+    known_bin = np.zeros(len(frame), dtype=bool)
+    for wh, codes in known.items():
+        rows = warehouse_codes == wh
+        known_bin[rows] = pd.Series(bin_codes[rows], dtype=object).isin(list(codes)).to_numpy()
+
+    errors.flag(ok & ~known_warehouse, UNKNOWN_WAREHOUSE)
+    errors.flag(ok & known_warehouse & ~known_bin, UNKNOWN_BIN)
+
+
+def _report(sheet, df, errors):
+    report = errors.report(context={
+        "warehouse_code": df["warehouse_code"].reset_index(drop=True),
+        "bin_code": df["bin_code"].reset_index(drop=True),
+    })
+    return [{"sheet": sheet, **entry} for entry in report]
+
+
+def dry_run(bins=None, bin_products=None):
+    """
+    Full error / warning report for a Bins and / or BinProduct sheet
+    (DataFrames as read for import). Nothing is written.
+    """
+    errors = []
+    warnings = []
+    rows = {}
+    new_bins = set()
+
+    if bins is not None:
+        rows["Bins"] = len(bins)
+        missing = _missing_columns("Bins", bins, BIN_REQUIRED)
+        if missing:
+            errors.append(missing)
+        else:
+            frame, row_errors = prepare_bins(bins)
+            warnings.extend(_duplicate_warnings(
+                "Bins", bins, frame, row_errors, BIN_KEY, "warehouse_code / bin_code"
+            ))
+            ok = row_errors.ok
+            new_bins = set(zip(
+                frame["warehouse_code"].to_numpy()[ok].tolist(),
+                frame["bin_code"].to_numpy()[ok].tolist(),
+            ))
+            errors.extend(_report("Bins", bins, row_errors))
+
+    if bin_products is not None:
+        rows["BinProduct"] = len(bin_products)
+        missing = _missing_columns("BinProduct", bin_products, BIN_PRODUCT_REQUIRED)
+        if missing:
+            errors.append(missing)
+        else:
+            frame, row_errors = prepare_bin_products(bin_products)
+            _check_references(frame, row_errors, new_bins)
+            warnings.extend(_duplicate_warnings(
+                "BinProduct", bin_products, frame, row_errors,
+                BIN_PRODUCT_KEY, "warehouse_code / bin_code / sku / batch",
+            ))
+            errors.extend(_report("BinProduct", bin_products, row_errors))
+
+    return {
+        "dry_run": True,
+        "valid": not errors,
+        "rows": rows,
+        "error_count": len(errors),
+        "errors": errors,
+        "warning_count": len(warnings),
+        "warnings": warnings,
+    }
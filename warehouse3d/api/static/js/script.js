@@ -206,6 +206,15 @@ let zones = [];
 const API_GET = "/api/bin-heatmap/";
 
 const API_SAVE_POSITION = "/api/bins/update-position/";
+
+// Bin payload format, ?loader= on the viewer URL:
+//   json       /api/warehouse-heatmap-api/ (default)
+//   binary     /api/bins/binary/ typed-array columns
+//   instanced  /api/bins/instanced/: one InstancedMesh per geometry
+//              class, bins at their stored x/y/z (&color=abc|heat)
+const VIEWER_PARAMS = new URLSearchParams(window.location.search);
+const BIN_LOADER = VIEWER_PARAMS.get("loader") || "json";
+const INSTANCED_COLOR = VIEWER_PARAMS.get("color") || "occupancy";
 const GRID_SIZE = 1.0; // 2m grid (your choice C)
 
 function createBinGroup(binMeta) {
@@ -239,10 +248,14 @@ async function init() {
   if (loadingEl) loadingEl.style.display = "flex";
 
   try {
-    const res = await fetch("/api/warehouse-heatmap-api/");
-    if (!res.ok) throw new Error("No DB data");
+    if (BIN_LOADER === "instanced") {
+      await loadInstancedBins();
+      animate();
+      subscribeBinEvents();
+      return;
+    }
 
-    const payload = await res.json();
+    const payload = await fetchBinPayload();
 
     if (!payload.bins || payload.bins.length === 0) {
       alert("No bins in database. Please upload Excel.");
@@ -252,6 +265,7 @@ async function init() {
     renderBinsFromDB(payload);
     createZones();
     animate();
+    subscribeBinEvents();
   } catch (err) {
     console.error("Failed to load bins from DB:", err);
     alert("Failed to load bins from database.");
@@ -693,13 +707,12 @@ async function loadNestedBinsFromApi() {
 
   try {
     // 1. Fetch from Django
-    const res = await fetch("/api/warehouse-heatmap-api/");
-    if (!res.ok) throw new Error("API Failed");
-
-    const payload = await res.json();
+    const payload = await fetchBinPayload();
 
     // 2. Render using DB coordinates
     renderBinsFromDB(payload);
+    if (overlayMode && overlayMode !== "none") applyOverlayMode(overlayMode);
+    if (BIN_LOADER === "binary") loadBinaryProducts().catch((err) => console.warn("Product load failed:", err));
 
     return true;
   } catch (err) {
@@ -710,6 +723,266 @@ async function loadNestedBinsFromApi() {
   }
 }
 
+// ---------------- Binary columnar loader ----------------
+// Decodes /api/bins/binary/ into typed arrays that can be handed
+// straight to InstancedMesh attributes (position / dimensions are
+// interleaved xyz, 3 floats per bin).
+const BINARY_TYPES = { Float32Array, Uint32Array, Uint16Array, Uint8Array };
+
+function decodeBinaryBins(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "WHB1") throw new Error("Unexpected binary payload");
+
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const dataStart = 8 + headerLength;
+
+  const columns = {};
+  Object.entries(header.columns).forEach(([name, col]) => {
+    columns[name] = new BINARY_TYPES[col.type](buffer, dataStart + col.offset, col.length);
+  });
+
+  return { ...header, columns };
+}
+
+async function fetchBinaryBins(warehouseCode = "WH1") {
+  const res = await fetch(`/api/bins/binary/?warehouse=${encodeURIComponent(warehouseCode)}`);
+  if (!res.ok) throw new Error("Binary API failed");
+  const payload = { bins: binsFromBinaryColumns(decodeBinaryBins(await res.arrayBuffer())) };
+  return { res, payload };
+}
+
+// Expand decoded columns into the bin objects renderBinsFromDB expects
+function binsFromBinaryColumns(decoded) {
+  const { position, dimensions, qty, hits, layout, abc, zone } = decoded.columns;
+  const bins = new Array(decoded.count);
+
+  for (let i = 0; i < decoded.count; i++) {
+    const i3 = i * 3;
+    bins[i] = {
+      bin_code: decoded.bin_codes[i],
+      x: position[i3],
+      y: position[i3 + 1],
+      z: position[i3 + 2],
+      width: dimensions[i3],
+      height: dimensions[i3 + 1],
+      depth: dimensions[i3 + 2],
+      row: layout[i3],
+      shelf: layout[i3 + 1],
+      level: layout[i3 + 2],
+      qty: qty[i],
+      hits: hits[i],
+      abc: decoded.abc[abc[i]],
+      zone: decoded.zones[zone[i]],
+      occupied: qty[i] > 0,
+    };
+  }
+
+  return bins;
+}
+
+// The binary payload carries no products: fetch them after the first
+// render and merge them into the payload bins (shared with their meshes)
+async function loadBinaryProducts(warehouseCode = "WH1") {
+  const params = new URLSearchParams({ warehouse: warehouseCode, fields: "bin_code,products" });
+  const res = await fetch(`/api/warehouse-heatmap-api/?${params}`);
+  if (!res.ok || !binPayload) return;
+
+  const { bins } = await res.json();
+  const byCode = new Map(binPayload.bins.map((b) => [b.bin_code, b]));
+  bins.forEach(({ bin_code, products }) => {
+    const bin = byCode.get(bin_code);
+    if (bin) bin.products = products;
+  });
+  if (overlayMode && overlayMode !== "none") applyOverlayMode(overlayMode);
+}
+
+async function fetchHeatmapBins(warehouseCode = "WH1") {
+  const res = await fetch(`/api/warehouse-heatmap-api/?warehouse=${encodeURIComponent(warehouseCode)}`);
+  if (!res.ok) throw new Error("No DB data");
+  return { res, payload: await res.json() };
+}
+
+// Bins for renderBinsFromDB in the BIN_LOADER format
+async function fetchBinPayload(warehouseCode = "WH1") {
+  const { res, payload } = BIN_LOADER === "binary" ? await fetchBinaryBins(warehouseCode) : await fetchHeatmapBins(warehouseCode);
+  setBinPayload(payload, res);
+  return payload;
+}
+
+// ---------------- Instanced loader ----------------
+// /api/bins/instanced/ groups bins by geometry class; each class is
+// drawn as one InstancedMesh (one draw call) instead of a mesh per bin.
+async function fetchInstancedBins(warehouseCode = "WH1", colorMode = "occupancy") {
+  const params = new URLSearchParams({ warehouse: warehouseCode, color: colorMode });
+  const res = await fetch(`/api/bins/instanced/?${params}`);
+  if (!res.ok) throw new Error("Instanced API failed");
+  return { res, payload: await res.json() };
+}
+
+function buildInstancedBins(payload) {
+  const group = new THREE.Group();
+  const dummy = new THREE.Object3D();
+  const color = new THREE.Color();
+
+  payload.classes.forEach((cls) => {
+    const { width, height, depth } = cls.geometry;
+    const mesh = new THREE.InstancedMesh(
+      new THREE.BoxGeometry(width, height, depth),
+      new THREE.MeshLambertMaterial({ transparent: true, opacity: 0.95 }),
+      cls.count
+    );
+
+    for (let i = 0; i < cls.count; i++) {
+      const i3 = i * 3;
+      dummy.position.set(cls.positions[i3], cls.positions[i3 + 1], cls.positions[i3 + 2]);
+      dummy.updateMatrix();
+      mesh.setMatrixAt(i, dummy.matrix);
+      mesh.setColorAt(i, color.setHex(cls.colors[i]));
+    }
+
+    mesh.instanceMatrix.needsUpdate = true;
+    if (mesh.instanceColor) mesh.instanceColor.needsUpdate = true;
+
+    // raycast hit.instanceId -> bin code
+    mesh.userData.binCodes = cls.bin_codes;
+    mesh.userData.geometryClass = cls.geometry;
+    group.add(mesh);
+  });
+
+  return group;
+}
+
+// Replaces the scene's bins; live events call it again (one request,
+// one draw call per class) instead of patching meshes
+async function loadInstancedBins(warehouseCode = "WH1", colorMode = INSTANCED_COLOR) {
+  const { res, payload } = await fetchInstancedBins(warehouseCode, colorMode);
+
+  if (warehouse) scene.remove(warehouse);
+  warehouse = new THREE.Group();
+  createFloor();
+  const group = buildInstancedBins(payload);
+  warehouse.add(group);
+  createCeiling();
+  scene.add(warehouse);
+
+  // No per-bin payload to patch
+  setBinPayload(null, res);
+  return group;
+}
+
+// ---------------- Live bin events (SSE) ----------------
+// Event ids are data versions. binPayload is the rendered payload and
+// binVersion its version (X-Data-Version); every (re)connect first
+// catches up through /api/bins/changes/ so writes made while the
+// stream was down are not lost.
+let binEventSource = null;
+let binPayload = null;
+let binVersion = null;
+
+// A change to any of these moves / resizes the bin: lay the racks out again
+const BIN_LAYOUT_KEYS = ["row", "shelf", "level", "x", "y", "z", "width", "height", "depth", "occupied"];
+
+// Binary payloads hold float32: compare numbers at that precision
+function sameBinValue(a, b) {
+  if (typeof a === "number" && typeof b === "number") return Math.fround(a) === Math.fround(b);
+  return a === b;
+}
+
+function setBinPayload(payload, res) {
+  binPayload = payload;
+  const version = res.headers.get("X-Data-Version");
+  binVersion = version === null ? null : Number(version);
+}
+
+function findBinGroup(binCode) {
+  let found = null;
+  if (!warehouse) return null;
+  warehouse.traverse((obj) => {
+    if (!found && obj.userData?.isBinGroup && obj.userData.bin?.bin_code === binCode) found = obj;
+  });
+  return found;
+}
+
+function reloadBins() {
+  return BIN_LOADER === "instanced" ? loadInstancedBins() : loadNestedBinsFromApi();
+}
+
+function applyBinChanges(bins, deleted) {
+  if (BIN_LOADER === "instanced") {
+    reloadBins();
+    return;
+  }
+  if (!binPayload) return;
+
+  const byCode = new Map(binPayload.bins.map((b) => [b.bin_code, b]));
+  let relayout = false;
+
+  bins.forEach((changes) => {
+    const bin = byCode.get(changes.bin_code);
+    if (!bin) {
+      binPayload.bins.push(changes);
+      relayout = true;
+      return;
+    }
+    if (BIN_LAYOUT_KEYS.some((k) => k in changes && !sameBinValue(changes[k], bin[k]))) relayout = true;
+    // payload bin, its group and its box share the same object
+    Object.assign(bin, changes);
+  });
+
+  if (deleted.length) {
+    const gone = new Set(deleted);
+    binPayload.bins = binPayload.bins.filter((b) => !gone.has(b.bin_code));
+    relayout = true;
+  }
+
+  if (relayout) renderBinsFromDB(binPayload);
+  if (overlayMode && overlayMode !== "none") applyOverlayMode(overlayMode);
+}
+
+async function catchUpBinChanges(warehouseCode) {
+  if (binVersion === null) return;
+
+  const params = new URLSearchParams({ warehouse: warehouseCode, since: binVersion });
+  const res = await fetch(`/api/bins/changes/?${params}`);
+  if (res.status === 410) {
+    // Log compacted past our version
+    await reloadBins();
+    return;
+  }
+  if (!res.ok) return;
+
+  const delta = await res.json();
+  if (delta.version <= binVersion) return;
+  applyBinChanges(delta.bins, delta.deleted);
+  binVersion = delta.version;
+}
+
+function subscribeBinEvents(warehouseCode = "WH1") {
+  if (!window.EventSource) return;
+  if (binEventSource) binEventSource.close();
+
+  binEventSource = new EventSource(`/api/bins/events/?warehouse=${encodeURIComponent(warehouseCode)}`);
+
+  // Fires on the first connect and on every automatic reconnect
+  binEventSource.addEventListener("open", () => {
+    catchUpBinChanges(warehouseCode).catch((err) => console.warn("Bin catch-up failed:", err));
+  });
+
+  binEventSource.addEventListener("bins", (e) => {
+    const data = JSON.parse(e.data);
+    // Already applied by a catch-up
+    if (binVersion !== null && data.version <= binVersion) return;
+    applyBinChanges(data.bins, data.deleted);
+    binVersion = data.version;
+  });
+
+  binEventSource.addEventListener("reload", () => {
+    reloadBins();
+  });
+}
+
 function assignMockHeatData(bin) {
   // ABC distribution (realistic)
   const r = Math.random();
@@ -1,3 +1,1872 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+import struct
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import views
+from .models import (
+    BinAggregate, BinChange, BinSnapshot, BinStock, PickingHeatmap, Product, ReplenishmentUpload,
+    StorageBin, UploadJob, Warehouse, WarehouseConfig, WarehouseSnapshot,
+)
+from .services import (
+    analytics_uploads, bin_binary, bin_events, bin_import, bin_instances, bin_pagination,
+    bin_serializer, bin_stock_import, columnar_cache, compression, payload_cache, upload_jobs,
+)
+from .services.bin_aggregates import (
+    refresh_bin_aggregates, verify_bin_aggregates, with_stored_metrics,
+)
+from .services.bin_events import broker, poll_event
+from .services.bin_import import import_bins
+from .services.bin_metrics import with_bin_metrics
+from .services.bin_pagination import KEYSET_ORDER, bin_page, filtered_bins
+from .services.bin_serializer import HEATMAP_BIN_FIELDS
+from .services.bin_stock_import import import_bin_products
+from .services.change_log import changes_since, compact_changes
+from .services.columnar_cache import cached_frame
+from .services.data_version import bump_data_version
+from .services.pick_events import pick_chart_data, store_pick_events
+from .services.projection import InvalidProjection, parse_projection
+from .services.sap_feed import checkpoint_path, load_checkpoint, save_checkpoint
+from .services.sap_sync import sync_bins_from_sap
+from .services.spatial_chunks import CHUNK_SIZE
+from .services.spatial_index import BinSpatialIndex
+from .services.upload_validation import dry_run
+
+
+def make_bins(warehouse, count, layout=lambda i: (i % 3, i % 2, 0), **extra):
+    StorageBin.objects.bulk_create([
+        StorageBin(
+            warehouse=warehouse,
+            bin_code=f"B{i:04d}",
+            row=layout(i)[0],
+            shelf=layout(i)[1],
+            level=layout(i)[2],
+            x=float(i), y=0.0, z=0.0,
+            **extra,
+        )
+        for i in range(count)
+    ])
+
+
+def add_stock(bin, sku, quantity, hits=0, abc="C", batch=None):
+    product, _ = Product.objects.get_or_create(sku=sku, defaults={"name": sku})
+    return BinStock.objects.create(
+        bin=bin, product=product, batch=batch,
+        quantity=quantity, hit_count=hits, abc_class=abc,
+    )
+
+def local_payload_cache(test):
+    """
+    Payloads in the (cleared) locmem cache instead of the file cache.
+    """
+    patcher = mock.patch.object(payload_cache, "PAYLOAD_CACHE_ALIAS", "default")
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    caches["default"].clear()
+
+
+# ============================================================
+# HEATMAP METRICS
+# ============================================================
+
+class HeatmapMetricsTests(TestCase):
+    def setUp(self):
+        local_payload_cache(self)
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 3)
+        self.b0, self.b1, self.b2 = StorageBin.objects.order_by("bin_code")
+        add_stock(self.b0, "P1", 5, hits=2, abc="B")
+        add_stock(self.b0, "P2", 3, hits=1, abc="A")
+        add_stock(self.b1, "P1", 0, hits=4)
+        refresh_bin_aggregates([self.b0.id, self.b1.id])
+
+    def test_metrics_roll_up_stock_in_sql(self):
+        rows = (
+            with_bin_metrics(StorageBin.objects.filter(warehouse=self.wh))
+            .order_by("bin_code")
+            .values_list("bin_code", "total_qty", "total_hits", "product_count", "abc_rank")
+        )
+        self.assertEqual(list(rows), [
+            ("B0000", 8.0, 3, 2, 3),
+            ("B0001", 0.0, 4, 1, 1),
+            ("B0002", 0.0, 0, 0, 1),
+        ])
+
+    def test_heatmap_api_bins(self):
+        bins = {
+            b["bin_code"]: b
+            for b in json.loads(self.client.get("/api/warehouse-heatmap-api/").content)["bins"]
+        }
+        self.assertEqual(
+            {code: (b["qty"], b["hits"], b["abc"], b["occupied"]) for code, b in bins.items()},
+            {
+                "B0000": (8.0, 3, "A", True),
+                "B0001": (0.0, 4, "C", False),
+                "B0002": (0.0, 0, "C", False),
+            },
+        )
+        self.assertEqual([p["sku"] for p in bins["B0000"]["products"]], ["P1", "P2"])
+        self.assertEqual(bins["B0002"]["products"], [])
+
+    def test_query_count_does_not_grow_with_bins(self):
+        def queries():
+            caches["default"].clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get("/api/warehouse-heatmap-api/")
+            return len(ctx.captured_queries)
+
+        queries()  # creates the default config
+        before = queries()
+        StorageBin.objects.bulk_create([
+            StorageBin(warehouse=self.wh, bin_code=f"N{i}", row=5, shelf=i, level=0, x=0, y=0, z=0)
+            for i in range(20)
+        ])
+        for b in StorageBin.objects.filter(row=5):
+            add_stock(b, "P3", 1)
+        refresh_bin_aggregates(StorageBin.objects.values_list("id", flat=True))
+        self.assertEqual(queries(), before)
+
+
+# ============================================================
+# BIN AGGREGATES
+# ============================================================
+
+class BinAggregateTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 2)
+        self.b0, self.b1 = StorageBin.objects.order_by("bin_code")
+        self.stock = add_stock(self.b0, "P1", 5, hits=2, abc="B")
+        add_stock(self.b0, "P2", 1, hits=1, abc="A")
+
+    def stored(self, b):
+        a = BinAggregate.objects.get(bin=b)
+        return a.total_qty, a.total_hits, a.product_count, a.best_abc, a.occupied
+
+    def test_refresh_follows_stock_writes(self):
+        refresh_bin_aggregates([self.b0.id, self.b1.id])
+        self.assertEqual(self.stored(self.b0), (6.0, 3, 2, "A", True))
+        self.assertEqual(self.stored(self.b1), (0.0, 0, 0, "C", False))
+
+        BinStock.objects.filter(bin=self.b0).delete()
+        refresh_bin_aggregates([self.b0.id])
+        self.assertEqual(self.stored(self.b0), (0.0, 0, 0, "C", False))
+        self.assertEqual(verify_bin_aggregates(), [])
+
+    def test_bins_without_a_row_read_as_empty(self):
+        metrics = with_stored_metrics(StorageBin.objects.filter(id=self.b1.id)).values(
+            "total_qty", "total_hits", "product_count", "best_abc", "occupied"
+        ).get()
+        self.assertEqual(metrics, {
+            "total_qty": 0.0, "total_hits": 0, "product_count": 0,
+            "best_abc": "C", "occupied": False,
+        })
+
+    def test_verify_and_rebuild_command(self):
+        refresh_bin_aggregates([self.b0.id, self.b1.id])
+        # A stock write that skipped the refresh
+        BinStock.objects.filter(id=self.stock.id).update(quantity=50)
+
+        self.assertEqual(
+            verify_bin_aggregates(), [(self.b0.id, "total_qty", 6.0, 51.0)]
+        )
+        with self.assertRaises(CommandError):
+            call_command("rebuild_bin_aggregates", "--verify-only", stdout=io.StringIO())
+
+        call_command("rebuild_bin_aggregates", "--warehouse", "wh1", stdout=io.StringIO())
+        self.assertEqual(self.stored(self.b0)[0], 51.0)
+        self.assertEqual(verify_bin_aggregates(), [])
+
+
+# ============================================================
+# DATA VERSION / ETAGS
+# ============================================================
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        local_payload_cache(self)
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 4)
+        WarehouseConfig.objects.create(id=1, warehouse=self.wh, rack_type="basic")
+
+    def conditional_get(self, path, etag):
+        return self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+    def test_304_until_a_write(self):
+        path = "/api/warehouse-heatmap-api/"
+        etag = self.client.get(path)["ETag"]
+        self.assertEqual(self.conditional_get(path, etag).status_code, 304)
+
+        bump_data_version(self.wh.id, changed_bins=[StorageBin.objects.first().id])
+        response = self.conditional_get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etags_follow_their_warehouse(self):
+        wh2 = Warehouse.objects.create(code="WH2", name="WH2")
+        StorageBin.objects.create(warehouse=wh2, bin_code="OTHER", x=0, y=0, z=0)
+        one = "/api/warehouse-heatmap-api/?warehouse=WH1"
+        every = "/api/bin-heatmap/"
+        etags = {path: self.client.get(path)["ETag"] for path in (one, every)}
+
+        # A write in WH2 keeps WH1's ETag, not the all-warehouse one
+        self.client.post(
+            "/api/bins/update-position/",
+            json.dumps({"bin_code": "OTHER", "x": 3.0}),
+            content_type="application/json",
+        )
+        self.assertEqual(self.conditional_get(one, etags[one]).status_code, 304)
+        self.assertEqual(self.conditional_get(every, etags[every]).status_code, 200)
+
+    def test_304_varies_on_accept_encoding(self):
+        # The ETag depends on the negotiated encoding, so caches must
+        # key the 304 on Accept-Encoding too
+        for path in ("/api/warehouse-heatmap-api/", "/api/bins/binary/", "/api/bins/page/"):
+            etag = self.client.get(path, HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+            response = self.client.get(
+                path, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING="gzip"
+            )
+            self.assertEqual(response.status_code, 304, path)
+            self.assertIn("Accept-Encoding", response["Vary"], path)
+
+    def test_config_save_changes_the_etag(self):
+        path = "/api/warehouse-heatmap-api/"
+        etag = self.client.get(path)["ETag"]
+        # warehouse_heatmap_api has no route: call the view directly
+        layout_etag = views.warehouse_heatmap_api(RequestFactory().get("/"))["ETag"]
+
+        self.client.post("/api/settings/", {"rack_type": "pallet"})
+
+        response = self.conditional_get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["config"]["rack_type"], "pallet")
+
+        response = views.warehouse_heatmap_api(
+            RequestFactory().get("/", HTTP_IF_NONE_MATCH=layout_etag)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["config"]["rack_type"], "pallet")
+
+    def test_config_save_changes_the_instanced_geometry(self):
+        path = "/api/bins/instanced/"
+        etag = self.client.get(path)["ETag"]
+
+        self.client.post("/api/settings/", {"rack_type": "pallet"})
+
+        response = self.conditional_get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        classes = json.loads(response.content)["classes"]
+        self.assertEqual({c["geometry"]["rack_type"] for c in classes}, {"pallet"})
+
+
+# ============================================================
+# BINARY BIN PAYLOAD
+# ============================================================
+
+def unpack_bins(payload):
+    """
+    Header and numpy columns of a pack_bins() payload, read the way
+    the viewer's decodeBinaryBins() reads it.
+    """
+    assert payload[:4] == bin_binary.MAGIC
+    (header_length,) = struct.unpack("<I", payload[4:8])
+    header = json.loads(payload[8:8 + header_length])
+    data = payload[8 + header_length:]
+    dtypes = {name: dtype for name, dtype, _, _ in bin_binary.COLUMNS}
+    columns = {
+        name: np.frombuffer(data, dtypes[name], col["length"], col["offset"])
+        for name, col in header["columns"].items()
+    }
+    return header, columns
+
+
+class BinBinaryTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+
+    def test_zone_is_dictionary_encoded(self):
+        make_bins(self.wh, 6)
+        StorageBin.objects.filter(bin_code__in=["B0001", "B0004"]).update(zone="Z2")
+        StorageBin.objects.filter(bin_code="B0002").update(zone="Z1")
+
+        header, columns = unpack_bins(self.client.get("/api/bins/binary/").content)
+
+        zones = [header["zones"][i] for i in columns["zone"]]
+        expected = dict(StorageBin.objects.values_list("bin_code", "zone"))
+        self.assertEqual(zones, [expected[code] for code in header["bin_codes"]])
+        self.assertCountEqual(header["zones"], [None, "Z1", "Z2"])
+
+    def test_pack_round_trip(self):
+        rows = [
+            ("A1", 1.5, 2.0, 3.0, 1.0, 1.25, 0.5, 7.5, 3, "A", 1, 2, 3, "Z1"),
+            ("A2", -1.0, 0.0, 4.25, 2.0, 1.0, 1.0, None, None, None, 0, 0, 70000, None),
+        ]
+        header, columns = unpack_bins(bin_binary.pack_bins(rows, "WH1"))
+
+        self.assertEqual((header["warehouse"], header["count"]), ("WH1", 2))
+        self.assertEqual(header["bin_codes"], ["A1", "A2"])
+        self.assertTrue(all(col["offset"] % 4 == 0 for col in header["columns"].values()))
+        np.testing.assert_array_equal(
+            columns["position"].reshape(-1, 3), [[1.5, 2.0, 3.0], [-1.0, 0.0, 4.25]]
+        )
+        np.testing.assert_array_equal(
+            columns["dimensions"].reshape(-1, 3), [[1.0, 1.25, 0.5], [2.0, 1.0, 1.0]]
+        )
+        np.testing.assert_array_equal(columns["qty"], [7.5, 0.0])
+        np.testing.assert_array_equal(columns["hits"], [3, 0])
+        # Layout indexes are clamped to Uint16
+        np.testing.assert_array_equal(columns["layout"].reshape(-1, 3), [[1, 2, 3], [0, 0, 0xFFFF]])
+        self.assertEqual([header["abc"][i] for i in columns["abc"]], ["A", "C"])
+
+    def test_binary_endpoint(self):
+        make_bins(self.wh, 3)
+        b = StorageBin.objects.get(bin_code="B0001")
+        add_stock(b, "P1", 4, hits=6, abc="B")
+        refresh_bin_aggregates([b.id])
+        bump_data_version(self.wh.id, changed_bins=[b.id])
+
+        response = self.client.get("/api/bins/binary/", {"warehouse": "wh1"})
+        self.assertEqual(response["Content-Type"], bin_binary.CONTENT_TYPE)
+        self.assertEqual(response["X-Data-Version"], "1")
+
+        header, columns = unpack_bins(response.content)
+        i = header["bin_codes"].index("B0001")
+        self.assertEqual((columns["qty"][i], columns["hits"][i]), (4.0, 6))
+        self.assertEqual(header["abc"][columns["abc"][i]], "B")
+
+        header, _ = unpack_bins(self.client.get("/api/bins/binary/", {"warehouse": "NOPE"}).content)
+        self.assertEqual(header["count"], 0)
+
+
+# ============================================================
+# SNAPSHOT STREAMING
+# ============================================================
+
+class SnapshotStreamTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        self.snapshot = WarehouseSnapshot.objects.create(warehouse=self.wh, version="v1")
+
+    def add_bins(self, count):
+        BinSnapshot.objects.bulk_create([
+            BinSnapshot(
+                snapshot=self.snapshot, bin_code=f"S{i}", x=i, y=0, z=0,
+                width=1, height=1, depth=1, row=i, shelf=0, level=0,
+                qty=i * 1.5, hits=i, abc="AB"[i % 2], zone=None if i % 3 else "Z",
+            )
+            for i in range(count)
+        ])
+
+    def streamed(self, **params):
+        response = self.client.get("/api/warehouse/3d-snapshot/", {"stream": 1, **params})
+        self.assertTrue(response.streaming)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_stream_matches_the_buffered_response(self):
+        for count in (0, 1, 5):
+            BinSnapshot.objects.all().delete()
+            self.add_bins(count)
+            buffered = json.loads(self.client.get("/api/warehouse/3d-snapshot/").content)
+
+            for chunk_size in (1, 2, 5, 1000):
+                self.assertEqual(self.streamed(chunk_size=chunk_size), buffered, (count, chunk_size))
+            self.assertEqual(buffered["meta"]["bin_count"], count)
+
+    def test_invalid_chunk_size_falls_back_to_the_default(self):
+        self.add_bins(3)
+        self.assertEqual(len(self.streamed(chunk_size="lots")["bins"]), 3)
+
+
+# ============================================================
+# FIELD PROJECTION
+# ============================================================
+
+class ProjectionTests(TestCase):
+    def setUp(self):
+        local_payload_cache(self)
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 2)
+        add_stock(StorageBin.objects.get(bin_code="B0000"), "P1", 3)
+
+    def parse(self, **params):
+        return parse_projection(RequestFactory().get("/", params), HEATMAP_BIN_FIELDS)
+
+    def test_parse(self):
+        self.assertEqual(self.parse(), (list(HEATMAP_BIN_FIELDS), True))
+        self.assertEqual(self.parse(fields="x, y,x"), (["x", "y"], False))
+        self.assertEqual(self.parse(fields="bin_code,products"), (["bin_code"], True))
+        self.assertEqual(self.parse(fields="qty", include="products"), (["qty"], True))
+        for params in ({"fields": "x,nope"}, {"include": "stock"}):
+            with self.assertRaises(InvalidProjection):
+                self.parse(**params)
+
+    def bins(self, path, **params):
+        response = self.client.get(path, {"warehouse": "WH1", **params})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["bins"]
+
+    def test_endpoints_return_only_the_requested_keys(self):
+        bins = self.bins("/api/warehouse-heatmap-api/", fields="bin_code,x")
+        self.assertEqual(bins, [{"bin_code": "B0000", "x": 0.0}, {"bin_code": "B0001", "x": 1.0}])
+
+        bins = self.bins("/api/api/warehouse-bins/", fields="bin_code", include="products")
+        self.assertEqual(set(bins[0]), {"bin_code", "products"})
+        self.assertEqual(bins[0]["products"][0]["sku"], "P1")
+
+        response = self.client.get("/api/warehouse-heatmap-api/", {"fields": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_joins_only_what_the_fields_need(self):
+        def sql(**params):
+            caches["default"].clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get("/api/warehouse-heatmap-api/", params)
+            return " ".join(q["sql"] for q in ctx.captured_queries)
+
+        self.assertNotIn("api_binaggregate", sql(fields="bin_code,x"))
+        self.assertNotIn("api_binstock", sql(fields="bin_code,x"))
+        self.assertIn("api_binaggregate", sql(fields="bin_code,qty"))
+        self.assertIn("api_binstock", sql(fields="bin_code", include="products"))
+
+
+# ============================================================
+# KEYSET PAGINATION
+# ============================================================
+
+class BinPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Two warehouses, with heavy ties on (row, shelf, level)
+        cls.wh1 = Warehouse.objects.create(code="WH1", name="WH1")
+        cls.wh2 = Warehouse.objects.create(code="WH2", name="WH2")
+        make_bins(cls.wh1, 53)
+        make_bins(cls.wh2, 20, layout=lambda i: (0, 0, 0))
+
+    def walk(self, qs, limit):
+        ids, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = bin_page(qs, cursor, limit)
+            ids.extend(r["id"] for r in rows)
+            pages += 1
+            if cursor is None:
+                return ids, pages
+
+    def test_every_page_without_gaps_or_duplicates(self):
+        expected = list(StorageBin.objects.order_by(*KEYSET_ORDER).values_list("id", flat=True))
+
+        for limit in (1, 7, 20, 73, 100):
+            ids, pages = self.walk(filtered_bins(), limit)
+            self.assertEqual(ids, expected, f"limit={limit}")
+            self.assertEqual(pages, max(1, -(-len(expected) // limit)))
+
+    def test_or_expansion_matches_row_values(self):
+        expected, _ = self.walk(filtered_bins(), 9)
+        with mock.patch.object(bin_pagination, "ROW_VALUE_VENDORS", set()):
+            ids, _ = self.walk(filtered_bins(), 9)
+        self.assertEqual(ids, expected)
+
+    def test_filtered_walk(self):
+        expected = list(
+            StorageBin.objects.filter(warehouse=self.wh2)
+            .order_by(*KEYSET_ORDER).values_list("id", flat=True)
+        )
+        ids, _ = self.walk(filtered_bins(warehouse="wh2"), 6)
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/bins/page/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+# ============================================================
+# CHANGE LOG (DELTA SYNC)
+# ============================================================
+
+class ChangeLogTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 3)
+        self.b1, self.b2, self.b3 = StorageBin.objects.order_by("bin_code")
+
+    def write_history(self):
+        bump_data_version(self.wh.id, changed_bins=[self.b1.id, self.b2.id])  # v1
+        bump_data_version(self.wh.id, changed_bins=[self.b1.id])              # v2
+        deleted = (self.b3.id, self.wh.id, self.b3.bin_code)
+        self.b3.delete()
+        bump_data_version(self.wh.id, deleted_bins=[deleted])                 # v3
+        self.wh.refresh_from_db()
+
+    def test_changes_since_collapses_to_latest_op(self):
+        self.write_history()
+        self.assertEqual(self.wh.data_version, 3)
+
+        upserted, deleted = changes_since(self.wh, 0)
+        self.assertEqual(sorted(upserted), sorted([self.b1.id, self.b2.id]))
+        self.assertEqual(deleted, ["B0002"])
+
+        self.assertEqual(changes_since(self.wh, 1), ([self.b1.id], ["B0002"]))
+        self.assertEqual(changes_since(self.wh, 3), ([], []))
+
+    def test_compaction_is_lossless(self):
+        self.write_history()
+        before = {since: changes_since(self.wh, since) for since in range(4)}
+
+        superseded, expired = compact_changes()
+        self.assertEqual((superseded, expired), (1, 0))
+
+        for since, expected in before.items():
+            upserted, deleted = changes_since(self.wh, since)
+            self.assertEqual((sorted(upserted), deleted), (sorted(expected[0]), expected[1]))
+
+    def test_expired_log_raises_floor_and_410(self):
+        self.write_history()
+        _, expired = compact_changes(before=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(expired, 3)
+        self.assertFalse(BinChange.objects.exists())
+
+        self.wh.refresh_from_db()
+        self.assertEqual(self.wh.change_log_floor, 3)
+
+        response = self.client.get("/api/bins/changes/", {"warehouse": "WH1", "since": 0})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()["full_reload"])
+
+        response = self.client.get("/api/bins/changes/", {"warehouse": "WH1", "since": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["bins"], [])
+
+
+# ============================================================
+# LIVE BIN EVENTS
+# ============================================================
+
+def sse_data(message):
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+    return fields["event"], int(fields["id"]), json.loads(fields["data"])
+
+
+class BinEventTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 3)
+        self.b1, self.b2, self.b3 = StorageBin.objects.order_by("bin_code")
+
+    def test_poll_event_reads_the_change_log(self):
+        self.assertEqual(poll_event("wh1", 0), (0, None))
+
+        StorageBin.objects.filter(id=self.b1.id).update(row=9, width=2.5)
+        bump_data_version(self.wh.id, changed_bins=[self.b1.id])
+        deleted = (self.b3.id, self.wh.id, self.b3.bin_code)
+        self.b3.delete()
+        bump_data_version(self.wh.id, deleted_bins=[deleted])
+
+        version, message = poll_event("wh1", 0)
+        event, event_id, data = sse_data(message)
+        self.assertEqual((version, event, event_id), (2, "bins", 2))
+        self.assertEqual([(b["bin_code"], b["row"], b["width"]) for b in data["bins"]], [("B0000", 9, 2.5)])
+        self.assertEqual(data["deleted"], ["B0002"])
+
+        self.assertEqual(poll_event("wh1", 2), (2, None))
+
+    def test_poll_event_reloads_past_the_floor_or_limit(self):
+        bump_data_version(self.wh.id, changed_bins=[self.b1.id])
+        bump_data_version(self.wh.id, changed_bins=[self.b1.id, self.b2.id])
+        Warehouse.objects.filter(id=self.wh.id).update(change_log_floor=1)
+        self.assertEqual(sse_data(poll_event("WH1", 0)[1])[0], "reload")
+
+        with mock.patch.object(bin_events, "MAX_EVENT_BINS", 1):
+            self.assertEqual(sse_data(poll_event("WH1", 1)[1])[0], "reload")
+
+    def next_event_after_write(self):
+        """
+        Subscribe, write from another thread and return the first event.
+        """
+        def write():
+            # Not committed (TestCase), so only the poll can see it
+            bump_data_version(self.wh.id, changed_bins=[self.b2.id])
+
+        async def scenario():
+            sub = broker.subscribe("wh1")
+            try:
+                await asyncio.sleep(0.05)
+                await sync_to_async(write)()
+                return await asyncio.wait_for(sub.queue.get(), timeout=5)
+            finally:
+                broker.unsubscribe(sub)
+
+        with mock.patch.object(bin_events, "EVENT_POLL_SECONDS", 0.01):
+            return async_to_sync(scenario)()
+
+    def test_poller_publishes_writes_from_other_processes(self):
+        message = self.next_event_after_write()
+
+        event, event_id, data = sse_data(message)
+        self.assertEqual((event, event_id), ("bins", 1))
+        self.assertEqual([b["bin_code"] for b in data["bins"]], ["B0001"])
+        self.assertFalse(broker.has_subscribers())
+
+    def test_poller_survives_unexpected_errors(self):
+        calls = []
+
+        def flaky_poll(key, version):
+            calls.append(version)
+            if len(calls) == 1:
+                raise ValueError("boom")
+            return poll_event(key, version)
+
+        with mock.patch.object(bin_events, "poll_event", flaky_poll), \
+                self.assertLogs(bin_events.logger, "ERROR"):
+            message = self.next_event_after_write()
+
+        self.assertEqual(sse_data(message)[0], "bins")
+        self.assertGreater(len(calls), 1)
+
+
+# ============================================================
+# PAYLOAD CACHE
+# ============================================================
+
+class PayloadCacheTests(TestCase):
+    def setUp(self):
+        local_payload_cache(self)
+        self.wh1 = Warehouse.objects.create(code="WH1", name="WH1")
+        self.wh2 = Warehouse.objects.create(code="WH2", name="WH2")
+        self.request = RequestFactory().get("/api/x/", {"warehouse": "WH1"})
+        self.build = mock.Mock(side_effect=lambda: b"payload")
+
+    def get(self, code="WH1"):
+        return payload_cache.get_or_build("x", code, self.request, self.build)
+
+    def test_hit_until_version_bump(self):
+        self.assertEqual(self.get(), b"payload")
+        self.get()
+        self.assertEqual(self.build.call_count, 1)
+
+        bump_data_version(self.wh1.id)
+        self.get()
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_invalidate_retires_only_that_warehouse(self):
+        self.get("WH1")
+        self.get(None)  # covers every warehouse
+
+        payload_cache.invalidate_payloads(self.wh2.id)
+        self.get("WH1")
+        self.assertEqual(self.build.call_count, 2)
+        self.get(None)
+        self.assertEqual(self.build.call_count, 3)
+
+        payload_cache.invalidate_payloads(self.wh1.id)
+        self.get("WH1")
+        self.assertEqual(self.build.call_count, 4)
+
+    def test_encoded_entries_reuse_the_identity_body(self):
+        gzip_request = RequestFactory().get(
+            "/api/x/", {"warehouse": "WH1"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        body, encoding = payload_cache.get_or_build_encoded("x", "WH1", gzip_request, self.build)
+        self.assertEqual((gzip.decompress(body), encoding), (b"payload", "gzip"))
+
+        # Identity is cached alongside, and the gzip entry is reused
+        self.assertEqual(
+            payload_cache.get_or_build_encoded("x", "WH1", self.request, self.build),
+            (b"payload", "identity"),
+        )
+        payload_cache.get_or_build_encoded("x", "WH1", gzip_request, self.build)
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_query_string_is_part_of_the_key(self):
+        other = RequestFactory().get("/api/x/", {"warehouse": "WH1", "fields": "x"})
+        self.get()
+        payload_cache.get_or_build("x", "WH1", other, self.build)
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_endpoint_serves_from_the_cache(self):
+        make_bins(self.wh1, 2)
+        path = "/api/warehouse-heatmap-api/"
+        with mock.patch.object(
+            views.WarehouseHeatmapAPI, "build_payload",
+            autospec=True, return_value={"config": {}, "bins": []},
+        ) as build:
+            self.client.get(path)
+            self.client.get(path)
+            self.assertEqual(build.call_count, 1)
+
+            self.client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(build.call_count, 1)
+
+    def test_config_save_rebuilds_the_heatmap_payload(self):
+        make_bins(self.wh1, 4)
+        WarehouseConfig.objects.create(id=1, warehouse=self.wh1, rack_type="basic")
+        path = "/api/warehouse-heatmap-api/"
+        self.client.get(path)  # cached
+
+        self.client.post("/api/settings/", {"rack_type": "pallet", "rows": 7})
+
+        config = json.loads(self.client.get(path).content)["config"]
+        self.assertEqual(config["rack_type"], "pallet")
+        self.assertEqual(config["rows"], 7)
+
+
+# ============================================================
+# RESPONSE COMPRESSION
+# ============================================================
+
+class CompressionTests(TestCase):
+    def negotiate(self, header, preference=("gzip",)):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=header)
+        with mock.patch.object(compression, "PREFERENCE", list(preference)):
+            return compression.negotiate(request)
+
+    def respond(self, response, header="gzip"):
+        view = compression.compress_response(lambda request: response)
+        return view(RequestFactory().get("/", HTTP_ACCEPT_ENCODING=header))
+
+    def test_negotiate(self):
+        self.assertEqual(self.negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(self.negotiate("GZIP;q=0.5"), "gzip")
+        self.assertEqual(self.negotiate("*"), "gzip")
+        self.assertEqual(self.negotiate("gzip;q=0"), "identity")
+        self.assertEqual(self.negotiate("*, gzip;q=0"), "identity")
+        self.assertEqual(self.negotiate("gzip;q=bad"), "identity")
+        self.assertEqual(self.negotiate(""), "identity")
+
+    def test_negotiate_prefers_the_highest_q_then_the_server_order(self):
+        both = ("br", "gzip")
+        self.assertEqual(self.negotiate("gzip, br", both), "br")
+        self.assertEqual(self.negotiate("gzip, br;q=0.5", both), "gzip")
+        # br is only offered when brotli is installed
+        self.assertEqual(self.negotiate("br, gzip;q=0.1"), "gzip")
+
+    def test_large_bodies_are_compressed(self):
+        body = b'{"bins": []}' * 200
+        response = self.respond(HttpResponse(body))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_responses_that_pass_through(self):
+        body = b"x" * (compression.MIN_COMPRESS_SIZE * 2)
+        cases = {
+            "small": HttpResponse(b"x" * (compression.MIN_COMPRESS_SIZE - 1)),
+            "not accepted": HttpResponse(body),
+            "error": HttpResponse(body, status=404),
+            "streaming": StreamingHttpResponse([body]),
+        }
+        encoded = HttpResponse(body)
+        encoded["Content-Encoding"] = "br"
+
+        for name, response in cases.items():
+            with self.subTest(name):
+                header = "identity" if name == "not accepted" else "gzip"
+                self.assertFalse(self.respond(response, header).has_header("Content-Encoding"))
+        self.assertEqual(self.respond(encoded).content, body)
+
+    def test_endpoint_is_compressed(self):
+        wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(wh, 50)
+        path = "/api/api/warehouse-bins/"
+        plain = self.client.get(path, {"warehouse": "WH1"})
+        packed = self.client.get(path, {"warehouse": "WH1"}, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(packed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(packed.content), plain.content)
+
+
+# ============================================================
+# BIN SERIALIZER
+# ============================================================
+
+class BinSerializerTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 2, zone="Z1")
+        self.qs = StorageBin.objects.filter(warehouse=self.wh).order_by("bin_code")
+
+    def test_plain_spec_copies_columns(self):
+        serializer = bin_serializer.BinSerializer({"code": "bin_code", "x": "x"})
+        self.assertTrue(serializer._plain)
+        self.assertFalse(serializer.needs_metrics)
+        self.assertEqual(serializer.columns, ("bin_code", "x"))
+        self.assertEqual(serializer.serialize(self.qs), [
+            {"code": "B0000", "x": 0.0},
+            {"code": "B0001", "x": 1.0},
+        ])
+
+    def test_converters_computed_keys_and_shared_columns(self):
+        spec = {
+            "code": "bin_code",
+            "label": ("bin_code", str.lower),
+            "type": (None, lambda _: "container"),
+            "qty": ("total_qty", int),
+        }
+        serializer = bin_serializer.BinSerializer(spec)
+        self.assertFalse(serializer._plain)
+        self.assertTrue(serializer.needs_metrics)
+        self.assertEqual(serializer.columns, ("bin_code", "total_qty"))
+        self.assertEqual(serializer.serialize(self.qs)[0], {
+            "code": "B0000", "label": "b0000", "type": "container", "qty": 0,
+        })
+
+    def test_fields_narrow_the_query(self):
+        serializer = bin_serializer.BinSerializer(
+            bin_serializer.HEATMAP_BIN_FIELDS, fields=["zone", "bin_code"]
+        )
+        self.assertEqual(serializer.columns, ("zone", "bin_code"))
+        self.assertFalse(serializer.needs_metrics)
+        self.assertEqual(
+            serializer.serialize(self.qs)[1], {"zone": "Z1", "bin_code": "B0001"}
+        )
+
+        # Only computed keys: still a valid values_list()
+        computed = bin_serializer.BinSerializer({"type": (None, lambda _: "c")})
+        self.assertEqual(computed.columns, ("id",))
+        self.assertEqual(computed.serialize(self.qs), [{"type": "c"}, {"type": "c"}])
+
+    def test_key_columns_are_returned_by_pairs(self):
+        serializer = bin_serializer.BinSerializer(
+            {"code": "bin_code"}, key_columns=("warehouse__code", "x")
+        )
+        self.assertEqual(list(serializer.pairs(self.qs)), [
+            (("WH1", 0.0), {"code": "B0000"}),
+            (("WH1", 1.0), {"code": "B0001"}),
+        ])
+        self.assertEqual(
+            serializer.serialize(self.qs), [{"code": "B0000"}, {"code": "B0001"}]
+        )
+
+        single = bin_serializer.BinSerializer({"code": "bin_code"}, key_columns=("x",))
+        self.assertEqual(next(single.pairs(self.qs)), ((0.0,), {"code": "B0000"}))
+
+    def test_full_serializers_match_the_model(self):
+        add_stock(self.qs[0], "P1", 5, hits=2, abc="A")
+        refresh_bin_aggregates([self.qs[0].id])
+        self.assertEqual(bin_serializer.heatmap_bins.serialize(self.qs)[0], {
+            "bin_code": "B0000", "row": 0, "shelf": 0, "level": 0,
+            "x": 0.0, "y": 0.0, "z": 0.0, "width": 1.2, "height": 1.2, "depth": 1.2,
+            "zone": "Z1", "abc": "A", "hits": 2, "qty": 5.0, "occupied": True,
+        })
+
+    def test_dumps_with_and_without_orjson(self):
+        payload = {"qty": Decimal("1.50"), "bins": [{"code": "B1", "x": 0.5}]}
+        expected = {"qty": "1.50", "bins": [{"code": "B1", "x": 0.5}]}
+
+        self.assertEqual(json.loads(bin_serializer.dumps(payload)), expected)
+        with mock.patch.object(bin_serializer, "orjson", None):
+            body = bin_serializer.dumps(payload)
+        self.assertIsInstance(body, bytes)
+        self.assertNotIn(b" ", body)
+        self.assertEqual(json.loads(body), expected)
+
+
+# ============================================================
+# SPATIAL CHUNKS
+# ============================================================
+
+class BinChunkTests(TestCase):
+    def setUp(self):
+        local_payload_cache(self)
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        # CHUNK_SIZE is 10 m
+        for code, x, z in (("C1", 1, 1), ("C2", 9.5, 3), ("C3", 12, 1), ("C4", -4, 25)):
+            StorageBin.objects.create(warehouse=self.wh, bin_code=code, x=x, y=0, z=z)
+
+    def get(self, **params):
+        response = self.client.get("/api/bins/chunks/", params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def codes(self, chunks):
+        return sorted(b["bin_code"] for bins in chunks.values() for b in bins)
+
+    def test_chunk_is_assigned_on_save(self):
+        b = StorageBin.objects.get(bin_code="C4")
+        self.assertEqual((b.chunk_x, b.chunk_y, b.chunk_z), (-1, 0, 2))
+
+        b.x = 35
+        b.save(update_fields=["x"])
+        b.refresh_from_db()
+        self.assertEqual(b.chunk_x, 3)
+
+    def test_chunk_index(self):
+        self.assertEqual(self.get()["chunks"], [
+            {"id": "-1_0_2", "count": 1},
+            {"id": "0_0_0", "count": 2},
+            {"id": "1_0_0", "count": 1},
+        ])
+
+    def test_bins_by_chunk_id_and_box(self):
+        chunks = self.get(ids="0_0_0,1_0_0")["chunks"]
+        self.assertEqual(sorted(chunks), ["0_0_0", "1_0_0"])
+        self.assertEqual(self.codes(chunks), ["C1", "C2", "C3"])
+
+        # Exact box, not whole chunks
+        self.assertEqual(self.codes(self.get(bbox="0,0,0,10,1,2")["chunks"]), ["C1"])
+        self.assertEqual(self.codes(self.get(bbox="13,1,30,-5,-1,0")["chunks"]), ["C1", "C2", "C3", "C4"])
+
+    def test_invalid_queries(self):
+        for params in ({"ids": "0_0"}, {"ids": "a_b_c"}, {"bbox": "1,2,3"}):
+            self.assertEqual(self.client.get("/api/bins/chunks/", params).status_code, 400)
+
+        with mock.patch.object(views, "MAX_CHUNK_IDS", 2):
+            response = self.client.get("/api/bins/chunks/", {"ids": "0_0_0,1_0_0,2_0_0"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_command_repairs_stale_cells(self):
+        # As left behind by bulk writes or a BIN_CHUNK_SIZE change
+        StorageBin.objects.update(chunk_x=7, chunk_y=7, chunk_z=7)
+
+        out = io.StringIO()
+        call_command("rebuild_bin_chunks", "--warehouse", "wh1", stdout=out)
+
+        self.assertIn("4 bins moved", out.getvalue())
+        self.assertEqual([c["id"] for c in self.get()["chunks"]], ["-1_0_2", "0_0_0", "1_0_0"])
+        self.assertEqual(Warehouse.objects.get(id=self.wh.id).data_version, 1)
+
+
+# ============================================================
+# SPATIAL INDEX
+# ============================================================
+
+class BinSpatialIndexTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.pos = rng.uniform(0, 40, size=(600, 3))
+        # A few exact duplicates and a far outlier
+        self.pos[10] = self.pos[11]
+        self.pos[599] = (500.0, 500.0, 500.0)
+        rows = [
+            (i, f"B{i}", *p, 1.0, 1.0, 1.0)
+            for i, p in enumerate(self.pos.tolist())
+        ]
+        self.index = BinSpatialIndex(1, 0, rows, cell_size=2.5)
+
+    def ids(self, idx):
+        return self.index.ids[idx].tolist()
+
+    def test_within_box_matches_brute_force(self):
+        boxes = [
+            ((5, 5, 5), (12, 9, 30)),
+            ((12, 9, 30), (5, 5, 5)),       # corners in either order
+            ((-10, -10, -10), (100, 100, 100)),
+            ((41, 41, 41), (60, 60, 60)),   # empty
+        ]
+        for lo, hi in boxes:
+            a, b = np.minimum(lo, hi), np.maximum(lo, hi)
+            brute = np.flatnonzero(np.all((self.pos >= a) & (self.pos <= b), axis=1))
+            self.assertEqual(sorted(self.ids(self.index.within_box(lo, hi))), brute.tolist())
+
+    def test_nearest_matches_brute_force(self):
+        for point, k in (((20, 20, 20), 1), ((0, 0, 0), 5), ((45, 3, 18), 12), ((400, 400, 400), 2)):
+            dist = np.linalg.norm(self.pos - point, axis=1)
+            idx, got = self.index.nearest(point, k=k)
+            np.testing.assert_allclose(got, np.sort(dist)[:k])
+            self.assertEqual(len(idx), k)
+
+    def test_nearest_within_radius(self):
+        point = (15, 25, 10)
+        dist = np.linalg.norm(self.pos - point, axis=1)
+        idx, got = self.index.nearest(point, k=1000, radius=4.0)
+        self.assertEqual(sorted(self.ids(idx)), np.flatnonzero(dist <= 4.0).tolist())
+        self.assertTrue(np.all(np.diff(got) >= 0))
+
+    def test_huge_coordinates(self):
+        idx, got = self.index.nearest((-1e30, 20, 20), k=3)
+        dist = np.linalg.norm(self.pos - (-1e30, 20, 20), axis=1)
+        np.testing.assert_allclose(got, np.sort(dist)[:3])
+
+        idx, _ = self.index.nearest((20, 20, 20), k=1000, radius=1e30)
+        self.assertEqual(len(idx), len(self.pos))
+
+        everything = self.index.within_box((-1e30,) * 3, (1e30,) * 3)
+        self.assertEqual(len(everything), len(self.pos))
+
+
+class SpatialApiTests(TestCase):
+    def setUp(self):
+        wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(wh, 5)
+
+    def test_non_finite_numbers_are_rejected(self):
+        requests = [
+            ("/api/bins/nearest/", {"x": "nan", "y": 0, "z": 0}),
+            ("/api/bins/nearest/", {"x": 0, "y": "inf", "z": 0}),
+            ("/api/bins/nearest/", {"x": 0, "y": 0, "z": 0, "radius": "inf"}),
+            ("/api/bins/within-box/", {"bbox": "0,0,0,nan,1,1"}),
+            ("/api/bins/chunks/", {"bbox": "-inf,0,0,1,1,1"}),
+        ]
+        for path, params in requests:
+            self.assertEqual(self.client.get(path, params).status_code, 400, (path, params))
+
+    def test_huge_finite_numbers(self):
+        response = self.client.get(
+            "/api/bins/nearest/", {"x": 1e3, "y": 0, "z": 0, "k": 2, "radius": 1e30}
+        )
+        self.assertEqual([b["bin_code"] for b in response.json()["bins"]], ["B0004", "B0003"])
+
+        response = self.client.get("/api/bins/nearest/", {"x": 1e30, "y": 0, "z": -1e30, "k": 2})
+        self.assertEqual(len(response.json()["bins"]), 2)
+
+        response = self.client.get("/api/bins/within-box/", {"bbox": "-1e30,-1,-1,1e30,1,1"})
+        self.assertEqual(response.json()["count"], 5)
+
+        response = self.client.get("/api/bins/chunks/", {"bbox": "-1e30,-1,-1,1e30,1,1"})
+        chunks = json.loads(response.content)["chunks"]
+        self.assertEqual(sum(len(bins) for bins in chunks.values()), 5)
+
+
+# ============================================================
+# INSTANCED RENDERING PAYLOAD
+# ============================================================
+
+class InstancedPayloadTests(TestCase):
+    path = "/api/bins/instanced/"
+
+    def setUp(self):
+        local_payload_cache(self)
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        WarehouseConfig.objects.create(warehouse=self.wh, rack_type="pallet")
+        make_bins(self.wh, 3)
+        bins = StorageBin.objects.filter(warehouse=self.wh)
+        bins.filter(bin_code="B0001").update(width=2.0004, y=5.0)
+        self.hot = bins.get(bin_code="B0002")
+        add_stock(self.hot, "P1", 10, hits=7, abc="A")
+        refresh_bin_aggregates([self.hot.id])
+
+    def get(self, **params):
+        return self.client.get(self.path, {"warehouse": "wh1", **params})
+
+    def test_bins_are_grouped_by_geometry(self):
+        payload = json.loads(self.get().content)
+        self.assertEqual((payload["warehouse"], payload["count"]), ("WH1", 3))
+
+        big, small = payload["classes"]
+        self.assertEqual(big["geometry"], {
+            "width": 1.2, "height": 1.2, "depth": 1.2, "rack_type": "pallet",
+        })
+        self.assertEqual(big["bin_codes"], ["B0000", "B0002"])
+        self.assertEqual(big["positions"], [0.0, 0.0, 0.0, 2.0, 0.0, 0.0])
+        self.assertEqual(big["colors"], [
+            bin_instances.EMPTY_BIN_COLOR, bin_instances.OCCUPIED_BIN_COLOR,
+        ])
+
+        # Dimensions are rounded to the millimetre
+        self.assertEqual(small["geometry"]["width"], 2.0)
+        self.assertEqual((small["count"], small["positions"]), (1, [1.0, 5.0, 0.0]))
+
+    def test_color_modes(self):
+        colors = {
+            mode: json.loads(self.get(color=mode).content)["classes"][0]["colors"]
+            for mode in ("abc", "heat")
+        }
+        self.assertEqual(colors["abc"][1], bin_instances.ABC_COLORS["A"])
+        # A-class, most hits and most stock: the hot end of the gradient
+        self.assertEqual(colors["heat"][1], bin_instances.HEAT_GRADIENT[-1][1])
+        self.assertNotEqual(colors["heat"][0], colors["heat"][1])
+
+    def test_heat_colors_interpolate_the_gradient(self):
+        zeros = np.zeros(1)
+        self.assertEqual(
+            bin_instances.heat_colors(zeros, zeros, ["?"]).tolist(),
+            # score 0.04: 4/30 of the way from blue to green
+            [bin_instances._hex(
+                bin_instances._rgb([0x1E3CFF]) * (1 - 0.04 / 0.3)
+                + bin_instances._rgb([0x00722F]) * (0.04 / 0.3)
+            )[0]],
+        )
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.get(color="rainbow").status_code, 400)
+        self.assertEqual(self.get(warehouse="NOPE").status_code, 404)
+
+    def test_empty_warehouse(self):
+        Warehouse.objects.create(code="WH2", name="WH2")
+        payload = json.loads(self.get(warehouse="WH2").content)
+        self.assertEqual((payload["count"], payload["classes"]), (0, []))
+
+
+# ============================================================
+# BULK BIN IMPORT
+# ============================================================
+
+def excel_upload(**sheets):
+    """
+    In-memory .xlsx with one sheet per DataFrame, ready to post.
+    """
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    buffer.seek(0)
+    buffer.name = "upload.xlsx"
+    return buffer
+
+
+class BinImportTests(TestCase):
+    def sheet(self, codes, **columns):
+        n = len(codes)
+        return pd.DataFrame({
+            "warehouse_code": columns.pop("warehouse_code", ["WH1"] * n),
+            "bin_code": codes,
+            "row": columns.pop("row", [1] * n),
+            "shelf": [2] * n,
+            "level": [3] * n,
+            **columns,
+        })
+
+    def test_creates_then_updates(self):
+        created, errors, touched, bin_ids = import_bins(self.sheet(
+            [" a1", "A2"], x=[45.0, None], zone=["z1", None],
+        ))
+        self.assertEqual((created, errors), (2, []))
+        wh = Warehouse.objects.get(code="WH1")
+        self.assertEqual(touched, {wh.id})
+        self.assertEqual(
+            bin_ids, set(StorageBin.objects.values_list("id", flat=True))
+        )
+
+        a1 = StorageBin.objects.get(bin_code="A1")
+        self.assertEqual(
+            (a1.row, a1.shelf, a1.level, a1.x, a1.width, a1.height, a1.zone),
+            (1, 2, 3, 45.0, 1.2, 0.7, "Z1"),
+        )
+        self.assertEqual(a1.chunk_x, int(45.0 // CHUNK_SIZE))
+        self.assertIsNone(StorageBin.objects.get(bin_code="A2").zone)
+
+        # Same keys again: updated in place, no duplicates
+        import_bins(self.sheet(["A1"], row=[9], x=[0.0]))
+        a1.refresh_from_db()
+        self.assertEqual((a1.row, a1.x, a1.chunk_x), (9, 0.0, 0))
+        self.assertEqual(StorageBin.objects.count(), 2)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        created, errors, _, _ = import_bins(self.sheet(
+            ["OK1", "", "BAD1", "BAD2", "X" * 51],
+            row=[1, 1, 1.5, 1, 1],
+            width=[None, None, None, "wide", None],
+        ))
+        self.assertEqual(created, 1)
+        self.assertEqual(errors, [
+            {"row": 3, "error": "bin_code is required"},
+            {"row": 4, "error": "row must be an integer"},
+            {"row": 5, "error": "width must be a number"},
+            {"row": 6, "error": "bin_code longer than 50"},
+        ])
+        self.assertEqual(list(StorageBin.objects.values_list("bin_code", flat=True)), ["OK1"])
+
+    def test_failed_chunk_is_retried_row_by_row(self):
+        upsert = bin_import._upsert
+
+        def fail_on_bad(objs):
+            if any(o.bin_code == "BAD" for o in objs):
+                raise ValueError("boom")
+            upsert(objs)
+
+        with mock.patch.object(bin_import, "BIN_CHUNK", 2), \
+                mock.patch.object(bin_import, "_upsert", side_effect=fail_on_bad):
+            created, errors, _, bin_ids = import_bins(self.sheet(["A", "BAD", "C"]))
+
+        self.assertEqual(created, 2)
+        self.assertEqual(errors, [{"row": 3, "error": "boom"}])
+        self.assertEqual(len(bin_ids), 2)
+        self.assertEqual(
+            sorted(StorageBin.objects.values_list("bin_code", flat=True)), ["A", "C"]
+        )
+
+    def test_upload_endpoint(self):
+        wh = Warehouse.objects.create(code="WH1", name="WH1")
+        upload = excel_upload(Bins=self.sheet(["U1", "U2", ""]))
+
+        response = self.client.post("/api/bins/upload-excel/", {"file": upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 2)
+        self.assertEqual(response.json()["errors"], [{"row": 4, "error": "bin_code is required"}])
+        self.assertEqual(BinAggregate.objects.count(), 2)
+        wh.refresh_from_db()
+        self.assertEqual(wh.data_version, 1)
+
+    def test_upload_missing_columns(self):
+        upload = excel_upload(Bins=pd.DataFrame({"bin_code": ["U1"]}))
+        response = self.client.post("/api/bins/upload-excel/", {"file": upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StorageBin.objects.exists())
+
+
+# ============================================================
+# BACKGROUND UPLOAD JOBS
+# ============================================================
+
+class UploadJobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = self.settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.bins = pd.DataFrame({
+            "warehouse_code": ["WH1", "WH1", "WH1"],
+            "bin_code": ["J1", "J2", "J3"],
+            "row": [1, "x", 1], "shelf": [1, 1, 1], "level": [1, 1, 1],
+        })
+
+    def enqueue(self, kind=UploadJob.KIND_BINS, **sheets):
+        upload = excel_upload(**(sheets or {"Bins": self.bins}))
+        return upload_jobs.enqueue_upload(kind, SimpleUploadedFile("up.xlsx", upload.read()))
+
+    def test_async_upload_is_queued_and_processed_by_the_worker(self):
+        response = self.client.post(
+            "/api/bins/upload-excel/?async=1", {"file": excel_upload(Bins=self.bins)}
+        )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job"]
+        self.assertEqual(response.json()["status_url"], f"/api/jobs/{job_id}/")
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}/").json()["status"], "queued")
+        self.assertFalse(StorageBin.objects.exists())
+
+        out = io.StringIO()
+        call_command("run_upload_worker", "--once", stdout=out)
+        self.assertIn(f"Job {job_id} done: 3 rows, 1 errors", out.getvalue())
+
+        status = self.client.get(f"/api/jobs/{job_id}/").json()
+        self.assertEqual(
+            [status[k] for k in ("status", "rows_total", "rows_processed", "rows_imported")],
+            ["done", 3, 3, 2],
+        )
+        self.assertEqual(status["errors"], [{"row": 3, "error": "row must be an integer"}])
+        self.assertEqual(StorageBin.objects.count(), 2)
+        self.assertEqual(Warehouse.objects.get(code="WH1").data_version, 1)
+
+    def test_bin_product_job(self):
+        wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(wh, 1)
+        job = self.enqueue(UploadJob.KIND_BIN_PRODUCTS, BinProduct=pd.DataFrame({
+            "warehouse_code": ["WH1"], "bin_code": ["B0000"],
+            "product_sku": ["S1"], "quantity": [3],
+        }))
+
+        upload_jobs.run_job(upload_jobs.claim_next("w1"))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_imported), ("done", 1))
+        self.assertEqual(BinStock.objects.get().quantity, 3)
+
+    def test_missing_columns_fail_the_job(self):
+        self.enqueue(Bins=pd.DataFrame({"bin_code": ["J1"]}))
+        job = upload_jobs.run_job(upload_jobs.claim_next("w1"))
+
+        self.assertEqual(job.status, "failed")
+        self.assertIn("warehouse_code", job.message)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claim_oldest_first_once(self):
+        first, second = self.enqueue(), self.enqueue()
+
+        claimed = upload_jobs.claim_next("w1")
+        self.assertEqual((claimed.id, claimed.status, claimed.worker), (first.id, "running", "w1"))
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(upload_jobs.claim_next("w2").id, second.id)
+        self.assertIsNone(upload_jobs.claim_next("w3"))
+
+    def test_stale_jobs_are_requeued_or_failed(self):
+        retry, give_up, fresh = self.enqueue(), self.enqueue(), self.enqueue()
+        hour_ago = timezone.now() - timedelta(hours=1)
+        UploadJob.objects.filter(pk=retry.pk).update(
+            status="running", attempts=1, rows_processed=5, updated_at=hour_ago,
+        )
+        UploadJob.objects.filter(pk=give_up.pk).update(
+            status="running", attempts=upload_jobs.MAX_ATTEMPTS, updated_at=hour_ago,
+        )
+        UploadJob.objects.filter(pk=fresh.pk).update(status="running")
+
+        self.assertEqual(upload_jobs.requeue_stale(timedelta(minutes=30)), (1, 1))
+        self.assertEqual(
+            dict(UploadJob.objects.values_list("id", "status")),
+            {retry.id: "queued", give_up.id: "failed", fresh.id: "running"},
+        )
+        self.assertEqual(UploadJob.objects.get(pk=retry.pk).rows_processed, 0)
+
+    def test_status_rate_and_eta(self):
+        now = timezone.now()
+        job = UploadJob(
+            id=1, kind="bins", status="running", attempts=1,
+            rows_total=1000, rows_processed=250, started_at=now - timedelta(seconds=10),
+        )
+        status = upload_jobs.job_status(job, now=now)
+        self.assertEqual((status["rows_per_second"], status["eta_seconds"]), (25.0, 30.0))
+
+        job.status, job.finished_at = "done", now
+        status = upload_jobs.job_status(job, now=now + timedelta(hours=1))
+        self.assertEqual((status["rows_per_second"], status["eta_seconds"]), (25.0, None))
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get("/api/jobs/999/").status_code, 404)
+
+
+# ============================================================
+# DRY-RUN VALIDATION
+# ============================================================
+
+class DryRunTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 2)
+
+    def test_reports_every_error_and_writes_nothing(self):
+        bins = pd.DataFrame({
+            "warehouse_code": ["wh1", None],
+            "bin_code": ["NEW1", "X"],
+            "row": [1, 1], "shelf": [1, 1], "level": [1, 1],
+        })
+        bin_products = pd.DataFrame({
+            "warehouse_code": ["WH1", "WH1", "NOPE", "WH1", "WH1"],
+            "bin_code": ["B0000", "new1", "B0000", "ZZZ", "B0001"],
+            "product_sku": ["S1", "S1", "S1", "S1", "S1"],
+            "quantity": [1, 2, 3, 4, "lots"],
+        })
+
+        report = dry_run(bins=bins, bin_products=bin_products)
+
+        self.assertFalse(report["valid"])
+        self.assertEqual(report["rows"], {"Bins": 2, "BinProduct": 5})
+        errors = {(e["sheet"], e["row"]): e["error"] for e in report["errors"]}
+        self.assertEqual(errors, {
+            ("Bins", 3): "warehouse_code is required",
+            ("BinProduct", 4): "warehouse not found",
+            ("BinProduct", 5): "bin not found in warehouse",
+            ("BinProduct", 6): "quantity must be a number",
+        })
+        self.assertEqual(StorageBin.objects.count(), 2)
+        self.assertFalse(BinStock.objects.exists())
+
+    def test_duplicates_warn_like_the_import_behaves(self):
+        bins = pd.DataFrame({
+            "warehouse_code": ["WH1", "wh1", "WH1"],
+            "bin_code": ["D1", "d1 ", "D2"],
+            "row": [1, 2, 3], "shelf": [1, 1, 1], "level": [1, 1, 1],
+        })
+
+        report = dry_run(bins=bins)
+        self.assertTrue(report["valid"])
+        self.assertEqual(report["warning_count"], 1)
+        self.assertEqual(report["warnings"][0]["row"], 2)
+        self.assertIn("replaced by row 3", report["warnings"][0]["warning"])
+
+        # The real import loads the same sheet cleanly, last row winning
+        _, errors, _, _ = import_bins(bins)
+        self.assertEqual(errors, [])
+        self.assertEqual(StorageBin.objects.get(bin_code="D1").row, 2)
+
+    def test_bins_match_case_insensitively(self):
+        StorageBin.objects.create(warehouse=self.wh, bin_code="low1", x=0, y=0, z=0)
+        bin_products = pd.DataFrame({
+            "warehouse_code": ["wh1", "WH1", "WH1"],
+            "bin_code": ["LOW1", "b0001", "low2"],
+            "product_sku": ["S1", "S1", "S1"],
+            "quantity": [1, 1, 1],
+        })
+
+        report = dry_run(bin_products=bin_products)
+        self.assertEqual(
+            [(e["row"], e["error"]) for e in report["errors"]],
+            [(4, "bin not found in warehouse")],
+        )
+
+    def test_missing_columns(self):
+        report = dry_run(bin_products=pd.DataFrame({"warehouse_code": ["WH1"]}))
+        self.assertEqual(report["error_count"], 1)
+        self.assertEqual(report["errors"][0]["row"], 1)
+
+
+# ============================================================
+# BIN STOCK IMPORT
+# ============================================================
+
+class BinStockImportTests(TestCase):
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 2)
+
+    def test_bin_stock_sheet(self):
+        sheet = pd.DataFrame({
+            "warehouse_code": ["WH1", "WH1", "WH1", "WH1"],
+            "bin_code": ["B0000", "b0001", "B0000", "B0001"],
+            "product_sku": ["S1", "S2", "S1", "S2"],
+            "batch": ["L1", None, "L1", None],
+            "expiry_date": [pd.Timestamp("2027-01-31"), None, "2027-02-28", "soon"],
+            "quantity": [1, 2, 3, 4],
+        })
+
+        created, errors, touched, bin_ids = import_bin_products(sheet, batch_column="batch")
+
+        self.assertEqual(errors, [{
+            "row": 5, "warehouse_code": "WH1", "bin_code": "B0001",
+            "error": "expiry_date must be a date",
+        }])
+        self.assertEqual(created, 3)
+        self.assertEqual(touched, {self.wh.id})
+        self.assertEqual(len(bin_ids), 2)
+
+        # Last row wins for a repeated (bin, product, batch)
+        l1 = BinStock.objects.get(product__sku="S1", batch="L1")
+        self.assertEqual((l1.quantity, str(l1.expiry_date)), (3, "2027-02-28"))
+        s2 = BinStock.objects.get(product__sku="S2", batch=None)
+        self.assertEqual((s2.quantity, s2.expiry_date), (2, None))
+
+    def test_sheet_without_expiry_keeps_it(self):
+        import_bin_products(pd.DataFrame({
+            "warehouse_code": ["WH1"], "bin_code": ["B0000"], "product_sku": ["S1"],
+            "batch": ["L1"], "expiry_date": ["2027-01-31"], "quantity": [1],
+        }), batch_column="batch")
+        import_bin_products(pd.DataFrame({
+            "warehouse_code": ["WH1"], "bin_code": ["B0000"], "product_sku": ["S1"],
+            "odo_number": ["L1"], "quantity": [5],
+        }))
+
+        stock = BinStock.objects.get()
+        self.assertEqual((stock.quantity, str(stock.expiry_date)), (5, "2027-01-31"))
+
+
+class BinProductImportTests(TestCase):
+    """
+    Runs on every backend; on PostgreSQL CopyImportTests repeats it
+    through the COPY staging path.
+    """
+
+    def setUp(self):
+        self.wh = Warehouse.objects.create(code="WH1", name="WH1")
+        make_bins(self.wh, 2)
+        self.b0 = StorageBin.objects.get(bin_code="B0000")
+
+    def sheet(self, rows):
+        return pd.DataFrame(rows, columns=[
+            "warehouse_code", "bin_code", "product_sku", "product_name",
+            "odo_number", "quantity",
+        ])
+
+    def test_merge(self):
+        add_stock(self.b0, "S1", 1)  # NULL batch, updated in place
+        created, errors, touched, bin_ids = import_bin_products(self.sheet([
+            ["wh1", "b0000", "S1", None, None, 4],
+            ["WH1", "B0000", "s2", "new product", "L1", 2],
+            ["WH1", "B0000", "S2", "other name", "L1", 3],
+            ["WH1", "B0001", "S2", None, None, 5],
+        ]))
+
+        self.assertEqual((created, errors), (4, []))
+        self.assertEqual(touched, {self.wh.id})
+        self.assertEqual(bin_ids, set(StorageBin.objects.values_list("id", flat=True)))
+
+        stock = {
+            (s.bin.bin_code, s.product.sku, s.batch): s.quantity
+            for s in BinStock.objects.select_related("bin", "product")
+        }
+        self.assertEqual(stock, {
+            ("B0000", "S1", None): 4,
+            ("B0000", "S2", "L1"): 3,
+            ("B0001", "S2", None): 5,
+        })
+        # New products are named from their first row
+        self.assertEqual(Product.objects.get(sku="S2").name, "NEW PRODUCT")
+
+    def test_second_import_updates(self):
+        sheet = self.sheet([
+            ["WH1", "B0000", "S1", None, "L1", 1],
+            ["WH1", "B0000", "S1", None, None, 1],
+        ])
+        import_bin_products(sheet)
+        sheet["quantity"] = 7
+        import_bin_products(sheet)
+
+        self.assertEqual(
+            sorted(BinStock.objects.values_list("batch", "quantity"), key=str),
+            [("L1", 7), (None, 7)],
+        )
+
+    def test_unresolved_rows_are_reported(self):
+        created, errors, _, bin_ids = import_bin_products(self.sheet([
+            ["NOPE", "B0000", "S1", None, None, 1],
+            ["WH1", "ZZZ", "S1", None, None, 1],
+            ["WH1", "B0001", "S1", None, None, "many"],
+            ["WH1", "B0001", "S1", None, None, 1],
+        ]))
+
+        self.assertEqual(created, 1)
+        self.assertEqual([(e["row"], e["error"]) for e in errors], [
+            (2, "warehouse not found"),
+            (3, "bin not found in warehouse"),
+            (4, "quantity must be a number"),
+        ])
+        self.assertEqual(len(bin_ids), 1)
+        self.assertEqual(BinStock.objects.count(), 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY staging needs PostgreSQL")
+class CopyImportTests(BinProductImportTests):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            bin_stock_import, "_import_orm", side_effect=AssertionError("ORM path used"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_staging_tables_are_dropped(self):
+        import_bin_products(self.sheet([["WH1", "B0000", "S1", None, None, 1]]))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_class WHERE relname LIKE %s",
+                [bin_stock_import.STAGING_TABLE + "%"],
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+# ============================================================
+# INCREMENTAL SAP SYNC / RESUMABLE FEED
+# ============================================================
+
+def sap_rows(count, start=0):
+    return [
+        {
+            "Storagebin": f"SB{i:05d}",
+            "Xcord": i * 10, "Ycord": 100, "Zcord": 50,
+            "Matnr": f"M{i % 7}",
+            "Batch": "" if i % 2 else f"B{i % 3}",
+            "Quan": str(i % 11),
+            "Auom": "EA",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+class SapSyncTests(TestCase):
+    def test_second_run_changes_nothing(self):
+        rows = sap_rows(50)
+        first = sync_bins_from_sap(rows)
+        self.assertEqual(first["bins"]["inserted"], 50)
+        self.assertEqual(first["stock"]["inserted"], 50)
+
+        second = sync_bins_from_sap(rows)
+        self.assertEqual(second["changed"], 0)
+        self.assertEqual(second["bins"]["unchanged"], 50)
+        self.assertEqual(second["stock"]["unchanged"], 50)
+
+    def test_only_differences_are_written(self):
+        rows = sap_rows(20)
+        sync_bins_from_sap(rows)
+
+        rows[3] = dict(rows[3], Xcord=9999)     # bin moved
+        rows[4] = dict(rows[4], Quan="123")     # stock changed
+        del rows[5]                             # bin gone
+        report = sync_bins_from_sap(rows)
+
+        self.assertEqual(report["bins"], {"inserted": 0, "updated": 1, "deleted": 1, "unchanged": 18})
+        self.assertEqual(report["stock"]["updated"], 1)
+        self.assertEqual(report["changed"], 3)
+
+        moved = StorageBin.objects.get(bin_code="SB00003")
+        self.assertEqual((moved.x, moved.chunk_x), (99.99, 9))
+        self.assertFalse(StorageBin.objects.filter(bin_code="SB00005").exists())
+        self.assertEqual(BinStock.objects.get(bin__bin_code="SB00004").quantity, 123.0)
+
+        self.assertEqual(sync_bins_from_sap(rows)["changed"], 0)
+
+
+class IngestSapFeedTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "feed.jsonl")
+        with open(self.path, "w") as f:
+            for row in sap_rows(25):
+                f.write(json.dumps(row) + "\n")
+
+    def ingest(self):
+        out = io.StringIO()
+        call_command("ingest_sap_feed", self.path, "--batch-size", "10", stdout=out)
+        return out.getvalue()
+
+    def test_resumes_from_checkpoint(self):
+        calls = []
+
+        def fail_second_batch(rows, *args, **kwargs):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("worker killed")
+            return sync_bins_from_sap(rows, *args, **kwargs)
+
+        target = "api.management.commands.ingest_sap_feed.sync_bins_from_sap"
+        with mock.patch(target, side_effect=fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.ingest()
+
+        checkpoint = load_checkpoint(self.path, checkpoint_path(self.path))
+        self.assertEqual(checkpoint["rows"], 10)
+        self.assertEqual(StorageBin.objects.count(), 10)
+
+        output = self.ingest()
+        self.assertIn("Resuming at byte", output)
+        self.assertIn("Ingested 25 rows", output)
+        self.assertEqual(
+            sorted(StorageBin.objects.values_list("bin_code", flat=True)),
+            [f"SB{i:05d}" for i in range(25)],
+        )
+        self.assertFalse(os.path.exists(checkpoint_path(self.path)))
+
+    def test_changed_file_is_refused(self):
+        save_checkpoint(self.path, checkpoint_path(self.path), 0, 0, 0)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(sap_rows(1, start=99)[0]) + "\n")
+
+        with self.assertRaises(CommandError):
+            self.ingest()
+
+
+# ============================================================
+# ANALYTICS UPLOAD DEDUPLICATION
+# ============================================================
+
+class AnalyticsUploadTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = self.settings(MEDIA_ROOT=tmp.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(columnar_cache, "COLUMNAR_CACHE_DIR", Path(tmp.name) / "columnar")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, content=b"export bytes", name="repl.xlsx"):
+        return SimpleUploadedFile(name, content)
+
+    def test_content_hash(self):
+        f = self.upload()
+        f.read(3)
+        f.seek(0)
+        self.assertEqual(
+            analytics_uploads.content_hash(f), hashlib.sha256(b"export bytes").hexdigest()
+        )
+        self.assertEqual(f.read(), b"export bytes")  # rewound
+
+    def test_identical_content_reuses_the_record(self):
+        first, created = analytics_uploads.store_upload(ReplenishmentUpload, self.upload())
+        self.assertTrue(created)
+
+        again, created = analytics_uploads.store_upload(
+            ReplenishmentUpload, self.upload(name="renamed.xlsx")
+        )
+        self.assertEqual((again.id, created), (first.id, False))
+
+        other, created = analytics_uploads.store_upload(
+            ReplenishmentUpload, self.upload(b"other bytes")
+        )
+        self.assertTrue(created)
+        self.assertEqual(ReplenishmentUpload.objects.count(), 2)
+        self.assertEqual(len(os.listdir(Path(first.file.path).parent)), 2)
+
+    def test_record_without_its_file_is_not_reused(self):
+        first, _ = analytics_uploads.store_upload(PickingHeatmap, self.upload())
+        first.file.storage.delete(first.file.name)
+
+        again, created = analytics_uploads.store_upload(PickingHeatmap, self.upload())
+        self.assertTrue(created)
+        self.assertNotEqual(again.id, first.id)
+        self.assertTrue(again.file.storage.exists(again.file.name))
+
+    def test_parse_is_shared_by_identical_content(self):
+        frame = pd.DataFrame({"sku": ["S1", "S2"], "status": ["OK", "CRITICAL"]})
+        parse = mock.Mock(return_value=frame)
+        # Two records with the same bytes, e.g. uploaded before dedup
+        uploads = [
+            ReplenishmentUpload.objects.create(
+                file=self.upload(), content_hash=hashlib.sha256(b"export bytes").hexdigest()
+            )
+            for _ in range(2)
+        ]
+
+        for upload in uploads:
+            df = analytics_uploads.parsed_frame(upload, "replenishment", parse, columns=["sku"])
+            self.assertEqual(df["sku"].tolist(), ["S1", "S2"])
+        self.assertEqual(parse.call_count, 1)
+
+        # A different parser of the same file is its own entry
+        analytics_uploads.parsed_frame(uploads[0], "picking", parse)
+        self.assertEqual(parse.call_count, 2)
+
+
+# ============================================================
+# PICK EVENTS
+# ============================================================
+
+class PickEventTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = self.settings(MEDIA_ROOT=tmp.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(columnar_cache, "COLUMNAR_CACHE_DIR", Path(tmp.name) / "columnar")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.export = pd.DataFrame({
+            "Confirm Date": [
+                "2026-03-01", "2026-03-01", "2026-03-02", "2026-03-02", "bad", "2026-03-03",
+            ],
+            "AUoM": ["pal", "EA", "EA", "EA", "EA", "BOX"],
+            "Confirmed Qty": [2, 5, 1, 4, 9, 9],
+            "Product": ["S1", "S2", "S2", None, "S3", "S4"],
+            "Src Bin": ["A-01", "B-01", "B-01", "B-02", "C-01", "D-01"],
+        })
+
+    def cleaned(self, rows=4):
+        """
+        The valid rows as read_picking_frame leaves them.
+        """
+        df = self.export.iloc[:rows].rename(columns=str.lower)
+        return df.assign(**{
+            "confirm date": pd.to_datetime(df["confirm date"]),
+            "auom": df["auom"].str.upper(),
+        })
+
+    def test_events_are_stored_once_per_row(self):
+        upload = PickingHeatmap.objects.create(file="picking_heatmap/x.xlsx")
+        stored = store_pick_events(upload, self.cleaned())
+
+        self.assertEqual(stored, 4)
+        self.assertEqual(
+            list(upload.events.order_by("id").values_list("sku", "bin_code", "qty")),
+            [("S1", "A-01", 2.0), ("S2", "B-01", 5.0), ("S2", "B-01", 1.0), ("", "B-02", 4.0)],
+        )
+
+        # Storing again replaces, never duplicates
+        store_pick_events(upload, self.cleaned(rows=1))
+        self.assertEqual(upload.events.count(), 1)
+
+    def test_chart_data_is_aggregated_in_sql(self):
+        upload = PickingHeatmap.objects.create(file="picking_heatmap/x.xlsx")
+        store_pick_events(upload, self.cleaned())
+
+        self.assertEqual(pick_chart_data(upload), {
+            "labels": ["01-03-2026", "02-03-2026"],
+            "pal": [2.0, 0],
+            "ct": [0, 0],
+            "ea": [5.0, 5.0],
+            "pie": {"PAL": 2.0, "CTN": 0, "EA": 10.0},
+        })
+        self.assertEqual(
+            pick_chart_data(upload, from_date=date(2026, 3, 2), auom="EA")["labels"],
+            ["02-03-2026"],
+        )
+        self.assertEqual(pick_chart_data(upload, to_date=date(2026, 2, 1)), {})
+
+    def test_dashboard_parses_an_upload_once(self):
+        upload = excel_upload(Sheet1=self.export)
+        content = upload.read()
+
+        with mock.patch.object(views, "read_picking_frame", wraps=views.read_picking_frame) as parse:
+            response = self.client.post(
+                "/api/picking-heatmap/", {"file": SimpleUploadedFile("picks.xlsx", content)}
+            )
+            again = self.client.post(
+                "/api/picking-heatmap/", {"file": SimpleUploadedFile("picks.xlsx", content)}
+            )
+        self.assertEqual(parse.call_count, 1)
+
+        record = PickingHeatmap.objects.get()
+        self.assertRedirects(response, f"/api/picking-heatmap/?upload={record.id}")
+        self.assertEqual(again["Location"], response["Location"])
+        # Only PAL / CTN / EA rows with a valid date are kept
+        self.assertEqual(record.events.count(), 4)
+
+        with mock.patch.object(views, "read_picking_frame") as parse:
+            page = self.client.get(
+                "/api/picking-heatmap/", {"upload": record.id, "from_date": "2026-03-02"}
+            )
+        parse.assert_not_called()
+        self.assertEqual(page.context["chart_data"]["ea"], [5.0])
+
+
+# ============================================================
+# COLUMNAR CACHE
+# ============================================================
+
+class ColumnarCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(columnar_cache, "COLUMNAR_CACHE_DIR", Path(tmp.name) / "columnar")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.source = Path(tmp.name) / "tasks.xlsx"
+        self.source.write_bytes(b"workbook bytes")
+        self.frame = pd.DataFrame({
+            "bin": ["A1", "A2", "B1", "B2"],
+            "qty": [1.0, 2.0, 3.0, 4.0],
+            "auom": ["PAL", "EA", "EA", "CTN"],
+        })
+        self.parse = mock.Mock(return_value=self.frame)
+
+    def read(self, **kwargs):
+        return cached_frame(self.source, "tasks", parse=self.parse, **kwargs)
+
+    def cache_files(self):
+        return sorted(p.suffix for p in columnar_cache.COLUMNAR_CACHE_DIR.iterdir())
+
+    def assert_pruned_and_filtered(self):
+        df = self.read(columns=["bin", "qty", "missing"], filters=[("auom", "in", ["EA", "CTN"]), ("qty", ">", 2)])
+        self.assertEqual(list(df.columns), ["bin", "qty"])
+        self.assertEqual(df.to_dict("list"), {"bin": ["B1", "B2"], "qty": [3.0, 4.0]})
+
+    def test_parquet_pushdown(self):
+        pd.testing.assert_frame_equal(self.read(), self.frame)
+        self.assertEqual(self.cache_files(), [".parquet"])
+
+        with mock.patch.object(columnar_cache.pd, "read_parquet", wraps=pd.read_parquet) as read_parquet:
+            self.assert_pruned_and_filtered()
+        # Filter column read for the pushdown, pruned afterwards
+        self.assertEqual(read_parquet.call_args.kwargs["columns"], ["bin", "qty", "auom"])
+        self.assertEqual(self.parse.call_count, 1)
+
+    def test_pickle_fallback(self):
+        with mock.patch.object(columnar_cache, "pq", None):
+            self.read()
+            self.assertEqual(self.cache_files(), [".pkl"])
+            self.assert_pruned_and_filtered()
+        self.assertEqual(self.parse.call_count, 1)
+
+    def test_mixed_types_are_pickled(self):
+        self.frame["bin"] = ["A1", 2, "B1", 3.5]
+        self.read()
+        self.assertEqual(self.cache_files(), [".pkl"])
+
+    def test_changed_file_is_parsed_again(self):
+        self.read()
+        self.source.write_bytes(b"other workbook bytes")
+        self.read()
+        self.assertEqual(self.parse.call_count, 2)
@@ -22,6 +22,14 @@ urlpatterns = [
     path("bins/", bin_list, name="bin_list"),
     path("bins/upload-excel/", BinExcelUpload.as_view()),
     path("warehouse-heatmap-api/", WarehouseHeatmapAPI.as_view()),
+    path("bins/binary/", warehouse_bins_binary, name="warehouse_bins_binary"),
+    path("bins/chunks/", warehouse_bin_chunks, name="warehouse_bin_chunks"),
+    path("bins/instanced/", warehouse_bins_instanced, name="warehouse_bins_instanced"),
+    path("bins/changes/", bin_changes_api, name="bin_changes"),
+    path("bins/page/", bin_page_api, name="bin_page_api"),
+    path("bins/nearest/", bins_nearest_api, name="bins_nearest"),
+    path("bins/within-box/", bins_within_box_api, name="bins_within_box"),
+    path("bins/events/", bin_events_stream, name="bin_events"),
     path("bins/upload-ui/", upload_excel_page),
     path("products/", ProductListView.as_view(), name="product-list"),
     path("products/create/", ProductCreateView.as_view(), name="product-create"),
@@ -32,6 +40,7 @@ urlpatterns = [
     path("products/bulk-upload-ui/", product_bulk_upload_ui),
     path("products/bulk-upload/", BinProductBulkExcelUpload.as_view()),
     path("upload/combined-excel/",upload_combined_excel,name="upload-combined-excel"),
+    path("jobs/<int:job_id>/", upload_job_api, name="upload_job"),
     # Bars, pie, line charts
     path("picking-heatmap/", picking_heatmap_dashboard, name="picking-heatmap"),
     path("replenishment-data/", replenishment_dashboard, name="replenishment-data"),
@@ -1,10 +1,20 @@
+import asyncio
+import json
+import math
 from collections import defaultdict
 
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.views.decorators.http import require_GET
+from django.urls import reverse
+from django.views.decorators.http import require_GET, condition
+from django.views.decorators.vary import vary_on_headers
 from django.views import View
+from django.utils.decorators import method_decorator
 from django.contrib import messages
+from django.db import transaction
+from django.db.models import Count, Q
 
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -16,7 +26,42 @@ from .models import (
     StorageBin,
     WarehouseSnapshot,
     BinSnapshot,
+    BinAggregate,
+    BinChange,
+    BinStock,
+    UploadJob,
+)
+from .services.bin_events import broker
+from .services.bin_import import import_bins
+from .services.bin_stock_import import import_bin_products
+from .services.excel_reader import BIN_PRODUCT_SHEET, BIN_SHEET, BIN_STOCK_SHEET, ExcelWorkbook
+from .services.upload_jobs import enqueue_upload, job_status
+from .services.upload_validation import dry_run
+from .services.change_log import changes_since
+from .services.data_version import bump_data_version, warehouse_etag, snapshot_etag
+from .services.bin_aggregates import refresh_bin_aggregates, with_stored_metrics
+from .services.bin_metrics import products_by_bin
+from .services.bin_pagination import (
+    DEFAULT_PAGE_SIZE, InvalidCursor, bin_page, filtered_bins, parse_page_size,
+)
+from .services.compression import compress_response, encoded_response
+from .services.payload_cache import get_or_build_encoded
+from .services.projection import InvalidProjection, parse_projection
+from .services.bin_serializer import (
+    BIN_HEATMAP_FIELDS, BINS_3JS_FIELDS, HEATMAP_BIN_FIELDS, BinSerializer,
+    chunk_bins, delta_bins, dumps, flat_bins, layout_bins, view_3d_bins,
 )
+from .services.spatial_chunks import CHUNK_SIZE, chunk_id, chunk_range, parse_chunk_id
+from .services.spatial_index import get_index
+from .services.bin_instances import COLOR_MODES, instanced_payload
+
+
+def encode_json(payload):
+    return dumps(payload)
+
+
+def json_response(payload, status=200):
+    return HttpResponse(encode_json(payload), content_type="application/json", status=status)
 
 
 # ============================================================
@@ -67,7 +112,12 @@ def warehouse_settings(request):
         config.bin_width = float(request.POST.get("bin_width", config.bin_width))
         config.bin_height = float(request.POST.get("bin_height", config.bin_height))
         config.bin_depth = float(request.POST.get("bin_depth", config.bin_depth))
-        config.save()
+
+        with transaction.atomic():
+            config.save()
+            # Heatmap / instanced payloads embed the config: new ETags
+            # and payload cache keys
+            bump_data_version(config.warehouse_id)
 
         return redirect("/api/viewer/")
 
@@ -106,55 +156,45 @@ def warehouse_config_api(request):
 # ============================================================
 
 @require_GET
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("bin-heatmap", param=None))
 def bin_heatmap_api(request):
     """
     Canonical API for the 3D warehouse viewer.
     Returns data in row → shelf → level → bin structure.
+
+    Supports ?fields=label,x,y,z,abc and ?include=products
+    (see services/projection.py).
     """
-    bins = (
-        StorageBin.objects
-        .select_related("warehouse")
-        .prefetch_related("stocks__product")
-        .order_by("row", "shelf", "level")
+    try:
+        fields, include_products = parse_projection(request, BIN_HEATMAP_FIELDS)
+    except InvalidProjection as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    body, encoding = get_or_build_encoded(
+        "bin-heatmap", None, request,
+        lambda: encode_json(_bin_heatmap_payload(fields, include_products)),
     )
+    return encoded_response(body, encoding)
+
+
+def _bin_heatmap_payload(fields=None, include_products=True):
+    if fields is None:
+        fields = list(BIN_HEATMAP_FIELDS)
+
+    serializer = BinSerializer(
+        BIN_HEATMAP_FIELDS, fields, key_columns=("id", "row", "shelf", "level")
+    )
+    products = products_by_bin({}) if include_products else None
 
     rows = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
 
-    for b in bins:
-        products = []
-        hits = 0
-        qty = 0
-        abc = "C"
-
-        for s in b.stocks.all():
-            products.append({
-                "sku": s.product.sku if s.product else "",
-                "name": s.product.name if s.product else "",
-                "batch": s.batch,
-                "expiry": s.expiry_date.isoformat() if s.expiry_date else None,
-                "quantity": s.quantity,
-                "image": s.product.image_url if s.product else None,
-            })
-            hits += s.hit_count
-            qty += int(s.quantity)
-            abc = s.abc_class or abc
-
-        rows[b.row][b.shelf][b.level].append({
-            "id": b.id,
-            "label": b.bin_code,
-            "type": "container",
-            "width": b.width,
-            "height": b.height,
-            "depth": b.depth,
-            "x": b.x,
-            "y": b.y,
-            "z": b.z,
-            "qty": qty,
-            "hits": hits,
-            "abc": abc,
-            "zone": b.zone,
-            "products": products,
-        })
+    for (bin_id, row, shelf, level), item in serializer.pairs(
+        StorageBin.objects.order_by("row", "shelf", "level")
+    ):
+        if products is not None:
+            item["products"] = products.get(bin_id, [])
+        rows[row][shelf][level].append(item)
 
     response = {"rows": []}
 
@@ -170,17 +210,80 @@ def bin_heatmap_api(request):
             row_obj["shelves"].append(shelf_obj)
         response["rows"].append(row_obj)
 
-    return JsonResponse(response)
+    return response
 
 
 # ============================================================
 # SNAPSHOT API (READ-ONLY / HISTORY)
 # ============================================================
 
+SNAPSHOT_BIN_FIELDS = (
+    "bin_code", "x", "y", "z", "width", "height", "depth",
+    "row", "shelf", "level", "abc", "hits", "qty", "zone", "occupied",
+)
+SNAPSHOT_STREAM_CHUNK = 2000
+
+
+def _snapshot_header(warehouse, snapshot):
+    return {
+        "warehouse_code": warehouse.code,
+        "snapshot_version": snapshot.version,
+    }, {
+        "bounds": {
+            "x": warehouse.bounds_x,
+            "y": warehouse.bounds_y,
+            "z": warehouse.bounds_z,
+        },
+        "floor_y": 0,
+    }
+
+
+def _stream_snapshot(warehouse, snapshot, chunk_size):
+    """
+    Yield the snapshot JSON piece by piece.
+    Rows are pulled with a server-side cursor and written out one
+    chunk at a time; bin_count is emitted last, after the rows have
+    been counted, so no separate COUNT query is needed.
+    """
+    meta, warehouse_payload = _snapshot_header(warehouse, snapshot)
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+
+    yield '{"warehouse":' + encoder.encode(warehouse_payload) + ',"bins":['
+
+    rows = (
+        BinSnapshot.objects
+        .filter(snapshot=snapshot)
+        .order_by("id")
+        .values_list(*SNAPSHOT_BIN_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    count = 0
+    buf = []
+    for row in rows:
+        buf.append(encoder.encode(dict(zip(SNAPSHOT_BIN_FIELDS, row))))
+        count += 1
+        if len(buf) >= chunk_size:
+            yield ("," if count > len(buf) else "") + ",".join(buf)
+            buf = []
+
+    if buf:
+        yield ("," if count > len(buf) else "") + ",".join(buf)
+
+    meta["bin_count"] = count
+    yield '],"meta":' + encoder.encode(meta) + "}"
+
+
 @require_GET
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=snapshot_etag)
+@compress_response
 def warehouse_3d_snapshot(request):
     """
     Returns the latest snapshot for historical replay
+
+    ?stream=1 streams the bins incrementally (flat memory for
+    snapshots of any size); ?chunk_size= tunes the cursor batch.
     """
     warehouse = Warehouse.objects.first()
     snapshot = (
@@ -193,42 +296,33 @@ def warehouse_3d_snapshot(request):
     if not warehouse or not snapshot:
         return JsonResponse({"bins": []})
 
-    bins = BinSnapshot.objects.filter(snapshot=snapshot)
+    if request.GET.get("stream") in ("1", "true"):
+        try:
+            chunk_size = max(1, int(request.GET.get("chunk_size", SNAPSHOT_STREAM_CHUNK)))
+        except ValueError:
+            chunk_size = SNAPSHOT_STREAM_CHUNK
+
+        return StreamingHttpResponse(
+            _stream_snapshot(warehouse, snapshot, chunk_size),
+            content_type="application/json",
+        )
+
+    bins = [
+        dict(zip(SNAPSHOT_BIN_FIELDS, row))
+        for row in (
+            BinSnapshot.objects
+            .filter(snapshot=snapshot)
+            .order_by("id")
+            .values_list(*SNAPSHOT_BIN_FIELDS)
+        )
+    ]
+    meta, warehouse_payload = _snapshot_header(warehouse, snapshot)
+    meta["bin_count"] = len(bins)
 
     return JsonResponse({
-        "meta": {
-            "warehouse_code": warehouse.code,
-            "snapshot_version": snapshot.version,
-            "bin_count": bins.count(),
-        },
-        "warehouse": {
-            "bounds": {
-                "x": warehouse.bounds_x,
-                "y": warehouse.bounds_y,
-                "z": warehouse.bounds_z,
-            },
-            "floor_y": 0,
-        },
-        "bins": [
-            {
-                "bin_code": b.bin_code,
-                "x": b.x,
-                "y": b.y,
-                "z": b.z,
-                "width": b.width,
-                "height": b.height,
-                "depth": b.depth,
-                "row": b.row,
-                "shelf": b.shelf,
-                "level": b.level,
-                "abc": b.abc,
-                "hits": b.hits,
-                "qty": b.qty,
-                "zone": b.zone,
-                "occupied": b.occupied,
-            }
-            for b in bins
-        ]
+        "meta": meta,
+        "warehouse": warehouse_payload,
+        "bins": bins,
     })
 
 
@@ -236,33 +330,17 @@ def warehouse_3d_snapshot(request):
 # SIMPLE FLAT API (OPTIONAL / DEBUG)
 # ============================================================
 
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("3d-view", param=None))
+@compress_response
 @api_view(["GET"])
 def warehouse_3d_view(request):
     """
     Flat list of bins (debug / legacy support)
     """
-    bins = []
-
-    for b in StorageBin.objects.prefetch_related("stocks"):
-        stock = b.stocks.first()
-
-        bins.append({
-            "bin_id": b.bin_code,
-            "x": b.x,
-            "y": b.y,
-            "z": b.z,
-            "width": b.width,
-            "height": b.height,
-            "depth": b.depth,
-            "qty": stock.quantity if stock else 0,
-            "abc": stock.abc_class if stock else "C",
-            "hits": stock.hit_count if stock else 0,
-            "occupied": bool(stock and stock.quantity > 0),
-        })
-
-    return Response({
+    return json_response({
         "warehouse": "DEFAULT",
-        "bins": bins
+        "bins": view_3d_bins.serialize(StorageBin.objects.all()),
     })
 
 
@@ -282,57 +360,13 @@ from django.http import JsonResponse
 from django.db.models import Sum
 from .models import StorageBin, BinStock
 
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("warehouse-bins", kwarg="warehouse_code"))
+@compress_response
 def warehouse_bins_api(request, warehouse_code):
-    bins = (
-        StorageBin.objects
-        .filter(warehouse__code=warehouse_code)
-        .prefetch_related("stocks")
-    )
+    data = flat_bins.serialize(StorageBin.objects.filter(warehouse__code=warehouse_code))
 
-    data = []
-
-    for b in bins:
-        stocks = b.stocks.all()
-
-        total_qty = sum(s.quantity for s in stocks)
-        total_hits = sum(s.hit_count for s in stocks)
-
-        abc = "C"
-        if stocks:
-            abc = max(
-                stocks,
-                key=lambda s: {"A": 3, "B": 2, "C": 1}[s.abc_class]
-            ).abc_class
-
-        data.append({
-            # Identity
-            "bin_code": b.bin_code,
-            "warehouse": b.warehouse.code if b.warehouse else None,
-
-            # Layout
-            "row": b.row,
-            "shelf": b.shelf,
-            "level": b.level,
-
-            # Geometry
-            "x": b.x,
-            "y": b.y,
-            "z": b.z,
-            "width": b.width,
-            "height": b.height,
-            "depth": b.depth,
-
-            # Zone
-            "zone": b.zone,
-
-            # Metrics
-            "qty": total_qty,
-            "hits": total_hits,
-            "abc": abc,
-            "occupied": total_qty > 0,
-        })
-
-    return JsonResponse(data, safe=False)
+    return json_response(data)
 
 
 
@@ -348,78 +382,61 @@ def update_bin_position(request):
     bin.x = data.get("x", bin.x)
     bin.z = data.get("z", bin.z)
     bin.save(update_fields=["zone", "x", "z"])
+    bump_data_version(changed_bins=[bin.id])
 
     return JsonResponse({"status": "ok"})
 
 from django.db.models import Sum, Count
 from django.views.decorators.http import require_GET
 
+BINS_3JS_PRODUCT_COLUMNS = {
+    "sku": "product__sku",
+    "name": "product__name",
+    "qty": "quantity",
+}
+
+
 @require_GET
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("warehouse-bins-3js"))
+@compress_response
 def warehouse_bins_3js(request):
     warehouse_code = request.GET.get("warehouse")
 
-    bins = (
-        StorageBin.objects
-        .filter(warehouse__code__iexact=warehouse_code)
-        .prefetch_related("stocks__product")
+    try:
+        fields, include_products = parse_projection(request, BINS_3JS_FIELDS)
+    except InvalidProjection as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    serializer = BinSerializer(
+        BINS_3JS_FIELDS, fields, key_columns=("id",) if include_products else ()
+    )
+    bins_qs = StorageBin.objects.filter(warehouse__code__iexact=warehouse_code)
+
+    # UI product list
+    products = (
+        products_by_bin(
+            {"bin__warehouse__code__iexact": warehouse_code},
+            BINS_3JS_PRODUCT_COLUMNS,
+        )
+        if include_products else None
     )
 
+    if products is None:
+        bins_payload = serializer.serialize(bins_qs)
+    else:
+        bins_payload = []
+        for (bin_id,), item in serializer.pairs(bins_qs):
+            item["products"] = products.get(bin_id, [])
+            bins_payload.append(item)
+
     payload = {
         "warehouse": warehouse_code,
-        "total_bins": bins.count(),
-        "bins": []
+        "total_bins": len(bins_payload),
+        "bins": bins_payload,
     }
 
-    for b in bins:
-        stocks = b.stocks.all()
-
-        total_qty = 0
-        hits = 0
-        abc = "C"
-
-        products = []
-
-        for s in stocks:
-            total_qty += s.quantity
-            hits += s.hit_count
-            abc = s.abc_class or abc
-
-            if s.product:
-                products.append({
-                    "sku": s.product.sku,
-                    "name": s.product.name,
-                    "qty": s.quantity,
-                })
-
-        payload["bins"].append({
-            "bin_code": b.bin_code,
-
-            # geometry (unchanged)
-            "x": b.x,
-            "y": b.y,
-            "z": b.z,
-            "width": b.width,
-            "height": b.height,
-            "depth": b.depth,
-
-            # logical
-            "row": b.row,
-            "shelf": b.shelf,
-            "level": b.level,
-            "zone": b.zone,
-
-            # metrics
-            "product_count": len(products),
-            "qty": total_qty,
-            "hits": hits,
-            "abc": abc,
-            "occupied": total_qty > 0,
-
-            # UI
-            "products": products
-        })
-
-    return JsonResponse(payload)
+    return json_response(payload)
 
 
 
@@ -433,7 +450,9 @@ def create_bin(request):
     if request.method == "POST":
         form = StorageBinForm(request.POST)
         if form.is_valid():
-            form.save()
+            bin_obj = form.save()
+            refresh_bin_aggregates([bin_obj.id])
+            bump_data_version(changed_bins=[bin_obj.id])
             return redirect("bin_list")
     else:
         form = StorageBinForm()
@@ -441,9 +460,36 @@ def create_bin(request):
     return render(request, "api/create_bin.html", {"form": form})
 
 
+def _bin_page_context(request, limit=None):
+    """
+    Keyset page of bins for the HTML pages, driven by the same query
+    parameters as /api/bins/page/.
+    """
+    filters = {
+        "warehouse": request.GET.get("warehouse", "").strip(),
+        "zone": request.GET.get("zone", "").strip(),
+        "abc": request.GET.get("abc", "").strip(),
+    }
+    cursor = request.GET.get("cursor") or None
+    limit = parse_page_size(request.GET.get("limit"), default=limit or DEFAULT_PAGE_SIZE)
+
+    try:
+        bins, next_cursor = bin_page(filtered_bins(**filters), cursor, limit)
+    except InvalidCursor:
+        bins, next_cursor = bin_page(filtered_bins(**filters), None, limit)
+        cursor = None
+
+    return {
+        "bins": bins,
+        "filters": filters,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+
+
 def bin_list(request):
-    bins = StorageBin.objects.select_related("warehouse").all()
-    return render(request, "api/bin_list.html", {"bins": bins})
+    return render(request, "api/bin_list.html", _bin_page_context(request))
 
 
 
@@ -451,32 +497,15 @@ from django.http import JsonResponse
 from django.db.models import Sum, Max
 from .models import StorageBin, WarehouseConfig
 
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("warehouse-heatmap", param=None))
+@compress_response
 def warehouse_heatmap_api(request):
-    bins_qs = (
-        StorageBin.objects
-        .select_related("warehouse")
-        .prefetch_related("stocks")
-    )
-
-    bins = []
-    for b in bins_qs:
-        stock = b.stocks.first()
-
-        bins.append({
-            "bin_code": b.bin_code,
-            "row": b.row,
-            "shelf": b.shelf,
-            "level": b.level,
-            "abc": stock.abc_class if stock else "C",
-            "hits": stock.hit_count if stock else 0,
-            "qty": stock.quantity if stock else 0,
-            "occupied": bool(stock),
-            "zone": b.zone,
-        })
+    bins = layout_bins.serialize(StorageBin.objects.all())
 
     cfg = WarehouseConfig.objects.first()
 
-    return JsonResponse({
+    return json_response({
         "config": {
             "rows": cfg.rows,
             "racks_per_row": cfg.racks_per_row,
@@ -553,55 +582,73 @@ def norm(v):
     return str(v).strip().upper()
 
 
+def wants_async(request):
+    return request.query_params.get("async") in ("1", "true")
+
+
+def wants_dry_run(request):
+    return request.query_params.get("dry_run") in ("1", "true")
+
+
+def enqueue_response(kind, request):
+    """
+    202 for an upload handed to the job queue (run_upload_worker).
+    """
+    job = enqueue_upload(kind, request.FILES["file"])
+    return Response(
+        {
+            "job": job.id,
+            "status": job.status,
+            "status_url": reverse("upload_job", args=[job.id]),
+        },
+        status=202,
+    )
+
+
 class BinExcelUpload(APIView):
+    """
+    ?async=1 queues the file as an UploadJob and returns 202 with the
+    job's status URL instead of importing in the request.
+    ?dry_run=1 only validates the sheet (services/upload_validation.py).
+    """
     parser_classes = [MultiPartParser]
 
     def post(self, request):
         if "file" not in request.FILES:
             return Response({"error": "No file uploaded"}, status=400)
 
-        df = pd.read_excel(request.FILES["file"], sheet_name="Bins")
+        with ExcelWorkbook(request.FILES["file"]) as book:
+            required = {"warehouse_code", "bin_code", "row", "shelf", "level"}
+            missing = required - set(book.header("Bins"))
+            if missing:
+                return Response(
+                    {"error": f"Missing columns: {', '.join(missing)}"},
+                    status=400,
+                )
 
-        required = {"warehouse_code", "bin_code", "row", "shelf", "level"}
-        missing = required - set(df.columns)
-        if missing:
-            return Response(
-                {"error": f"Missing columns: {', '.join(missing)}"},
-                status=400,
-            )
+            if wants_dry_run(request):
+                return Response(dry_run(bins=book.read("Bins", BIN_SHEET)))
 
-        created = 0
-        errors = []
+            if wants_async(request):
+                return enqueue_response(UploadJob.KIND_BINS, request)
 
-        for idx, r in df.iterrows():
-            try:
-                wh_code = norm(r["warehouse_code"])
-                bin_code = norm(r["bin_code"])
+            created = 0
+            errors = []
+            touched = set()
+            bin_ids = set()
 
-                wh, _ = Warehouse.objects.get_or_create(
-                    code=wh_code,
-                    defaults={"name": wh_code},
-                )
+            # Streamed batches, column-wise validation + chunked upsert
+            # (services/excel_reader.py, services/bin_import.py)
+            with transaction.atomic():
+                for df in book.batches("Bins", BIN_SHEET):
+                    n, batch_errors, batch_touched, batch_bins = import_bins(df)
+                    created += n
+                    errors.extend(batch_errors)
+                    touched |= batch_touched
+                    bin_ids |= batch_bins
 
-                StorageBin.objects.update_or_create(
-                    warehouse=wh,
-                    bin_code=bin_code,
-                    defaults={
-                        "row": int(r["row"]),
-                        "shelf": int(r["shelf"]),
-                        "level": int(r["level"]),
-                        "x": float(r.get("x", 0)),
-                        "y": float(r.get("y", 0)),
-                        "z": float(r.get("z", 0)),
-                        "width": float(r.get("width", 1.2)),
-                        "height": float(r.get("height", 0.7)),
-                        "depth": float(r.get("depth", 1.2)),
-                        "zone": norm(r.get("zone")) or None,
-                    },
-                )
-                created += 1
-            except Exception as e:
-                errors.append({"row": idx + 2, "error": str(e)})
+                refresh_bin_aggregates(bin_ids)
+                bump_data_version(*touched, changed_bins=bin_ids)
 
         return Response({
             "status": "Bins uploaded",
@@ -617,100 +664,42 @@ class BinStockExcelUpload(APIView):
     parser_classes = [MultiPartParser]
 
     def post(self, request):
-        df = pd.read_excel(request.FILES["file"], sheet_name="BinStock")
-
-        required = {"warehouse_code", "bin_code", "product_sku"}
-        missing = required - set(df.columns)
-        if missing:
-            return Response(
-                {"error": f"Missing columns: {', '.join(missing)}"},
-                status=400,
-            )
-
-        created = 0
-        skipped = 0
-        errors = []
-
-        for idx, r in df.iterrows():
-            try:
-                wh = Warehouse.objects.get(code=norm(r["warehouse_code"]))
-                bin_obj = StorageBin.objects.get(
-                    warehouse=wh,
-                    bin_code=norm(r["bin_code"]),
+        with ExcelWorkbook(request.FILES["file"]) as book:
+            required = {"warehouse_code", "bin_code", "product_sku"}
+            missing = required - set(book.header("BinStock"))
+            if missing:
+                return Response(
+                    {"error": f"Missing columns: {', '.join(missing)}"},
+                    status=400,
                 )
 
-                product, _ = Product.objects.get_or_create(
-                    sku=norm(r["product_sku"]),
-                    defaults={"name": norm(r.get("product_name"))},
-                )
+            created = 0
+            errors = []
+            touched = set()
+            bin_ids = set()
 
-                BinStock.objects.update_or_create(
-                    bin=bin_obj,
-                    product=product,
-                    batch=norm(r.get("batch")) or None,
-                    defaults={
-                        "expiry_date": r.get("expiry_date"),
-                        "quantity": float(r.get("quantity", 0)),
-                        "uom": norm(r.get("uom")) or "EA",
-                        "abc_class": norm(r.get("abc_class")) or "C",
-                        "hit_count": int(r.get("hit_count", 0)),
-                    },
-                )
-                created += 1
+            # Same set-based path as the BinProduct upload
+            # (services/bin_stock_import.py)
+            with transaction.atomic():
+                for df in book.batches("BinStock", BIN_STOCK_SHEET):
+                    n, batch_errors, batch_touched, batch_bins = import_bin_products(df, batch_column="batch")
+                    created += n
+                    errors.extend(batch_errors)
+                    touched |= batch_touched
+                    bin_ids |= batch_bins
 
-            except Exception as e:
-                skipped += 1
-                errors.append({"row": idx + 2, "error": str(e)})
+                refresh_bin_aggregates(bin_ids)
+                bump_data_version(*touched, changed_bins=bin_ids)
 
         return Response({
             "created": created,
-            "skipped": skipped,
+            "skipped": len(errors),
             "errors": errors,
         })
 
 
 
 
-def serialize_bin(bin):
-    stocks = bin.stocks.all()
-
-    total_qty = sum(s.quantity for s in stocks)
-    total_hits = sum(s.hit_count for s in stocks)
-
-    abc = (
-        "A" if any(s.abc_class == "A" for s in stocks)
-        else "B" if any(s.abc_class == "B" for s in stocks)
-        else "C"
-    )
-
-    return {
-        "bin_code": bin.bin_code,
-        "row": bin.row,
-        "shelf": bin.shelf,
-        "level": bin.level,
-        "x": bin.x,
-        "y": bin.y,
-        "z": bin.z,
-        "width": bin.width,
-        "height": bin.height,
-        "depth": bin.depth,
-        "zone": bin.zone,
-        "abc": abc,
-        "hits": total_hits,
-        "qty": total_qty,
-        "occupied": total_qty > 0,
-        "products": [
-            {
-                "sku": s.product.sku,
-                "name": s.product.name,
-                "batch": s.batch,
-                "expiry": s.expiry_date,
-                "quantity": s.quantity,
-            }
-            for s in stocks
-        ],
-    }
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.renderers import JSONRenderer
@@ -720,18 +709,14 @@ from api.models import (
     WarehouseConfig,
     StorageBin,
 )
+from .services.bin_binary import pack_bins, CONTENT_TYPE as BINARY_CONTENT_TYPE
 
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.renderers import JSONRenderer
 
-from api.models import (
-    Warehouse,
-    WarehouseConfig,
-    StorageBin,
+@method_decorator(vary_on_headers("Accept-Encoding"), name="get")
+@method_decorator(
+    condition(etag_func=warehouse_etag("warehouse-heatmap-api", default="WH1")),
+    name="get",
 )
-
-
 class WarehouseHeatmapAPI(APIView):
     renderer_classes = [JSONRenderer]
 
@@ -744,6 +729,23 @@ class WarehouseHeatmapAPI(APIView):
         except Warehouse.DoesNotExist:
             return Response({"config": {}, "bins": []})
 
+        try:
+            fields, include_products = parse_projection(request, HEATMAP_BIN_FIELDS)
+        except InvalidProjection as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+
+        body, encoding = get_or_build_encoded(
+            "warehouse-heatmap-api",
+            wh.code,
+            request,
+            lambda: encode_json(self.build_payload(wh, fields, include_products)),
+        )
+        response = encoded_response(body, encoding)
+        # Starting point for /api/bins/changes/?since=
+        response["X-Data-Version"] = str(wh.data_version)
+        return response
+
+    def build_payload(self, wh, fields=None, include_products=True):
         # Ensure warehouse config exists
         config, _ = WarehouseConfig.objects.get_or_create(
             warehouse=wh,
@@ -758,60 +760,23 @@ class WarehouseHeatmapAPI(APIView):
             }
         )
 
-        # Fetch bins + products
-        bins_qs = (
-            StorageBin.objects
-            .filter(warehouse=wh)
-            .prefetch_related("stocks__product")
+        # Only the requested columns; the aggregate join only for metrics
+        serializer = BinSerializer(
+            HEATMAP_BIN_FIELDS, fields, key_columns=("id",) if include_products else ()
         )
-
-        bins_payload = []
-
-        for b in bins_qs:
-            stocks = list(b.stocks.all())
-
-            total_qty = sum(s.quantity for s in stocks)
-            total_hits = sum(s.hit_count for s in stocks)
-
-            # Prefer stock ABC, fallback to bin ABC
-            abc = (
-                "A" if any(s.abc_class == "A" for s in stocks)
-                else "B" if any(s.abc_class == "B" for s in stocks)
-                else "C"
-            )
-
-            products_payload = [
-                {
-                    "sku": s.product.sku,
-                    "name": s.product.name,
-                    "batch": s.batch,
-                    "expiry": s.expiry_date.isoformat() if s.expiry_date else None,
-                    "quantity": s.quantity,
-                    "image": s.product.image_url,
-                }
-                for s in stocks if s.product
-            ]
-
-            bins_payload.append({
-                "bin_code": b.bin_code,
-                "row": b.row,
-                "shelf": b.shelf,
-                "level": b.level,
-                "x": b.x,
-                "y": b.y,
-                "z": b.z,
-                "width": b.width,
-                "height": b.height,
-                "depth": b.depth,
-                "zone": b.zone,
-                "abc": abc,
-                "hits": total_hits,
-                "qty": total_qty,
-                "occupied": total_qty > 0,
-                "products": products_payload,
-            })
-
-        return Response({
+        bins_qs = StorageBin.objects.filter(warehouse=wh)
+
+        # Product details only when asked for
+        if include_products:
+            products = products_by_bin({"bin__warehouse": wh})
+            bins_payload = []
+            for (bin_id,), item in serializer.pairs(bins_qs):
+                item["products"] = products.get(bin_id, [])
+                bins_payload.append(item)
+        else:
+            bins_payload = serializer.serialize(bins_qs)
+
+        return {
             "config": {
                 "rows": config.rows,
                 "racks_per_row": config.racks_per_row,
@@ -819,8 +784,468 @@ class WarehouseHeatmapAPI(APIView):
                 "rack_type": config.rack_type,
             },
             "bins": bins_payload,
+        }
+
+
+@require_GET
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("bins-binary", default="WH1"))
+@compress_response
+def warehouse_bins_binary(request):
+    """
+    Columnar binary bin payload for the Three.js viewer.
+    Same metrics as WarehouseHeatmapAPI, packed as typed arrays
+    (see services/bin_binary.py for the layout).
+    """
+    warehouse_code = request.GET.get("warehouse", "WH1")
+
+    try:
+        wh = Warehouse.objects.get(code__iexact=warehouse_code)
+    except Warehouse.DoesNotExist:
+        return HttpResponse(pack_bins([], warehouse_code), content_type=BINARY_CONTENT_TYPE)
+
+    rows = (
+        with_stored_metrics(StorageBin.objects.filter(warehouse=wh))
+        .order_by("row", "shelf", "level", "id")
+        .values_list(
+            "bin_code", "x", "y", "z", "width", "height", "depth",
+            "total_qty", "total_hits", "best_abc", "row", "shelf", "level", "zone",
+        )
+    )
+
+    payload = pack_bins(rows, wh.code)
+
+    response = HttpResponse(payload, content_type=BINARY_CONTENT_TYPE)
+    # Starting point for /api/bins/changes/?since=
+    response["X-Data-Version"] = str(wh.data_version)
+    return response
+
+
+MAX_CHUNK_IDS = 512
+
+
+def finite_float(value):
+    """
+    float(value), rejecting nan / inf with ValueError.
+    """
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value} is not a finite number")
+    return number
+
+
+def parse_bbox(value):
+    """
+    "x0,y0,z0,x1,y1,z1" -> ([x0, y0, z0], [x1, y1, z1]).
+    """
+    coords = [finite_float(v) for v in value.split(",")]
+    if len(coords) != 6:
+        raise ValueError("bbox needs 6 values")
+    return coords[:3], coords[3:]
+
+
+def _bin_chunks_payload(wh, chunk_ids, bbox):
+    bins_qs = StorageBin.objects.filter(warehouse=wh)
+
+    if chunk_ids is None and bbox is None:
+        # Chunk index: which chunks exist and how full they are
+        index = (
+            bins_qs
+            .values("chunk_x", "chunk_y", "chunk_z")
+            .annotate(count=Count("id"))
+            .order_by("chunk_x", "chunk_y", "chunk_z")
+        )
+        return {
+            "warehouse": wh.code,
+            "chunk_size": CHUNK_SIZE,
+            "chunks": [
+                {"id": chunk_id(c["chunk_x"], c["chunk_y"], c["chunk_z"]), "count": c["count"]}
+                for c in index
+            ],
+        }
+
+    if chunk_ids is not None:
+        cells = Q()
+        for cx, cy, cz in chunk_ids:
+            cells |= Q(chunk_x=cx, chunk_y=cy, chunk_z=cz)
+        bins_qs = bins_qs.filter(cells)
+    else:
+        (x0, y0, z0), (x1, y1, z1) = bbox
+        (cx0, cx1), (cy0, cy1), (cz0, cz1) = chunk_range((x0, y0, z0), (x1, y1, z1))
+        bins_qs = bins_qs.filter(
+            # Indexed chunk range first, exact box second
+            chunk_x__range=(cx0, cx1),
+            chunk_y__range=(cy0, cy1),
+            chunk_z__range=(cz0, cz1),
+            x__range=(min(x0, x1), max(x0, x1)),
+            y__range=(min(y0, y1), max(y0, y1)),
+            z__range=(min(z0, z1), max(z0, z1)),
+        )
+
+    chunks = defaultdict(list)
+    for (cx, cy, cz), b in chunk_bins.pairs(bins_qs):
+        chunks[chunk_id(cx, cy, cz)].append(b)
+
+    return {
+        "warehouse": wh.code,
+        "chunk_size": CHUNK_SIZE,
+        "chunks": chunks,
+    }
+
+
+@require_GET
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("bin-chunks", default="WH1"))
+def warehouse_bin_chunks(request):
+    """
+    Viewport loading: bins of selected spatial chunks.
+
+      ?ids=0_0_0,1_0_0            explicit chunk ids
+      ?bbox=x0,y0,z0,x1,y1,z1     every bin inside the box
+
+    With neither, returns the chunk index (ids + bin counts).
+    """
+    warehouse_code = request.GET.get("warehouse", "WH1")
+
+    try:
+        wh = Warehouse.objects.get(code__iexact=warehouse_code)
+    except Warehouse.DoesNotExist:
+        return JsonResponse({"error": "Unknown warehouse"}, status=404)
+
+    chunk_ids = None
+    bbox = None
+
+    try:
+        if request.GET.get("ids"):
+            chunk_ids = {parse_chunk_id(c) for c in request.GET["ids"].split(",") if c}
+            if len(chunk_ids) > MAX_CHUNK_IDS:
+                return JsonResponse({"error": f"At most {MAX_CHUNK_IDS} chunk ids"}, status=400)
+        elif request.GET.get("bbox"):
+            bbox = parse_bbox(request.GET["bbox"])
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid chunk query: {e}"}, status=400)
+
+    body, encoding = get_or_build_encoded(
+        "bin-chunks",
+        wh.code,
+        request,
+        lambda: encode_json(_bin_chunks_payload(wh, chunk_ids, bbox)),
+    )
+    return encoded_response(body, encoding)
+
+
+@require_GET
+@compress_response
+def bin_changes_api(request):
+    """
+    Delta sync: bins created / updated / deleted since a data version.
+
+      ?warehouse=WH1&since=<version>
+
+    Changed bins come back with their current metrics and full stock
+    list (which replaces the client's copy, so removed stock rows drop
+    out). Returns 410 when `since` predates the compacted log; the
+    client should then reload the full heatmap.
+    """
+    warehouse_code = request.GET.get("warehouse", "WH1")
+
+    try:
+        since = int(request.GET.get("since", ""))
+    except ValueError:
+        return JsonResponse({"error": "since must be an integer version"}, status=400)
+
+    try:
+        wh = Warehouse.objects.get(code__iexact=warehouse_code)
+    except Warehouse.DoesNotExist:
+        return JsonResponse({"error": "Unknown warehouse"}, status=404)
+
+    if since < wh.change_log_floor:
+        return JsonResponse({
+            "error": "Change log compacted, full reload required",
+            "full_reload": True,
+            "version": wh.data_version,
+        }, status=410)
+
+    if since >= wh.data_version:
+        return JsonResponse({
+            "warehouse": wh.code,
+            "since": since,
+            "version": wh.data_version,
+            "bins": [],
+            "deleted": [],
         })
 
+    upserted, deleted = changes_since(wh, since)
+
+    bins = []
+    found = set()
+    stocks = defaultdict(list)
+
+    for chunk in (upserted[i:i + 2000] for i in range(0, len(upserted), 2000)):
+        stock_rows = (
+            BinStock.objects
+            .filter(bin_id__in=chunk)
+            .order_by("bin_id", "id")
+            .values_list(
+                "bin_id", "id", "product__sku", "product__name", "batch",
+                "expiry_date", "quantity", "uom", "abc_class", "hit_count",
+            )
+        )
+        for bin_id, stock_id, sku, name, batch, expiry, qty, uom, abc, hits in stock_rows:
+            stocks[bin_id].append({
+                "id": stock_id,
+                "sku": sku,
+                "name": name,
+                "batch": batch,
+                "expiry": expiry.isoformat() if expiry else None,
+                "quantity": qty,
+                "uom": uom,
+                "abc": abc,
+                "hits": hits,
+            })
+
+        for b in delta_bins.serialize(StorageBin.objects.filter(id__in=chunk)):
+            b["products"] = stocks.get(b["id"], [])
+            found.add(b["id"])
+            bins.append(b)
+
+    # Logged as changed but gone since (deleted outside a logged path)
+    gone = set(upserted) - found
+    if gone:
+        deleted += list(
+            BinChange.objects
+            .filter(warehouse=wh, bin_id__in=gone)
+            .values_list("bin_code", flat=True)
+            .distinct()
+        )
+
+    return json_response({
+        "warehouse": wh.code,
+        "since": since,
+        "version": wh.data_version,
+        "bins": bins,
+        # A code deleted and re-created under a new id is an update
+        "deleted": sorted(set(deleted) - {b["bin_code"] for b in bins}),
+    })
+
+
+SSE_HEARTBEAT_SECONDS = 15
+
+
+async def bin_events_stream(request):
+    """
+    Server-Sent Events stream of live bin changes for one warehouse
+    (ASGI only). Events:
+
+      bins    {"version", "bins": [...], "deleted": [...]}
+      reload  too many changes / client fell behind: refetch in full
+
+    The event id is the data version, so a reconnecting client can
+    catch up through /api/bins/changes/?since=<Last-Event-ID>.
+    No database connection is held while streaming.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI an endless async stream would pin a worker forever
+        return JsonResponse({"error": "Live events require the ASGI server"}, status=501)
+
+    warehouse_code = request.GET.get("warehouse", "WH1")
+
+    async def stream():
+        subscription = broker.subscribe(warehouse_code)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    message = b": ping\n\n"
+                yield message
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# ============================================================
+# BIN LISTING (KEYSET PAGINATED)
+# ============================================================
+
+@require_GET
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("bin-page"))
+@compress_response
+def bin_page_api(request):
+    """
+    Keyset-paginated bin listing, ordered by
+    (warehouse, row, shelf, level, id).
+
+      ?warehouse=WH1&zone=Z1&abc=A&limit=100&cursor=<next from previous page>
+
+    Each page is an index range scan starting after the cursor, so deep
+    pages cost the same as the first one.
+    """
+    limit = parse_page_size(request.GET.get("limit"))
+    filters = {
+        "warehouse": request.GET.get("warehouse"),
+        "zone": request.GET.get("zone"),
+        "abc": request.GET.get("abc"),
+    }
+
+    try:
+        bins, next_cursor = bin_page(
+            filtered_bins(**filters), request.GET.get("cursor"), limit
+        )
+    except InvalidCursor as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    return HttpResponse(
+        encode_json({
+            "bins": bins,
+            "count": len(bins),
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }),
+        content_type="application/json",
+    )
+
+
+# ============================================================
+# INSTANCED RENDERING PAYLOAD
+# ============================================================
+
+@require_GET
+@vary_on_headers("Accept-Encoding")
+@condition(etag_func=warehouse_etag("bin-instances", default="WH1"))
+def warehouse_bins_instanced(request):
+    """
+    Bins grouped by geometry class for THREE.InstancedMesh: one
+    dimensions record per class plus flat positions / colors arrays
+    (see services/bin_instances.py).
+
+      ?warehouse=WH1&color=occupancy|abc|heat
+    """
+    warehouse_code = request.GET.get("warehouse", "WH1")
+    color_mode = request.GET.get("color", "occupancy").lower()
+
+    if color_mode not in COLOR_MODES:
+        return JsonResponse(
+            {"error": f"color must be one of {', '.join(COLOR_MODES)}"}, status=400
+        )
+
+    try:
+        wh = Warehouse.objects.get(code__iexact=warehouse_code)
+    except Warehouse.DoesNotExist:
+        return JsonResponse({"error": "Unknown warehouse"}, status=404)
+
+    rack_type = (
+        WarehouseConfig.objects
+        .filter(warehouse=wh)
+        .values_list("rack_type", flat=True)
+        .first()
+    )
+
+    body, encoding = get_or_build_encoded(
+        "bin-instances",
+        wh.code,
+        request,
+        lambda: encode_json(instanced_payload(wh, rack_type, color_mode)),
+    )
+    response = encoded_response(body, encoding)
+    response["X-Data-Version"] = str(wh.data_version)
+    return response
+
+
+# ============================================================
+# SPATIAL QUERIES (IN-MEMORY GRID INDEX)
+# ============================================================
+
+MAX_NEAREST = 100
+MAX_BOX_RESULTS = 10000
+
+
+def _spatial_warehouse(request):
+    return Warehouse.objects.get(code__iexact=request.GET.get("warehouse", "WH1"))
+
+
+@require_GET
+def bins_nearest_api(request):
+    """
+    Bins closest to a point ("what is at / near this coordinate").
+
+      ?warehouse=WH1&x=12.5&y=1.5&z=30&k=5&radius=5
+
+    Distances are to bin centres; `contains` marks bins whose box
+    encloses the point.
+    """
+    try:
+        point = [finite_float(request.GET[axis]) for axis in ("x", "y", "z")]
+        k = min(max(int(request.GET.get("k", 1)), 1), MAX_NEAREST)
+        radius = request.GET.get("radius")
+        radius = finite_float(radius) if radius not in (None, "") else None
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "x, y, z are required finite numbers; k and radius must be numbers"}, status=400)
+
+    if radius is not None and radius < 0:
+        return JsonResponse({"error": "radius must be >= 0"}, status=400)
+
+    try:
+        wh = _spatial_warehouse(request)
+    except Warehouse.DoesNotExist:
+        return JsonResponse({"error": "Unknown warehouse"}, status=404)
+
+    index = get_index(wh)
+    found, distances = index.nearest(point, k=k, radius=radius)
+
+    bins = []
+    for i, dist in zip(found.tolist(), distances.tolist()):
+        b = index.bin(i)
+        b["distance"] = dist
+        b["contains"] = index.contains(i, point)
+        bins.append(b)
+
+    return json_response({
+        "warehouse": wh.code,
+        "version": index.version,
+        "point": point,
+        "bins": bins,
+    })
+
+
+@require_GET
+@compress_response
+def bins_within_box_api(request):
+    """
+    Bins whose centre lies inside an axis-aligned box.
+
+      ?warehouse=WH1&bbox=x0,y0,z0,x1,y1,z1&limit=1000
+    """
+    try:
+        lo, hi = parse_bbox(request.GET.get("bbox", ""))
+        limit = min(max(int(request.GET.get("limit", MAX_BOX_RESULTS)), 1), MAX_BOX_RESULTS)
+    except ValueError:
+        return JsonResponse({"error": "bbox must be x0,y0,z0,x1,y1,z1 (finite numbers)"}, status=400)
+
+    try:
+        wh = _spatial_warehouse(request)
+    except Warehouse.DoesNotExist:
+        return JsonResponse({"error": "Unknown warehouse"}, status=404)
+
+    index = get_index(wh)
+    found = index.within_box(lo, hi)
+
+    return json_response({
+        "warehouse": wh.code,
+        "version": index.version,
+        "count": len(found),
+        "truncated": len(found) > limit,
+        "bins": [index.bin(i) for i in found[:limit].tolist()],
+    })
+
 
 # product
 
@@ -856,14 +1281,22 @@ class ProductCreateView(View):
         return redirect("product-list")
 
 class AssignProductToBinView(View):
+    PRODUCT_CHOICES = 500
+
     def get(self, request):
-        bins = StorageBin.objects.select_related("warehouse").all()
-        products = Product.objects.all()
+        context = _bin_page_context(request, limit=200)
 
-        return render(request, "products/assign_product.html", {
-            "bins": bins,
-            "products": products,
-        })
+        product_q = request.GET.get("product_q", "").strip()
+        products = Product.objects.order_by("sku").only("id", "sku", "name")
+        if product_q:
+            products = products.filter(
+                Q(sku__icontains=product_q) | Q(name__icontains=product_q)
+            )
+
+        context["products"] = products[:self.PRODUCT_CHOICES]
+        context["product_q"] = product_q
+
+        return render(request, "products/assign_product.html", context)
 
     def post(self, request):
         bin_id = request.POST.get("bin_id")
@@ -875,15 +1308,18 @@ class AssignProductToBinView(View):
         bin_obj = StorageBin.objects.get(id=bin_id)
         product = Product.objects.get(id=product_id)
 
-        BinStock.objects.update_or_create(
-            bin=bin_obj,
-            product=product,
-            defaults={
-                "quantity": quantity,
-                "abc_class": abc,
-                "hit_count": hits,
-            }
-        )
+        with transaction.atomic():
+            BinStock.objects.update_or_create(
+                bin=bin_obj,
+                product=product,
+                defaults={
+                    "quantity": quantity,
+                    "abc_class": abc,
+                    "hit_count": hits,
+                }
+            )
+            refresh_bin_aggregates([bin_obj.id])
+            bump_data_version(changed_bins=[bin_obj.id])
 
         messages.success(
             request,
@@ -919,84 +1355,76 @@ def norm(v):
 
 @method_decorator(csrf_exempt, name="dispatch")
 class BinProductBulkExcelUpload(APIView):
+    """
+    ?async=1 queues the file as an UploadJob, ?dry_run=1 only validates
+    (see BinExcelUpload).
+    """
     parser_classes = [MultiPartParser]
 
     def post(self, request):
         if "file" not in request.FILES:
             return Response({"error": "No file uploaded"}, status=400)
 
-        df = pd.read_excel(request.FILES["file"], sheet_name="BinProduct")
-
-        required = {
-            "warehouse_code",
-            "bin_code",
-            "product_sku",
-            "quantity",
-        }
-        missing = required - set(df.columns)
-        if missing:
-            return Response(
-                {
-                    "error": "Missing columns",
-                    "missing": list(missing),
-                    "found": list(df.columns),
-                },
-                status=400,
-            )
-
-        created = 0
-        errors = []
-
-        for idx, r in df.iterrows():
-            try:
-                warehouse_code = norm(r["warehouse_code"])
-                bin_code = norm(r["bin_code"])
-                sku = norm(r["product_sku"])
-
-                if not warehouse_code or not bin_code or not sku:
-                    raise ValueError("warehouse_code / bin_code / sku empty")
-
-                wh = Warehouse.objects.get(code__iexact=warehouse_code)
+        with ExcelWorkbook(request.FILES["file"]) as book:
+            header = book.header("BinProduct")
 
-                bin_obj = StorageBin.objects.get(
-                    warehouse=wh,
-                    bin_code__iexact=bin_code,
-                )
-
-                product, _ = Product.objects.get_or_create(
-                    sku=sku,
-                    defaults={
-                        "name": norm(r.get("product_name")) or sku
+            required = {
+                "warehouse_code",
+                "bin_code",
+                "product_sku",
+                "quantity",
+            }
+            missing = required - set(header)
+            if missing:
+                return Response(
+                    {
+                        "error": "Missing columns",
+                        "missing": list(missing),
+                        "found": header,
                     },
+                    status=400,
                 )
 
-                BinStock.objects.update_or_create(
-                    bin=bin_obj,
-                    product=product,
-                    batch=norm(r.get("odo_number")) or None,
-                    defaults={
-                        "quantity": float(r.get("quantity", 0)),
-                        "uom": norm(r.get("uom")) or "EA",
-                        "abc_class": norm(r.get("abc_class")) or "C",
-                        "hit_count": int(r.get("hit_count", 0)),
-                    },
-                )
+            if wants_dry_run(request):
+                return Response(dry_run(bin_products=book.read("BinProduct", BIN_PRODUCT_SHEET)))
 
-                created += 1
+            if wants_async(request):
+                return enqueue_response(UploadJob.KIND_BIN_PRODUCTS, request)
 
-            except Exception as e:
-                errors.append({
-                    "row": idx + 2,
-                    "warehouse_code": r.get("warehouse_code"),
-                    "bin_code": r.get("bin_code"),
-                    "error": str(e),
-                })
+            created = 0
+            errors = []
+            touched = set()
+            bin_ids = set()
+
+            with transaction.atomic():
+                for df in book.batches("BinProduct", BIN_PRODUCT_SHEET):
+                    n, batch_errors, batch_touched, batch_bins = import_bin_products(df)
+                    created += n
+                    errors.extend(batch_errors)
+                    touched |= batch_touched
+                    bin_ids |= batch_bins
+
+                refresh_bin_aggregates(bin_ids)
+                bump_data_version(*touched, changed_bins=bin_ids)
 
         return Response({
             "created": created,
             "errors": errors,
         })
 
+
+@require_GET
+def upload_job_api(request, job_id):
+    """
+    Progress of a queued upload: rows processed, errors, ETA.
+    """
+    try:
+        job = UploadJob.objects.get(pk=job_id)
+    except UploadJob.DoesNotExist:
+        return JsonResponse({"error": "Unknown job"}, status=404)
+
+    return json_response(job_status(job))
+
 from django.shortcuts import render
 from django.views import View
 
@@ -1064,102 +1492,130 @@ class CombinedBinProductExcelUpload(APIView):
         if "file" not in request.FILES:
             return Response({"error": "No file uploaded"}, status=400)
 
+        # Open the workbook once for both sheets; closed here if a
+        # sheet is missing, by the `with` below otherwise
+        book = None
         try:
-            bins_df = pd.read_excel(request.FILES["file"], sheet_name="Bins")
-            prod_df = pd.read_excel(request.FILES["file"], sheet_name="BinProduct")
+            book = ExcelWorkbook(request.FILES["file"])
+            book.header("Bins")
+            book.header("BinProduct")
         except Exception as e:
+            if book is not None:
+                book.close()
             return Response(
                 {"error": f"Excel read failed: {str(e)}"},
                 status=400,
             )
 
+        with book:
+            # Whole-file validation, no writes: see every problem before
+            # an import that rolls back on the first one
+            if wants_dry_run(request):
+                return Response(dry_run(
+                    bins=book.read("Bins", BIN_SHEET),
+                    bin_products=book.read("BinProduct", BIN_PRODUCT_SHEET),
+                ))
+            return self._import(book)
+
+    def _import(self, book):
         created_bins = 0
         created_products = 0
         assigned_products = 0
         errors = []
+        touched = set()
+        bin_ids = set()
 
         # 🔐 ATOMIC TRANSACTION
         with transaction.atomic():
             # =========================
             # 1️⃣ CREATE / UPDATE BINS
             # =========================
-            for idx, r in bins_df.iterrows():
-                try:
-                    wh_code = norm(r["warehouse_code"])
-                    bin_code = norm(r["bin_code"])
-
-                    wh, _ = Warehouse.objects.get_or_create(
-                        code=wh_code,
-                        defaults={"name": wh_code},
-                    )
-
-                    StorageBin.objects.update_or_create(
-                        warehouse=wh,
-                        bin_code=bin_code,
-                        defaults={
-                            "row": int(r["row"]),
-                            "shelf": int(r["shelf"]),
-                            "level": int(r["level"]),
-                            "x": float(r.get("x", 0)),
-                            "y": float(r.get("y", 0)),
-                            "z": float(r.get("z", 0)),
-                            "width": float(r.get("width", 1.2)),
-                            "height": float(r.get("height", 0.7)),
-                            "depth": float(r.get("depth", 1.2)),
-                        },
-                    )
-                    created_bins += 1
-                except Exception as e:
-                    errors.append({
-                        "sheet": "Bins",
-                        "row": idx + 2,
-                        "error": str(e),
-                    })
+            for bins_df in book.batches("Bins", BIN_SHEET):
+                for idx, r in bins_df.iterrows():
+                    try:
+                        wh_code = norm(r["warehouse_code"])
+                        bin_code = norm(r["bin_code"])
+
+                        wh, _ = Warehouse.objects.get_or_create(
+                            code=wh_code,
+                            defaults={"name": wh_code},
+                        )
+                        touched.add(wh.id)
+
+                        bin_obj, _ = StorageBin.objects.update_or_create(
+                            warehouse=wh,
+                            bin_code=bin_code,
+                            defaults={
+                                "row": int(r["row"]),
+                                "shelf": int(r["shelf"]),
+                                "level": int(r["level"]),
+                                "x": float(r.get("x", 0)),
+                                "y": float(r.get("y", 0)),
+                                "z": float(r.get("z", 0)),
+                                "width": float(r.get("width", 1.2)),
+                                "height": float(r.get("height", 0.7)),
+                                "depth": float(r.get("depth", 1.2)),
+                            },
+                        )
+                        bin_ids.add(bin_obj.id)
+                        created_bins += 1
+                    except Exception as e:
+                        errors.append({
+                            "sheet": "Bins",
+                            "row": idx + 2,
+                            "error": str(e),
+                        })
 
             # =========================
             # 2️⃣ CREATE PRODUCTS + ASSIGN TO BINS
             # =========================
-            for idx, r in prod_df.iterrows():
-                try:
-                    wh = Warehouse.objects.get(code__iexact=norm(r["warehouse_code"]))
-
-                    bin_obj = StorageBin.objects.get(
-                        warehouse=wh,
-                        bin_code__iexact=norm(r["bin_code"]),
-                    )
-
-                    product, _ = Product.objects.get_or_create(
-                        sku=norm(r["product_sku"]),
-                        defaults={
-                            "name": norm(r.get("product_name")) or norm(r["product_sku"])
-                        },
-                    )
-                    created_products += 1
-
-                    BinStock.objects.update_or_create(
-                        bin=bin_obj,
-                        product=product,
-                        batch=norm(r.get("odo_number")) or None,
-                        defaults={
-                            "quantity": float(r.get("quantity", 0)),
-                            "uom": norm(r.get("uom")) or "EA",
-                            "abc_class": norm(r.get("abc_class")) or "C",
-                            "hit_count": int(r.get("hit_count", 0)),
-                        },
-                    )
-                    assigned_products += 1
-
-                except Exception as e:
-                    errors.append({
-                        "sheet": "BinProduct",
-                        "row": idx + 2,
-                        "error": str(e),
-                    })
+            for prod_df in book.batches("BinProduct", BIN_PRODUCT_SHEET):
+                for idx, r in prod_df.iterrows():
+                    try:
+                        wh = Warehouse.objects.get(code__iexact=norm(r["warehouse_code"]))
+                        touched.add(wh.id)
+
+                        bin_obj = StorageBin.objects.get(
+                            warehouse=wh,
+                            bin_code__iexact=norm(r["bin_code"]),
+                        )
+
+                        product, _ = Product.objects.get_or_create(
+                            sku=norm(r["product_sku"]),
+                            defaults={
+                                "name": norm(r.get("product_name")) or norm(r["product_sku"])
+                            },
+                        )
+                        created_products += 1
+
+                        BinStock.objects.update_or_create(
+                            bin=bin_obj,
+                            product=product,
+                            batch=norm(r.get("odo_number")) or None,
+                            defaults={
+                                "quantity": float(r.get("quantity", 0)),
+                                "uom": norm(r.get("uom")) or "EA",
+                                "abc_class": norm(r.get("abc_class")) or "C",
+                                "hit_count": int(r.get("hit_count", 0)),
+                            },
+                        )
+                        bin_ids.add(bin_obj.id)
+                        assigned_products += 1
+
+                    except Exception as e:
+                        errors.append({
+                            "sheet": "BinProduct",
+                            "row": idx + 2,
+                            "error": str(e),
+                        })
 
             # ❌ If any error → rollback everything
             if errors:
                 raise Exception("Upload failed, transaction rolled back")
 
+            refresh_bin_aggregates(bin_ids)
+            bump_data_version(*touched, changed_bins=bin_ids)
+
         return Response({
             "status": "success",
             "bins_created": created_bins,
@@ -1190,15 +1646,23 @@ def upload_combined_excel(request):
             messages.error(request, "No file selected")
             return redirect("upload-combined-excel")
 
+        # Opened once for both sheets (used to be parsed twice); closed
+        # here if a sheet is missing, in the `finally` below otherwise
+        book = None
         try:
-            bins_df = pd.read_excel(file, sheet_name="Bins")
-            prod_df = pd.read_excel(file, sheet_name="BinProduct")
+            book = ExcelWorkbook(file)
+            book.header("Bins")
+            book.header("BinProduct")
         except Exception as e:
+            if book is not None:
+                book.close()
             messages.error(request, f"Excel read failed: {e}")
             return redirect("upload-combined-excel")
 
         created_bins = 0
         assigned_products = 0
+        touched = set()
+        bin_ids = set()
 
         try:
             with transaction.atomic():
@@ -1206,65 +1670,76 @@ def upload_combined_excel(request):
                 # =========================
                 # 1️⃣ CREATE / UPDATE BINS
                 # =========================
-                for _, r in bins_df.iterrows():
-                    wh_code = norm(r["warehouse_code"])
-                    bin_code = norm(r["bin_code"])
-
-                    wh, _ = Warehouse.objects.get_or_create(
-                        code=wh_code,
-                        defaults={"name": wh_code},
-                    )
-
-                    StorageBin.objects.update_or_create(
-                        warehouse=wh,
-                        bin_code=bin_code,
-                        defaults={
-                            "row": int(r["row"]),
-                            "shelf": int(r["shelf"]),
-                            "level": int(r["level"]),
-                            "x": float(r.get("x", 0)),
-                            "y": float(r.get("y", 0)),
-                            "z": float(r.get("z", 0)),
-                            "width": float(r.get("width", 1.2)),
-                            "height": float(r.get("height", 0.7)),
-                            "depth": float(r.get("depth", 1.2)),
-                        },
-                    )
-                    created_bins += 1
+                for bins_df in book.batches("Bins", BIN_SHEET):
+                    for _, r in bins_df.iterrows():
+                        wh_code = norm(r["warehouse_code"])
+                        bin_code = norm(r["bin_code"])
+
+                        wh, _ = Warehouse.objects.get_or_create(
+                            code=wh_code,
+                            defaults={"name": wh_code},
+                        )
+                        touched.add(wh.id)
+
+                        bin_obj, _ = StorageBin.objects.update_or_create(
+                            warehouse=wh,
+                            bin_code=bin_code,
+                            defaults={
+                                "row": int(r["row"]),
+                                "shelf": int(r["shelf"]),
+                                "level": int(r["level"]),
+                                "x": float(r.get("x", 0)),
+                                "y": float(r.get("y", 0)),
+                                "z": float(r.get("z", 0)),
+                                "width": float(r.get("width", 1.2)),
+                                "height": float(r.get("height", 0.7)),
+                                "depth": float(r.get("depth", 1.2)),
+                            },
+                        )
+                        bin_ids.add(bin_obj.id)
+                        created_bins += 1
 
                 # =========================
                 # 2️⃣ CREATE PRODUCTS + ASSIGN TO BINS
                 # =========================
-                for _, r in prod_df.iterrows():
-                    wh = Warehouse.objects.get(code__iexact=norm(r["warehouse_code"]))
-
-                    bin_obj = StorageBin.objects.get(
-                        warehouse=wh,
-                        bin_code__iexact=norm(r["bin_code"]),
-                    )
-
-                    product, _ = Product.objects.get_or_create(
-                        sku=norm(r["product_sku"]),
-                        defaults={
-                            "name": norm(r.get("product_name")) or norm(r["product_sku"])
-                        },
-                    )
-
-                    BinStock.objects.update_or_create(
-                        bin=bin_obj,
-                        product=product,
-                        defaults={
-                            "quantity": float(r.get("quantity", 0)),
-                            "uom": norm(r.get("uom")) or "EA",
-                            "abc_class": norm(r.get("abc_class")) or "C",
-                            "hit_count": int(r.get("hit_count", 0)),
-                        },
-                    )
-                    assigned_products += 1
+                for prod_df in book.batches("BinProduct", BIN_PRODUCT_SHEET):
+                    for _, r in prod_df.iterrows():
+                        wh = Warehouse.objects.get(code__iexact=norm(r["warehouse_code"]))
+                        touched.add(wh.id)
+
+                        bin_obj = StorageBin.objects.get(
+                            warehouse=wh,
+                            bin_code__iexact=norm(r["bin_code"]),
+                        )
+
+                        product, _ = Product.objects.get_or_create(
+                            sku=norm(r["product_sku"]),
+                            defaults={
+                                "name": norm(r.get("product_name")) or norm(r["product_sku"])
+                            },
+                        )
+
+                        BinStock.objects.update_or_create(
+                            bin=bin_obj,
+                            product=product,
+                            defaults={
+                                "quantity": float(r.get("quantity", 0)),
+                                "uom": norm(r.get("uom")) or "EA",
+                                "abc_class": norm(r.get("abc_class")) or "C",
+                                "hit_count": int(r.get("hit_count", 0)),
+                            },
+                        )
+                        bin_ids.add(bin_obj.id)
+                        assigned_products += 1
+
+                refresh_bin_aggregates(bin_ids)
+                bump_data_version(*touched, changed_bins=bin_ids)
 
         except Exception as e:
             messages.error(request, f"Upload failed: {e}")
             return redirect("upload-combined-excel")
+        finally:
+            book.close()
 
         messages.success(
             request,
@@ -1279,103 +1754,110 @@ def upload_combined_excel(request):
 import pandas as pd
 from django.shortcuts import render
 from .forms import PickingHeatmapUploadForm
+from .models import PickingHeatmap
+from .services.analytics_uploads import parsed_frame, store_upload
+from .services.pick_events import PICK_FRAME_COLUMNS, pick_chart_data, store_pick_events
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+
+
+def read_picking_frame(path):
+    """
+    Picking export -> cleaned frame (lower-case columns, PAL/CTN/EA
+    rows with a valid confirm date).
+    """
+    df = pd.read_excel(path)
+
+    # Normalize column names
+    df.columns = df.columns.str.strip().str.lower()
+
+    required_cols = {"auom", "confirmed qty", "confirm date"}
+    if not required_cols.issubset(df.columns):
+        raise ValueError(f"Excel must contain columns: {required_cols}")
+
+    # Clean data
+    df["auom"] = df["auom"].str.upper()
+    df = df[df["auom"].isin(["PAL", "CTN", "EA"])]
+
+    df["confirm date"] = pd.to_datetime(df["confirm date"], errors="coerce")
+    return df.dropna(subset=["confirm date"])
+
+
+def _picking_upload(request):
+    """
+    Upload the dashboard shows: ?upload=<id>, else the latest one.
+    Uploads from before PickEvent existed are loaded on first view.
+    """
+    upload_id = request.GET.get("upload")
+    qs = PickingHeatmap.objects.order_by("-uploaded_at", "-id")
+    upload = qs.filter(id=upload_id).first() if upload_id and upload_id.isdigit() else qs.first()
+
+    if upload is not None and not upload.events.exists():
+        try:
+            store_pick_events(upload, parsed_frame(
+                upload, "picking", read_picking_frame, columns=PICK_FRAME_COLUMNS
+            ))
+        except (OSError, ValueError):
+            return None
+    return upload
+
+
+def _date_param(request, name):
+    try:
+        return parse_date(request.GET.get(name) or "")
+    except ValueError:
+        return None
 
 
 def picking_heatmap_dashboard(request):
     """
     Picking Analytics Dashboard
-    - Upload Excel
-    - Filters: Date range + AUoM
+    - Upload Excel (parsed once into PickEvent rows)
+    - Filters: Date range + AUoM, aggregated in SQL
     - Charts: Bar, Line, Pie
     """
 
-    chart_data = {}
-    df = None
-
     # ----------------------------
     # Upload
     # ----------------------------
     if request.method == "POST":
         form = PickingHeatmapUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            instance = form.save()
-            df = pd.read_excel(instance.file.path)
+            # Identical file -> existing record, events already stored
+            instance, _ = store_upload(PickingHeatmap, form.cleaned_data["file"])
+            if not instance.events.exists():
+                try:
+                    store_pick_events(instance, parsed_frame(
+                        instance, "picking", read_picking_frame, columns=PICK_FRAME_COLUMNS
+                    ))
+                except ValueError as e:
+                    form.add_error("file", str(e))
+
+            if not form.errors:
+                return redirect(f"{reverse('picking-heatmap')}?upload={instance.id}")
+        upload = None
     else:
         form = PickingHeatmapUploadForm()
+        upload = _picking_upload(request)
 
     # ----------------------------
-    # If file already uploaded earlier
-    # (optional enhancement later: session-based)
+    # Filters (GET) -> GROUP BY date, auom
     # ----------------------------
-    if df is not None:
-
-        # Normalize column names
-        df.columns = df.columns.str.strip().str.lower()
-
-        required_cols = {"auom", "confirmed qty", "confirm date"}
-        if not required_cols.issubset(df.columns):
-            raise ValueError(f"Excel must contain columns: {required_cols}")
-
-        # Clean data
-        df["auom"] = df["auom"].str.upper()
-        df = df[df["auom"].isin(["PAL", "CTN", "EA"])]
-
-        df["confirm date"] = pd.to_datetime(df["confirm date"], errors="coerce")
-        df = df.dropna(subset=["confirm date"])
-
-        # ----------------------------
-        # Filters (GET)
-        # ----------------------------
-        from_date = request.GET.get("from_date")
-        to_date = request.GET.get("to_date")
-        auom_filter = request.GET.get("auom")
-
-        if from_date:
-            df = df[df["confirm date"] >= pd.to_datetime(from_date)]
-
-        if to_date:
-            df = df[df["confirm date"] <= pd.to_datetime(to_date)]
-
-        if auom_filter:
-            df = df[df["auom"] == auom_filter]
-
-        if not df.empty:
-            df["date"] = df["confirm date"].dt.strftime("%d-%m-%Y")
-
-            # Aggregate
-            grouped = (
-                df.groupby(["date", "auom"])["confirmed qty"]
-                .sum()
-                .unstack(fill_value=0)
-                .reset_index()
-            )
-
-            for col in ["PAL", "CTN", "EA"]:
-                if col not in grouped.columns:
-                    grouped[col] = 0
-
-            labels = grouped["date"].tolist()
-            pal = grouped["PAL"].tolist()
-            ct = grouped["CTN"].tolist()
-            ea = grouped["EA"].tolist()
-
-            chart_data = {
-                "labels": labels,
-                "pal": pal,
-                "ct": ct,
-                "ea": ea,
-                "pie": {
-                    "PAL": sum(pal),
-                    "CTN": sum(ct),
-                    "EA": sum(ea),
-                },
-            }
+    chart_data = {}
+    if upload is not None:
+        chart_data = pick_chart_data(
+            upload,
+            from_date=_date_param(request, "from_date"),
+            to_date=_date_param(request, "to_date"),
+            auom=request.GET.get("auom") or None,
+        )
 
     return render(
         request,
         "api/picking_heatmap.html",
         {
             "form": form,
+            "upload": upload,
             "chart_data": chart_data,
         },
     )
@@ -1406,6 +1888,69 @@ class ReplenishmentUploadForm(forms.ModelForm):
         fields = ["file"]
 
 
+def read_replenishment_frame(path):
+    """
+    REPL transaction export -> frame with sku / qty columns and the
+    derived replenishment status.
+    """
+    df = pd.read_excel(path)
+
+    # ----------------------------
+    # Normalize column names
+    # ----------------------------
+    df.columns = (
+        df.columns
+          .str.strip()
+          .str.lower()
+          .str.replace(" ", "_")
+    )
+
+    # ----------------------------
+    # REQUIRED COLUMNS CHECK
+    # ----------------------------
+    REQUIRED = {"product", "confirmed_qty", "src_bin", "dsbin"}
+
+    missing = REQUIRED - set(df.columns)
+    if missing:
+        raise ValueError(
+            f"Excel missing required columns: {missing}. "
+            f"Found columns: {df.columns.tolist()}"
+        )
+
+    # ----------------------------
+    # Standardize Columns
+    # ----------------------------
+    df = df.rename(columns={
+        "product": "sku",
+        "confirmed_qty": "current_qty",
+        "src_bin": "source_bin",
+        "dsbin": "dest_bin",
+    })
+
+    # Ensure numeric
+    df["current_qty"] = pd.to_numeric(df["current_qty"], errors="coerce").fillna(0)
+
+    # ----------------------------
+    # DERIVED INVENTORY RULES
+    # ----------------------------
+    df["min_qty"] = 50          # business rule
+    df["reorder_qty"] = 100     # business rule
+
+    # ----------------------------
+    # Replenishment Status
+    # ----------------------------
+    df["status"] = "OK"
+
+    df.loc[df["current_qty"] <= df["min_qty"], "status"] = "CRITICAL"
+    df.loc[
+        (df["current_qty"] > df["min_qty"]) &
+        (df["current_qty"] <= df["reorder_qty"]),
+        "status"
+    ] = "WARNING"
+
+    return df
+
+
 def replenishment_dashboard(request):
     """
     Replenishment Dashboard
@@ -1423,66 +1968,17 @@ def replenishment_dashboard(request):
     if request.method == "POST":
         form = ReplenishmentUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            instance = form.save()
-            df = pd.read_excel(instance.file.path)
+            # Identical file -> existing record + cached parse
+            instance, _ = store_upload(ReplenishmentUpload, form.cleaned_data["file"])
+            df = parsed_frame(
+                instance, "replenishment", read_replenishment_frame,
+                columns=["sku", "current_qty", "reorder_qty", "status"],
+            )
     else:
         form = ReplenishmentUploadForm()
 
     if df is not None:
 
-        # ----------------------------
-        # Normalize column names
-        # ----------------------------
-        df.columns = (
-            df.columns
-              .str.strip()
-              .str.lower()
-              .str.replace(" ", "_")
-        )
-
-        # ----------------------------
-        # REQUIRED COLUMNS CHECK
-        # ----------------------------
-        REQUIRED = {"product", "confirmed_qty", "src_bin", "dsbin"}
-
-        missing = REQUIRED - set(df.columns)
-        if missing:
-            raise ValueError(
-                f"Excel missing required columns: {missing}. "
-                f"Found columns: {df.columns.tolist()}"
-            )
-
-        # ----------------------------
-        # Standardize Columns
-        # ----------------------------
-        df = df.rename(columns={
-            "product": "sku",
-            "confirmed_qty": "current_qty",
-            "src_bin": "source_bin",
-            "dsbin": "dest_bin",
-        })
-
-        # Ensure numeric
-        df["current_qty"] = pd.to_numeric(df["current_qty"], errors="coerce").fillna(0)
-
-        # ----------------------------
-        # DERIVED INVENTORY RULES
-        # ----------------------------
-        df["min_qty"] = 50          # business rule
-        df["reorder_qty"] = 100     # business rule
-
-        # ----------------------------
-        # Replenishment Status
-        # ----------------------------
-        df["status"] = "OK"
-
-        df.loc[df["current_qty"] <= df["min_qty"], "status"] = "CRITICAL"
-        df.loc[
-            (df["current_qty"] > df["min_qty"]) &
-            (df["current_qty"] <= df["reorder_qty"]),
-            "status"
-        ] = "WARNING"
-
         # ----------------------------
         # KPIs
         # ----------------------------
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Live bin events (/api/bins/events/) are async Server-Sent Events and
+need this entry point, e.g. `uvicorn warehouse3d.asgi:application`.
 """
 
 import os
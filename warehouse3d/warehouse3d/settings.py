@@ -94,6 +94,29 @@ DATABASES = {
 #     }
 # }   
 
+# Cache
+# Serialized API payloads live in their own file-based cache so every
+# worker process on the box shares them (see api/services/payload_cache.py).
+# Any Django backend works here, e.g. LocMemCache for a single process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'payloads': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'payloads',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+PAYLOAD_CACHE_ALIAS = 'payloads'
+PAYLOAD_CACHE_TIMEOUT = 60 * 60
+
+# Parsed analytics / reference workbooks (services/columnar_cache.py).
+# Parquet when pyarrow is installed, pickle otherwise.
+COLUMNAR_CACHE_DIR = BASE_DIR / 'cache' / 'columnar'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 